@@ -1,4 +1,8 @@
-from django.http import Http404, HttpResponse
+import json
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema, OpenApiParameter
@@ -14,6 +18,7 @@ from dcim import filtersets
 from dcim.constants import CABLE_TRACE_SVG_DEFAULT_WIDTH
 from dcim.models import *
 from dcim.svg import CableTraceSVG
+from dcim.utils import cache_trace, compile_path_node, deferred_tracing, get_cached_trace
 from extras.api.mixins import ConfigContextQuerySetMixin, ConfigTemplateRenderMixin
 from ipam.models import Prefix, VLAN
 from netbox.api.authentication import IsAuthenticatedOrLoginNotRequired
@@ -48,6 +53,7 @@ class PathEndpointMixin(object):
         Trace a complete cable path and return each segment as a three-tuple of (termination, cable, termination).
         """
         obj = get_object_or_404(self.queryset, pk=pk)
+        base_url = request.build_absolute_uri('/')
 
         # Initialize the path array
         path = []
@@ -58,8 +64,18 @@ class PathEndpointMixin(object):
                 width = int(request.GET.get('width', CABLE_TRACE_SVG_DEFAULT_WIDTH))
             except (ValueError, TypeError):
                 width = CABLE_TRACE_SVG_DEFAULT_WIDTH
-            drawing = CableTraceSVG(obj, base_url=request.build_absolute_uri('/'), width=width)
-            return HttpResponse(drawing.render().tostring(), content_type='image/svg+xml')
+            variant = f'svg:{width}:{base_url}'
+            if obj._path and (svg := get_cached_trace(obj._path, variant)) is not None:
+                return HttpResponse(svg, content_type='image/svg+xml')
+            drawing = CableTraceSVG(obj, base_url=base_url, width=width)
+            svg = drawing.render().tostring()
+            if obj._path:
+                cache_trace(obj._path, variant, svg)
+            return HttpResponse(svg, content_type='image/svg+xml')
+
+        variant = f'json:{base_url}'
+        if obj._path and (cached := get_cached_trace(obj._path, variant)) is not None:
+            return Response(cached)
 
         # Serialize path objects, iterating over each three-tuple in the path
         for near_ends, cable, far_ends in obj.trace():
@@ -77,6 +93,9 @@ class PathEndpointMixin(object):
 
             path.append((near_ends, cable, far_ends))
 
+        if obj._path:
+            cache_trace(obj._path, variant, path)
+
         return Response(path)
 
 
@@ -85,10 +104,10 @@ class PassThroughPortMixin(object):
     @action(detail=True, url_path='paths')
     def paths(self, request, pk):
         """
-        Return all CablePaths which traverse a given pass-through port.
+        Return all CablePaths which traverse a given pass-through port or cable.
         """
         obj = get_object_or_404(self.queryset, pk=pk)
-        cablepaths = CablePath.objects.filter(_nodes__contains=obj)
+        cablepaths = CablePath.objects.filter(_nodes__contains=obj).order_by('pk')
         serializer = serializers.CablePathSerializer(cablepaths, context={'request': request}, many=True)
 
         return Response(serializer.data)
@@ -436,6 +455,14 @@ class DeviceViewSet(
 
         return self.render_configtemplate(request, configtemplate, context_data)
 
+    @extend_schema(request=OpenApiTypes.OBJECT, responses={200: OpenApiTypes.STR})
+    @action(detail=False, methods=['post'], url_path='render-config', url_name='render-configs')
+    def render_configs(self, request):
+        """
+        Resolve and render the preferred ConfigTemplate for each Device matching the specified filters.
+        """
+        return self.render_configtemplates(request, self.filter_queryset(self.queryset), 'device')
+
 
 class VirtualDeviceContextViewSet(NetBoxModelViewSet):
     queryset = VirtualDeviceContext.objects.prefetch_related(
@@ -561,11 +588,18 @@ class InventoryItemRoleViewSet(NetBoxModelViewSet):
 # Cables
 #
 
-class CableViewSet(NetBoxModelViewSet):
+class CableViewSet(PassThroughPortMixin, NetBoxModelViewSet):
     queryset = Cable.objects.prefetch_related('terminations__termination')
     serializer_class = serializers.CableSerializer
     filterset_class = filtersets.CableFilterSet
 
+    def perform_create(self, serializer):
+        # When creating cables in bulk, trace all affected cable paths once, after every cable has been saved
+        if isinstance(self.request.data, list):
+            with transaction.atomic(), deferred_tracing():
+                return super().perform_create(serializer)
+        return super().perform_create(serializer)
+
 
 class CableTerminationViewSet(NetBoxModelViewSet):
     metadata_class = ContentTypeMetadata
@@ -678,3 +712,151 @@ class ConnectedDeviceViewSet(ViewSet):
 
         # Connected endpoint is none or not an Interface
         raise Http404
+
+
+class TopologyViewSet(ViewSet):
+    """
+    This endpoint streams the complete physical topology of a site, region, or tenant as newline-delimited JSON, one
+    object per line, so that it can be retrieved in a single request. At least one of the following query parameters
+    must be included:
+
+    * `site_id`: The ID of a site
+    * `region_id`: The ID of a region (including its child regions)
+    * `tenant_id`: The ID of the tenant to which cables are assigned
+
+    Each line has a `type` of `node` (a cable termination), `edge` (a cable or a front-to-rear port mapping), or
+    `path` (a CablePath originating from a node). Nodes and path elements are identified as <content type ID>:<object
+    ID>.
+    """
+    permission_classes = [IsAuthenticatedOrLoginNotRequired]
+    _site_param = OpenApiParameter(
+        name='site_id',
+        location='query',
+        description='The ID of a site',
+        type=OpenApiTypes.INT
+    )
+    _region_param = OpenApiParameter(
+        name='region_id',
+        location='query',
+        description='The ID of a region',
+        type=OpenApiTypes.INT
+    )
+    _tenant_param = OpenApiParameter(
+        name='tenant_id',
+        location='query',
+        description='The ID of a tenant',
+        type=OpenApiTypes.INT
+    )
+    # Number of rows to fetch from the database at a time
+    chunk_size = 2000
+
+    def get_view_name(self):
+        return "Topology"
+
+    @extend_schema(
+        parameters=[_site_param, _region_param, _tenant_param],
+        responses={200: OpenApiTypes.STR}
+    )
+    def list(self, request):
+        terminations = CableTermination.objects.restrict(request.user, 'view').filter(
+            cable__in=Cable.objects.restrict(request.user, 'view')
+        )
+
+        try:
+            site_id = int(request.query_params.get(self._site_param.name, 0))
+            region_id = int(request.query_params.get(self._region_param.name, 0))
+            tenant_id = int(request.query_params.get(self._tenant_param.name, 0))
+        except ValueError:
+            return Response({'detail': 'Filter values must be integers.'}, status=HTTP_400_BAD_REQUEST)
+        if not any((site_id, region_id, tenant_id)):
+            raise MissingFilterException(
+                detail='Request must include a "site_id", "region_id", or "tenant_id" filter.'
+            )
+
+        if site_id:
+            terminations = terminations.filter(_site_id=site_id)
+        if region_id:
+            region = get_object_or_404(Region.objects.restrict(request.user, 'view'), pk=region_id)
+            terminations = terminations.filter(_site__region__in=region.get_descendants(include_self=True))
+        if tenant_id:
+            terminations = terminations.filter(cable__tenant_id=tenant_id)
+
+        return StreamingHttpResponse(
+            (json.dumps(record) + '\n' for record in self._get_records(request, terminations)),
+            content_type='application/x-ndjson'
+        )
+
+    def _get_records(self, request, terminations):
+        """
+        Yield each node, edge, and path within the topology. Each queryset is consumed in chunks, so that memory usage
+        remains bounded regardless of the size of the topology.
+        """
+        # Nodes and cables. Cable terminations are ordered by cable so that each cable's edge can be emitted once all of
+        # its terminations have been seen.
+        edge = None
+        queryset = terminations.select_related('cable').prefetch_related('termination').order_by(
+            'cable_id', 'cable_end', 'pk'
+        )
+        for ct in queryset.iterator(chunk_size=self.chunk_size):
+            if edge is not None and edge['id'] != ct.cable_id:
+                yield edge
+                edge = None
+            if edge is None:
+                edge = {
+                    'type': 'edge',
+                    'kind': 'cable',
+                    'id': ct.cable_id,
+                    'label': ct.cable.label,
+                    'status': ct.cable.status,
+                    'a_terminations': [],
+                    'b_terminations': [],
+                }
+            node = compile_path_node(ct.termination_type_id, ct.termination_id)
+            edge[f'{ct.cable_end.lower()}_terminations'].append(node)
+            termination_type = ContentType.objects.get_for_id(ct.termination_type_id)
+            yield {
+                'type': 'node',
+                'id': node,
+                'object_type': f'{termination_type.app_label}.{termination_type.model}',
+                'object_id': ct.termination_id,
+                'display': str(ct.termination) if ct.termination else None,
+                'device_id': ct._device_id,
+                'site_id': ct._site_id,
+            }
+        if edge is not None:
+            yield edge
+
+        # Front-to-rear port mappings on all devices with a cabled termination in the topology
+        frontport_type = ContentType.objects.get_for_model(FrontPort).pk
+        rearport_type = ContentType.objects.get_for_model(RearPort).pk
+        frontports = FrontPort.objects.restrict(request.user, 'view').filter(
+            device_id__in=terminations.order_by().values('_device_id')
+        ).order_by('pk').values_list('pk', 'rear_port_id', 'rear_port_position')
+        for pk, rear_port_id, rear_port_position in frontports.iterator(chunk_size=self.chunk_size):
+            yield {
+                'type': 'edge',
+                'kind': 'port_mapping',
+                'front_port': compile_path_node(frontport_type, pk),
+                'rear_port': compile_path_node(rearport_type, rear_port_id),
+                'rear_port_position': rear_port_position,
+            }
+
+        # CablePaths originating from path endpoints in the topology
+        termination_types = terminations.order_by().values_list('termination_type_id', flat=True).distinct()
+        for termination_type_id in termination_types:
+            model = ContentType.objects.get_for_id(termination_type_id).model_class()
+            if not issubclass(model, PathEndpoint):
+                continue
+            origins = model.objects.filter(
+                pk__in=terminations.filter(termination_type_id=termination_type_id).order_by().values('termination_id')
+            )
+            cablepaths = CablePath.objects.filter(pk__in=origins.values('_path_id')).order_by('pk')
+            for cablepath in cablepaths.iterator(chunk_size=self.chunk_size):
+                yield {
+                    'type': 'path',
+                    'id': cablepath.pk,
+                    'path': cablepath.path,
+                    'is_active': cablepath.is_active,
+                    'is_complete': cablepath.is_complete,
+                    'is_split': cablepath.is_split,
+                }
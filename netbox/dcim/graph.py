@@ -0,0 +1,387 @@
+from collections import defaultdict, namedtuple
+
+from django.contrib.contenttypes.models import ContentType
+
+from .choices import LinkStatusChoices
+from .utils import compile_path_node
+
+__all__ = (
+    'CableGraph',
+)
+
+FrontPortNode = namedtuple('FrontPortNode', ('device_id', 'rank', 'cable_id', 'rear_port_id', 'rear_port_position'))
+RearPortNode = namedtuple('RearPortNode', ('device_id', 'rank', 'cable_id', 'positions'))
+CircuitTerminationNode = namedtuple(
+    'CircuitTerminationNode', ('circuit_id', 'term_side', 'cable_id', 'site_id', 'provider_network_id')
+)
+
+
+class CableGraph:
+    """
+    An in-memory representation of the cable plant: Cables, their terminations, front/rear port mappings, and circuit
+    terminations. CablePaths can be traced against the graph without querying the database at each hop, producing
+    results identical to those of CablePath.from_origin().
+
+    The graph may be preloaded for a site (see `for_site()`) or a set of cables (see `for_cables()`). Any portion of
+    the graph not yet loaded when it is reached during a trace (e.g. the far end of a circuit) is fetched on demand in
+    bulk: all cable terminations of a cable, all ports of a device, and both terminations of a circuit are loaded
+    together.
+    """
+    def __init__(self):
+        from circuits.models import CircuitTermination, ProviderNetwork
+        from dcim.models import Cable, FrontPort, RearPort, Site
+
+        self.cable_type = ContentType.objects.get_for_model(Cable).pk
+        self.frontport_type = ContentType.objects.get_for_model(FrontPort).pk
+        self.rearport_type = ContentType.objects.get_for_model(RearPort).pk
+        self.circuittermination_type = ContentType.objects.get_for_model(CircuitTermination).pk
+        self.providernetwork_type = ContentType.objects.get_for_model(ProviderNetwork).pk
+        self.site_type = ContentType.objects.get_for_model(Site).pk
+
+        # Cable ID -> status
+        self.cables = {}
+        # (cable ID, cable end) -> list of (CableTermination ID, termination type ID, termination ID)
+        self.cable_ends = defaultdict(list)
+        # (termination type ID, termination ID) -> (cable ID, cable end)
+        self.terminations = {}
+        # (termination type ID, termination ID) -> ID of the attached cable (if any)
+        self.links = {}
+
+        self.front_ports = {}
+        self.front_ports_by_position = defaultdict(list)
+        self.rear_ports = {}
+        self.circuit_terminations = {}
+        self.circuit_sides = {}
+
+        self._loaded_devices = set()
+
+    @classmethod
+    def for_site(cls, site):
+        """
+        Return a CableGraph preloaded with all cables attached to objects within the given site.
+        """
+        from dcim.models import CableTermination
+
+        graph = cls()
+        graph.load_cables(
+            CableTermination.objects.filter(_site=site).values_list('cable_id', flat=True).distinct()
+        )
+        return graph
+
+    @classmethod
+    def for_cables(cls, cables):
+        """
+        Return a CableGraph preloaded with the given cables (an iterable of Cables or Cable IDs).
+        """
+        graph = cls()
+        graph.load_cables([getattr(cable, 'pk', cable) for cable in cables])
+        return graph
+
+    #
+    # Loading
+    #
+
+    def load_cables(self, cable_ids):
+        """
+        Load the given cables and all of their terminations, along with the ports and circuit terminations to which
+        they attach.
+        """
+        from dcim.models import Cable, CableTermination
+
+        cable_ids = [pk for pk in set(cable_ids) if pk not in self.cables]
+        if not cable_ids:
+            return
+
+        self.cables.update(Cable.objects.filter(pk__in=cable_ids).values_list('pk', 'status'))
+
+        device_ids = set()
+        circuit_termination_ids = set()
+        cable_terminations = CableTermination.objects.filter(cable_id__in=cable_ids).order_by(
+            'cable_id', 'cable_end', 'pk'
+        ).values_list('pk', 'cable_id', 'cable_end', 'termination_type_id', 'termination_id', '_device_id')
+        for pk, cable_id, cable_end, termination_type_id, termination_id, device_id in cable_terminations:
+            self.cable_ends[(cable_id, cable_end)].append((pk, termination_type_id, termination_id))
+            self.terminations[(termination_type_id, termination_id)] = (cable_id, cable_end)
+            if termination_type_id in (self.frontport_type, self.rearport_type):
+                device_ids.add(device_id)
+            elif termination_type_id == self.circuittermination_type:
+                circuit_termination_ids.add(termination_id)
+
+        self.load_devices(device_ids)
+        if circuit_termination_ids:
+            self._load_circuit_terminations(circuit_termination_ids)
+
+    def load_terminations(self, termination_type_id, termination_ids):
+        """
+        Load the cables attached to the given termination objects.
+        """
+        from dcim.models import CableTermination
+
+        termination_ids = [
+            pk for pk in termination_ids if (termination_type_id, pk) not in self.terminations
+        ]
+        if termination_ids:
+            self.load_cables(
+                CableTermination.objects.filter(
+                    termination_type_id=termination_type_id,
+                    termination_id__in=termination_ids
+                ).values_list('cable_id', flat=True)
+            )
+
+    def load_devices(self, device_ids):
+        """
+        Load all front and rear ports belonging to the given devices. Ports are ranked according to their default
+        ordering within each device.
+        """
+        from dcim.models import FrontPort, RearPort
+
+        device_ids = set(device_ids) - self._loaded_devices
+        if not device_ids:
+            return
+        self._loaded_devices.update(device_ids)
+
+        rear_ports = RearPort.objects.filter(device_id__in=device_ids).order_by('device_id', '_name').values_list(
+            'pk', 'device_id', 'cable_id', 'positions'
+        )
+        for rank, (pk, device_id, cable_id, positions) in enumerate(rear_ports):
+            self.rear_ports[pk] = RearPortNode(device_id, rank, cable_id, positions)
+            self.links[(self.rearport_type, pk)] = cable_id
+
+        front_ports = FrontPort.objects.filter(device_id__in=device_ids).order_by('device_id', '_name').values_list(
+            'pk', 'device_id', 'cable_id', 'rear_port_id', 'rear_port_position'
+        )
+        for rank, (pk, device_id, cable_id, rear_port_id, rear_port_position) in enumerate(front_ports):
+            self.front_ports[pk] = FrontPortNode(device_id, rank, cable_id, rear_port_id, rear_port_position)
+            self.front_ports_by_position[(rear_port_id, rear_port_position)].append(pk)
+            self.links[(self.frontport_type, pk)] = cable_id
+
+    def _load_circuit_terminations(self, circuit_termination_ids):
+        """
+        Load both terminations of each circuit to which the given CircuitTerminations belong.
+        """
+        from circuits.models import CircuitTermination
+
+        circuits = CircuitTermination.objects.filter(pk__in=circuit_termination_ids).values('circuit_id')
+        circuit_terminations = CircuitTermination.objects.filter(circuit__in=circuits).values_list(
+            'pk', 'circuit_id', 'term_side', 'cable_id', 'site_id', 'provider_network_id'
+        )
+        for pk, circuit_id, term_side, cable_id, site_id, provider_network_id in circuit_terminations:
+            self.circuit_terminations[pk] = CircuitTerminationNode(
+                circuit_id, term_side, cable_id, site_id, provider_network_id
+            )
+            self.circuit_sides[(circuit_id, term_side)] = pk
+            self.links[(self.circuittermination_type, pk)] = cable_id
+
+    def _get_front_port(self, pk):
+        from dcim.models import FrontPort
+
+        if pk not in self.front_ports:
+            self.load_devices(FrontPort.objects.filter(pk=pk).values_list('device_id', flat=True))
+        return self.front_ports[pk]
+
+    def _get_rear_port(self, pk):
+        from dcim.models import RearPort
+
+        if pk not in self.rear_ports:
+            self.load_devices(RearPort.objects.filter(pk=pk).values_list('device_id', flat=True))
+        return self.rear_ports[pk]
+
+    def _get_circuit_termination(self, pk):
+        if pk not in self.circuit_terminations:
+            self._load_circuit_terminations([pk])
+        return self.circuit_terminations[pk]
+
+    def _get_front_ports(self, positions):
+        """
+        Return the IDs of all FrontPorts mapped to the given (rear port ID, position) pairs, in default order.
+        """
+        front_ports = set()
+        for rear_port_id, position in positions:
+            self._get_rear_port(rear_port_id)
+            front_ports.update(self.front_ports_by_position[(rear_port_id, position)])
+        return sorted(front_ports, key=lambda pk: self.front_ports[pk][:2])
+
+    #
+    # Tracing
+    #
+
+    def trace(self, terminations):
+        """
+        Return a new (unsaved) CablePath traced from the given termination objects, equivalent to the result of
+        CablePath.from_origin(). Returns None if the terminations are not connected.
+        """
+        from dcim.models import CablePath
+
+        if not terminations:
+            return None
+
+        # Wireless links are not represented in the graph; defer to the database trace
+        if any(t.cable_id is None and getattr(t, 'wireless_link_id', None) for t in terminations):
+            return CablePath.from_origin(terminations)
+
+        # Ensure all originating terminations are attached to the same link
+        if len(terminations) > 1:
+            assert all(t.cable_id == terminations[0].cable_id for t in terminations[1:])
+
+        origin_type = ContentType.objects.get_for_model(terminations[0]).pk
+        for t in terminations:
+            self.links[(origin_type, t.pk)] = t.cable_id
+        nodes = [(origin_type, t.pk) for t in terminations]
+
+        path = []
+        position_stack = []
+        is_complete = False
+        is_active = True
+        is_split = False
+
+        while nodes:
+
+            # Check for a split path (e.g. rear port fanning out to multiple front ports with
+            # different cables attached)
+            links = [self.links[node] for node in nodes]
+            if len(set(links)) > 1 and (position_stack and len(nodes) != len(position_stack[-1])):
+                is_split = True
+                break
+
+            # Step 1: Record the near-end termination object(s)
+            path.append([compile_path_node(*node) for node in nodes])
+
+            # Step 2: Determine the attached cables, if any
+            cable_ids = [cable_id for cable_id in links if cable_id is not None]
+            if not cable_ids:
+                if len(path) == 1:
+                    # If this is the start of the path and no cable exists, return None
+                    return None
+                # Otherwise, halt the trace if no cable exists
+                break
+
+            # Step 3: Record asymmetric paths as split
+            if len(cable_ids) < len(links):
+                is_complete = False
+                is_split = True
+
+            # Step 4: Record the cables, keeping them in order to allow for SVG rendering
+            cables = []
+            for cable_id in cable_ids:
+                if compile_path_node(self.cable_type, cable_id) not in cables:
+                    cables.append(compile_path_node(self.cable_type, cable_id))
+            path.append(cables)
+
+            # Step 5: Update the path status if a cable is not connected
+            self.load_cables(cable_ids)
+            if any(self.cables[cable_id] != LinkStatusChoices.STATUS_CONNECTED for cable_id in cable_ids):
+                is_active = False
+
+            # Step 6: Determine the far-end terminations
+            self.load_terminations(nodes[0][0], [pk for _, pk in nodes])
+            remote_ends = set()
+            for node in nodes:
+                if node in self.terminations:
+                    cable_id, cable_end = self.terminations[node]
+                    remote_ends.add((cable_id, 'A' if cable_end == 'B' else 'B'))
+            remote_terminations = [
+                (termination_type_id, termination_id)
+                for cable_id, cable_end in sorted(remote_ends)
+                for _, termination_type_id, termination_id in self.cable_ends[(cable_id, cable_end)]
+            ]
+
+            # Remote terminations must all be of the same type, otherwise return a split path
+            if any(t[0] != remote_terminations[0][0] for t in remote_terminations[1:]):
+                is_complete = False
+                is_split = True
+                break
+
+            # Step 7: Record the far-end termination object(s)
+            path.append([compile_path_node(*t) for t in remote_terminations])
+
+            # Step 8: Determine the "next hop" terminations, if applicable
+            if not remote_terminations:
+                break
+            remote_type = remote_terminations[0][0]
+            remote_ids = [pk for _, pk in remote_terminations]
+
+            if remote_type == self.frontport_type:
+                # Follow FrontPorts to their corresponding RearPorts
+                front_ports = [self._get_front_port(pk) for pk in remote_ids]
+                rear_port_ids = sorted(
+                    {fp.rear_port_id for fp in front_ports},
+                    key=lambda pk: self._get_rear_port(pk)[:2]
+                )
+                if len(rear_port_ids) > 1 or self.rear_ports[rear_port_ids[0]].positions > 1:
+                    position_stack.append([fp.rear_port_position for fp in front_ports])
+
+                nodes = [(self.rearport_type, pk) for pk in rear_port_ids]
+
+            elif remote_type == self.rearport_type:
+                rear_ports = [self._get_rear_port(pk) for pk in remote_ids]
+                if len(remote_ids) == 1 and rear_ports[0].positions == 1:
+                    front_port_ids = self._get_front_ports([(remote_ids[0], 1)])
+                # Obtain the individual front ports based on the termination and all positions
+                elif len(remote_ids) > 1 and position_stack:
+                    positions = position_stack.pop()
+
+                    # Ensure we have a number of positions equal to the amount of remote terminations
+                    assert len(remote_ids) == len(positions)
+
+                    front_port_ids = self._get_front_ports([(pk, positions.pop()) for pk in remote_ids])
+                # Obtain the individual front ports based on the termination and position
+                elif position_stack:
+                    front_port_ids = self._get_front_ports([
+                        (remote_ids[0], position) for position in position_stack.pop()
+                    ])
+                else:
+                    # No position indicated: path has split, so we stop at the RearPorts
+                    is_split = True
+                    break
+
+                nodes = [(self.frontport_type, pk) for pk in front_port_ids]
+
+            elif remote_type == self.circuittermination_type:
+                # Follow a CircuitTermination to its corresponding CircuitTermination (A to Z or vice versa)
+                if len(remote_ids) > 1:
+                    is_split = True
+                    break
+                termination = self._get_circuit_termination(remote_ids[0])
+                peer_id = self.circuit_sides.get(
+                    (termination.circuit_id, 'Z' if termination.term_side == 'A' else 'A')
+                )
+                if peer_id is None:
+                    break
+                peer = self.circuit_terminations[peer_id]
+                if peer.provider_network_id:
+                    # Circuit terminates to a ProviderNetwork
+                    path.extend([
+                        [compile_path_node(self.circuittermination_type, peer_id)],
+                        [compile_path_node(self.providernetwork_type, peer.provider_network_id)],
+                    ])
+                    is_complete = True
+                    break
+                elif peer.site_id and not peer.cable_id:
+                    # Circuit terminates to a Site
+                    path.extend([
+                        [compile_path_node(self.circuittermination_type, peer_id)],
+                        [compile_path_node(self.site_type, peer.site_id)],
+                    ])
+                    break
+
+                nodes = [(self.circuittermination_type, peer_id)]
+
+            else:
+                # All remote terminations are endpoints of the same type
+                is_complete = True
+                break
+
+        return CablePath(
+            path=path,
+            is_complete=is_complete,
+            is_active=is_active,
+            is_split=is_split
+        )
+
+    def trace_all(self, origins):
+        """
+        Trace a path from each of the given origin objects (each a PathEndpoint), yielding two-tuples of the origin
+        and its (unsaved) CablePath or None.
+        """
+        for origin in origins:
+            yield origin, self.trace([origin])
@@ -1,10 +1,15 @@
-from django.core.management.base import BaseCommand
+import itertools
+import multiprocessing
+from concurrent.futures import as_completed, ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
 from django.core.management.color import no_style
-from django.db import connection
-from django.db.models import Q
+from django.db import connection, connections, transaction
+from django.db.models import Max, Min, Q
 
+from dcim.graph import CableGraph
 from dcim.models import CablePath, ConsolePort, ConsoleServerPort, Interface, PowerFeed, PowerOutlet, PowerPort
-from dcim.signals import create_cablepath
+from dcim.utils import cablepath_changed
 
 ENDPOINT_MODELS = (
     ConsolePort,
@@ -15,6 +20,89 @@ ENDPOINT_MODELS = (
     PowerPort
 )
 
+# The span of primary keys assigned to each unit of work when tracing in parallel
+CHUNK_SIZE = 10000
+
+
+def get_origins(model, force=False):
+    """
+    Return all cabled origins of the given model (or only those without a path, if not forcing recalculation).
+    """
+    params = Q(cable__isnull=False)
+    if hasattr(model, 'wireless_link'):
+        params |= Q(wireless_link__isnull=False)
+    origins = model.objects.filter(params)
+    if not force:
+        origins = origins.filter(_path__isnull=True)
+    return origins
+
+
+def save_paths(model, traced):
+    """
+    Write a batch of newly traced CablePaths to the database and assign each to its origin.
+
+    :param model: The model of the origin objects
+    :param traced: List of (origin, CablePath) two-tuples
+    """
+    # bulk_create() bypasses CablePath.save(), so populate the flattened nodes list here
+    cablepaths = []
+    for origin, cablepath in traced:
+        cablepath._nodes = list(itertools.chain(*cablepath.path))
+        cablepaths.append(cablepath)
+
+    with transaction.atomic():
+        CablePath.objects.bulk_create(cablepaths)
+        origins = []
+        for origin, cablepath in traced:
+            origin._path = cablepath
+            origins.append(origin)
+        model.objects.bulk_update(origins, ['_path'])
+
+
+def trace_chunk(model, force=False, dry_run=False, batch_size=1000, pk_range=None, progress=None):
+    """
+    Trace paths from all cabled origins of the given model (optionally limited to an inclusive range of primary keys).
+    Returns a tuple of the number of origins traced and a list of (origin ID, action) two-tuples for each path which was
+    (or, in dry-run mode, would be) changed. If specified, `progress` is called with the number of origins traced so
+    far upon the completion of each batch.
+    """
+    origins = get_origins(model, force).order_by('pk')
+    if pk_range:
+        origins = origins.filter(pk__gte=pk_range[0], pk__lte=pk_range[1])
+    count = 0
+    changes = []
+
+    origins = origins.iterator(chunk_size=batch_size)
+    while batch := list(itertools.islice(origins, batch_size)):
+        count += len(batch)
+
+        # Load a new graph for each batch, so that memory usage remains bounded
+        graph = CableGraph()
+        graph.load_cables(origin.cable_id for origin in batch if origin.cable_id)
+        traced = [(origin, graph.trace([origin])) for origin in batch]
+
+        if dry_run:
+            existing = CablePath.objects.in_bulk([origin._path_id for origin in batch if origin._path_id])
+            for origin, cablepath in traced:
+                current = existing.get(origin._path_id)
+                if cablepath_changed(cablepath, current):
+                    if current is None:
+                        changes.append((origin.pk, 'create'))
+                    elif cablepath is None:
+                        changes.append((origin.pk, 'delete'))
+                    else:
+                        changes.append((origin.pk, 'update'))
+        else:
+            traced = [(origin, cablepath) for origin, cablepath in traced if cablepath is not None]
+            if traced:
+                save_paths(model, traced)
+            changes.extend((origin.pk, 'create') for origin, _ in traced)
+
+        if progress is not None:
+            progress(count)
+
+    return count, changes
+
 
 class Command(BaseCommand):
     help = "Generate any missing cable paths among all cable termination objects in NetBox"
@@ -28,6 +116,18 @@ class Command(BaseCommand):
             "--no-input", action='store_true', dest='no_input',
             help="Do not prompt user for any input/confirmation"
         )
+        parser.add_argument(
+            "--dry-run", action='store_true', dest='dry_run',
+            help="Report the paths which would be created or changed without saving them"
+        )
+        parser.add_argument(
+            "--workers", type=int, default=1,
+            help="Number of worker processes across which origins are divided by primary key range"
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=1000, dest='batch_size',
+            help="Number of paths to write to the database at once"
+        )
 
     def draw_progress_bar(self, percentage):
         """
@@ -36,10 +136,52 @@ class Command(BaseCommand):
         bar_size = int(percentage / 5)
         self.stdout.write(f"\r  [{'#' * bar_size}{' ' * (20-bar_size)}] {int(percentage)}%", ending='')
 
+    def _get_chunks(self, model, force):
+        """
+        Divide the origins of a model into ranges of primary keys for parallel processing.
+        """
+        pk_bounds = get_origins(model, force).aggregate(Min('pk'), Max('pk'))
+        if pk_bounds['pk__min'] is None:
+            return []
+        return [
+            (start, start + CHUNK_SIZE - 1)
+            for start in range(pk_bounds['pk__min'], pk_bounds['pk__max'] + 1, CHUNK_SIZE)
+        ]
+
+    def _trace_parallel(self, model, options):
+        """
+        Trace paths for a model using a pool of worker processes.
+        """
+        chunks = self._get_chunks(model, options['force'])
+
+        # Close any open database connections so that they are not shared with forked workers
+        connections.close_all()
+
+        count = 0
+        changes = []
+        mp_context = multiprocessing.get_context('fork')
+        with ProcessPoolExecutor(max_workers=options['workers'], mp_context=mp_context) as executor:
+            futures = [
+                executor.submit(
+                    trace_chunk, model, options['force'], options['dry_run'], options['batch_size'], pk_range
+                ) for pk_range in chunks
+            ]
+            for i, future in enumerate(as_completed(futures), start=1):
+                chunk_count, chunk_changes = future.result()
+                count += chunk_count
+                changes.extend(chunk_changes)
+                self.draw_progress_bar(i * 100 / len(futures))
+
+        return count, changes
+
     def handle(self, *model_names, **options):
+        if options['workers'] < 1:
+            raise CommandError("The number of workers must be at least 1.")
+        if options['batch_size'] < 1:
+            raise CommandError("The batch size must be at least 1.")
 
-        # If --force was passed, first delete all existing CablePaths
-        if options['force']:
+        # If --force was passed, first delete all existing CablePaths (unless this is a dry run)
+        if options['force'] and not options['dry_run']:
             cable_paths = CablePath.objects.all()
             paths_count = cable_paths.count()
 
@@ -66,25 +208,35 @@ class Command(BaseCommand):
                 for sql in sequence_sql:
                     cursor.execute(sql)
 
+            # All origins now lack a path; trace only those with a cable attached
+            options = {**options, 'force': False}
+
         # Retrace paths
         for model in ENDPOINT_MODELS:
-            params = Q(cable__isnull=False)
-            if hasattr(model, 'wireless_link'):
-                params |= Q(wireless_link__isnull=False)
-            origins = model.objects.filter(params)
-            if not options['force']:
-                origins = origins.filter(_path__isnull=True)
-            origins_count = origins.count()
+            origins_count = get_origins(model, options['force']).count()
             if not origins_count:
                 self.stdout.write(f'Found no missing {model._meta.verbose_name} paths; skipping')
                 continue
             self.stdout.write(f'Retracing {origins_count} cabled {model._meta.verbose_name_plural}...')
-            i = 0
-            for i, obj in enumerate(origins, start=1):
-                create_cablepath([obj])
-                if not i % 100:
-                    self.draw_progress_bar(i * 100 / origins_count)
+
+            if options['workers'] > 1:
+                count, changes = self._trace_parallel(model, options)
+            else:
+                count, changes = trace_chunk(
+                    model, options['force'], options['dry_run'], options['batch_size'],
+                    progress=lambda traced: self.draw_progress_bar(min(traced * 100 / origins_count, 100))
+                )
             self.draw_progress_bar(100)
-            self.stdout.write(self.style.SUCCESS(f'\n  Retraced {i} {model._meta.verbose_name_plural}'))
+
+            if options['dry_run']:
+                self.stdout.write(self.style.WARNING(
+                    f'\n  {len(changes)} of {count} {model._meta.verbose_name_plural} would have their paths changed'
+                ))
+                for pk, action in sorted(changes):
+                    self.stdout.write(f'    {model._meta.verbose_name} {pk}: path would be {action}d')
+            else:
+                self.stdout.write(self.style.SUCCESS(
+                    f'\n  Retraced {count} {model._meta.verbose_name_plural} ({len(changes)} paths created)'
+                ))
 
         self.stdout.write(self.style.SUCCESS('Finished.'))
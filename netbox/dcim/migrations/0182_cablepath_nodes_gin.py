@@ -0,0 +1,22 @@
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # Build the index concurrently to avoid locking the cable path table on large installations
+    atomic = False
+
+    dependencies = [
+        ('dcim', '0181_rename_device_role_device_role'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='cablepath',
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=('_nodes',),
+                name='dcim_cablepath_nodes'
+            ),
+        ),
+    ]
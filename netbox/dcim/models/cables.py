@@ -3,6 +3,7 @@ from collections import defaultdict
 
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
+from django.contrib.postgres.indexes import GinIndex
 from django.core.exceptions import ValidationError
 from django.db import models
 from django.db.models import Sum
@@ -443,6 +444,10 @@ class CablePath(models.Model):
     _nodes = PathField()
 
     class Meta:
+        indexes = (
+            # Supports containment (_nodes__contains) and overlap (_nodes__overlap) lookups
+            GinIndex(fields=('_nodes',), name='dcim_cablepath_nodes'),
+        )
         verbose_name = _('cable path')
         verbose_name_plural = _('cable paths')
 
@@ -1,14 +1,19 @@
 import logging
 
+from django.conf import settings
 from django.db.models.signals import post_save, post_delete, pre_delete
 from django.dispatch import receiver
 
 from .choices import CableEndChoices, LinkStatusChoices
 from .models import (
-    Cable, CablePath, CableTermination, Device, FrontPort, PathEndpoint, PowerPanel, Rack, Location, VirtualChassis,
+    Cable, CablePath, CableTermination, Device, FrontPort, PathEndpoint, PowerPanel, Rack, RearPort, Location,
+    VirtualChassis,
 )
 from .models.cables import trace_paths
-from .utils import create_cablepath, rebuild_paths
+from .utils import (
+    compile_path_node, create_cablepath, deferred_paths, invalidate_cached_traces, invalidate_cached_traces_for_nodes,
+    object_to_path_node, rebuild_paths, retrace_paths,
+)
 
 
 #
@@ -81,8 +86,17 @@ def update_connected_endpoints(instance, created, raw=False, **kwargs):
         logger.debug(f"Skipping endpoint updates for imported cable {instance}")
         return
 
+    # Discard any cached traces which include the Cable, as its attributes (e.g. label or color) may have changed
+    if not created:
+        invalidate_cached_traces(CablePath.objects.filter(_nodes__contains=instance).values_list('pk', flat=True))
+
+    queue = deferred_paths.get()
+
     # Update cable paths if new terminations have been set
-    if instance._terminations_modified:
+    if instance._terminations_modified and queue is not None:
+        logger.debug(f"Deferring path tracing for cable {instance}")
+        queue['cables'].add(instance.pk)
+    elif instance._terminations_modified:
         a_terminations = []
         b_terminations = []
         for t in instance.terminations.all():
@@ -103,6 +117,8 @@ def update_connected_endpoints(instance, created, raw=False, **kwargs):
     elif instance.status != instance._orig_status:
         if instance.status != LinkStatusChoices.STATUS_CONNECTED:
             CablePath.objects.filter(_nodes__contains=instance).update(is_active=False)
+        elif queue is not None:
+            queue['nodes'].add(object_to_path_node(instance))
         else:
             rebuild_paths([instance])
 
@@ -112,8 +128,10 @@ def retrace_cable_paths(instance, **kwargs):
     """
     When a Cable is deleted, check for and update its connected endpoints
     """
-    for cablepath in CablePath.objects.filter(_nodes__contains=instance):
-        cablepath.retrace()
+    if queue := deferred_paths.get():
+        queue['nodes'].add(object_to_path_node(instance))
+        return
+    retrace_paths(CablePath.objects.filter(_nodes__contains=instance))
 
 
 @receiver(post_delete, sender=CableTermination)
@@ -124,11 +142,11 @@ def nullify_connected_endpoints(instance, **kwargs):
     model = instance.termination_type.model_class()
     model.objects.filter(pk=instance.termination_id).update(cable=None, cable_end='')
 
-    for cablepath in CablePath.objects.filter(_nodes__contains=instance.cable):
-        # Remove the deleted CableTermination if it's one of the path's originating nodes
-        if instance.termination in cablepath.origins:
-            cablepath.origins.remove(instance.termination)
-        cablepath.retrace()
+    # The deleted CableTermination is disregarded as an originating node, as it no longer has a cable attached
+    if queue := deferred_paths.get():
+        queue['nodes'].add(object_to_path_node(instance.cable))
+        return
+    retrace_paths(CablePath.objects.filter(_nodes__contains=instance.cable))
 
 
 @receiver(post_save, sender=FrontPort)
@@ -138,5 +156,38 @@ def extend_rearport_cable_paths(instance, created, raw, **kwargs):
     """
     if created and not raw:
         rearport = instance.rear_port
-        for cablepath in CablePath.objects.filter(_nodes__contains=rearport):
-            cablepath.retrace()
+        retrace_paths(CablePath.objects.filter(_nodes__contains=rearport))
+
+
+#
+# Cached cable traces
+#
+
+# Models (other than Cables) whose instances may appear as nodes within a CablePath
+PATH_NODE_MODELS = ('circuits.circuittermination', 'circuits.providernetwork', 'dcim.site')
+
+
+@receiver(post_save)
+def invalidate_cached_object_traces(sender, instance, created, raw=False, **kwargs):
+    """
+    Discard any cached traces which depict a modified object (e.g. a renamed interface or device).
+    """
+    if created or raw or not settings.CABLE_TRACE_CACHE_TIMEOUT:
+        return
+
+    # Path nodes
+    if isinstance(instance, (PathEndpoint, FrontPort, RearPort)) or instance._meta.label_lower in PATH_NODE_MODELS:
+        invalidate_cached_traces_for_nodes([object_to_path_node(instance)])
+
+    # Parents of path nodes, which are labeled in traces
+    elif isinstance(instance, Device):
+        invalidate_cached_traces_for_nodes([
+            compile_path_node(termination_type_id, termination_id)
+            for termination_type_id, termination_id in CableTermination.objects.filter(
+                _device=instance
+            ).values_list('termination_type_id', 'termination_id')
+        ])
+    elif instance._meta.label_lower == 'circuits.circuit':
+        invalidate_cached_traces_for_nodes([
+            object_to_path_node(termination) for termination in instance.terminations.all()
+        ])
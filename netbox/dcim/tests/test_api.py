@@ -1,3 +1,7 @@
+import io
+import json
+import tarfile
+
 from django.contrib.auth import get_user_model
 from django.test import override_settings
 from django.urls import reverse
@@ -6,6 +10,7 @@ from rest_framework import status
 from dcim.choices import *
 from dcim.constants import *
 from dcim.models import *
+from extras.models import ConfigTemplate
 from ipam.models import ASN, RIR, VLAN, VRF
 from netbox.api.serializers import GenericObjectSerializer
 from utilities.testing import APITestCase, APIViewTestCases, create_test_device
@@ -1265,6 +1270,33 @@ class DeviceTest(APIViewTestCases.APIViewTestCase):
 
         self.assertHttpStatus(response, status.HTTP_400_BAD_REQUEST)
 
+    def test_render_configs(self):
+        """
+        Check that the config templates for all devices matching a filter can be rendered at once.
+        """
+        config_template = ConfigTemplate.objects.create(
+            name='Config Template 1',
+            template_code='{{ device.name }}: {{ A }}{{ foo }}'
+        )
+        DeviceRole.objects.filter(slug='device-role-1').update(config_template=config_template)
+        Device.objects.filter(name='Device 3').update(role=DeviceRole.objects.get(slug='device-role-2'))
+
+        self.add_permissions('dcim.add_device')
+        url = reverse('dcim-api:device-render-configs') + '?site=site-1'
+        response = self.client.post(url, {'foo': 'X'}, format='json', **self.header)
+        self.assertHttpStatus(response, status.HTTP_200_OK)
+        records = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([record.get('content') for record in records], ['Device 1: 1X', 'Device 2: X', None])
+        self.assertEqual(records[0]['configtemplate']['id'], config_template.pk)
+        self.assertIn('error', records[2])
+
+        # Render the configs as an archive
+        response = self.client.post(f'{url}&archive=true', {}, format='json', **self.header)
+        self.assertHttpStatus(response, status.HTTP_200_OK)
+        with tarfile.open(fileobj=io.BytesIO(b''.join(response.streaming_content))) as archive:
+            self.assertEqual(len(archive.getnames()), 3)
+            self.assertIn('errors.ndjson', archive.getnames())
+
 
 class ModuleTest(APIViewTestCases.APIViewTestCase):
     model = Module
@@ -1990,6 +2022,22 @@ class CableTest(APIViewTestCases.APIViewTestCase):
             },
         ]
 
+    def test_paths(self):
+        """
+        Test retrieving the CablePaths which traverse a cable.
+        """
+        cable = Cable.objects.get(label='Cable 1')
+        self.add_permissions('dcim.view_cable')
+        url = reverse('dcim-api:cable-paths', kwargs={'pk': cable.pk})
+        response = self.client.get(url, **self.header)
+
+        self.assertHttpStatus(response, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 2)
+        self.assertEqual(
+            sorted(path['id'] for path in response.data),
+            sorted(CablePath.objects.filter(_nodes__contains=cable).values_list('pk', flat=True))
+        )
+
 
 class ConnectedDeviceTest(APITestCase):
 
@@ -2028,6 +2076,71 @@ class ConnectedDeviceTest(APITestCase):
         self.assertHttpStatus(response, status.HTTP_404_NOT_FOUND)
 
 
+class TopologyTest(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        sites = (
+            Site(name='Site 1', slug='site-1'),
+            Site(name='Site 2', slug='site-2'),
+        )
+        Site.objects.bulk_create(sites)
+        manufacturer = Manufacturer.objects.create(name='Manufacturer 1', slug='manufacturer-1')
+        devicetype = DeviceType.objects.create(manufacturer=manufacturer, model='Device Type 1', slug='device-type-1')
+        role = DeviceRole.objects.create(name='Device Role 1', slug='device-role-1', color='ff0000')
+        devices = (
+            Device(device_type=devicetype, role=role, name='Device 1', site=sites[0]),
+            Device(device_type=devicetype, role=role, name='Device 2', site=sites[0]),
+            Device(device_type=devicetype, role=role, name='Device 3', site=sites[1]),
+            Device(device_type=devicetype, role=role, name='Device 4', site=sites[1]),
+        )
+        Device.objects.bulk_create(devices)
+        interfaces = (
+            Interface(device=devices[0], name='eth0'),
+            Interface(device=devices[1], name='eth0'),
+            Interface(device=devices[2], name='eth0'),
+            Interface(device=devices[3], name='eth0'),
+        )
+        Interface.objects.bulk_create(interfaces)
+        rearport = RearPort.objects.create(device=devices[1], name='Rear Port 1', positions=1)
+        frontport = FrontPort.objects.create(
+            device=devices[1], name='Front Port 1', rear_port=rearport, rear_port_position=1
+        )
+
+        Cable(a_terminations=[interfaces[0]], b_terminations=[frontport]).save()
+        Cable(a_terminations=[rearport], b_terminations=[interfaces[1]]).save()
+        Cable(a_terminations=[interfaces[2]], b_terminations=[interfaces[3]]).save()
+
+    def test_missing_filter(self):
+        url = reverse('dcim-api:topology-list')
+        response = self.client.get(url, **self.header)
+        self.assertHttpStatus(response, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(EXEMPT_VIEW_PERMISSIONS=['*'])
+    def test_get_topology(self):
+        site = Site.objects.get(name='Site 1')
+        url = reverse('dcim-api:topology-list')
+        response = self.client.get(f'{url}?site_id={site.pk}', **self.header)
+        self.assertHttpStatus(response, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+
+        records = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        nodes = [r for r in records if r['type'] == 'node']
+        cables = [r for r in records if r['type'] == 'edge' and r['kind'] == 'cable']
+        port_mappings = [r for r in records if r['type'] == 'edge' and r['kind'] == 'port_mapping']
+        paths = [r for r in records if r['type'] == 'path']
+
+        self.assertEqual(len(nodes), 4)
+        self.assertEqual(len(cables), 2)
+        self.assertEqual(len(port_mappings), 1)
+        self.assertEqual(len(paths), 2)
+
+        # Every cable terminates to a node within the topology
+        node_ids = {node['id'] for node in nodes}
+        for cable in cables:
+            self.assertTrue(set(cable['a_terminations'] + cable['b_terminations']).issubset(node_ids))
+
+
 class VirtualChassisTest(APIViewTestCases.APIViewTestCase):
     model = VirtualChassis
     brief_fields = ['display', 'id', 'master', 'member_count', 'name', 'url']
@@ -1,10 +1,15 @@
-from django.test import TestCase
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import override_settings, TestCase, TransactionTestCase
 
 from circuits.models import *
 from dcim.choices import LinkStatusChoices
+from dcim.graph import CableGraph
 from dcim.models import *
 from dcim.svg import CableTraceSVG
-from dcim.utils import object_to_path_node
+from dcim.utils import cache_trace, deferred_tracing, get_cached_trace, object_to_path_node, rebuild_paths
 
 
 class CablePathTestCase(TestCase):
@@ -94,6 +99,20 @@ class CablePathTestCase(TestCase):
             msg = f"Path #{origin._path_id} set as origin on {origin}; should be None!"
         self.assertIsNone(origin._path_id, msg=msg)
 
+    def assertGraphTraceMatches(self):
+        """
+        Assert that tracing each existing CablePath from its origin(s) using CableGraph yields the same result as
+        CablePath.from_origin().
+        """
+        graph = CableGraph()
+        for cablepath in CablePath.objects.all():
+            expected = CablePath.from_origin(cablepath.origins)
+            traced = graph.trace(cablepath.origins)
+            self.assertEqual(traced.path, expected.path)
+            self.assertEqual(traced.is_active, expected.is_active)
+            self.assertEqual(traced.is_complete, expected.is_complete)
+            self.assertEqual(traced.is_split, expected.is_split)
+
     def test_101_interface_to_interface(self):
         """
         [IF1] --C1-- [IF2]
@@ -810,6 +829,7 @@ class CablePathTestCase(TestCase):
         # Check for four partial paths; one from each interface
         self.assertEqual(CablePath.objects.filter(is_complete=False).count(), 4)
         self.assertEqual(CablePath.objects.filter(is_complete=True).count(), 0)
+        self.assertGraphTraceMatches()
 
     def test_206_multiple_paths_via_multiple_pass_throughs(self):
         """
@@ -1040,6 +1060,7 @@ class CablePathTestCase(TestCase):
         # Check for four partial paths; one from each interface
         self.assertEqual(CablePath.objects.filter(is_complete=False).count(), 4)
         self.assertEqual(CablePath.objects.filter(is_complete=True).count(), 0)
+        self.assertGraphTraceMatches()
 
     def test_208_unidirectional_split_paths(self):
         """
@@ -1106,6 +1127,7 @@ class CablePathTestCase(TestCase):
             is_complete=False
         )
         self.assertEqual(CablePath.objects.count(), 2)
+        self.assertGraphTraceMatches()
 
     def test_209_rearport_without_frontport(self):
         """
@@ -1446,6 +1468,7 @@ class CablePathTestCase(TestCase):
         # Check for four partial paths; one from each interface
         self.assertEqual(CablePath.objects.filter(is_complete=False).count(), 4)
         self.assertEqual(CablePath.objects.filter(is_complete=True).count(), 0)
+        self.assertGraphTraceMatches()
 
     def test_216_interface_to_interface_via_multiple_circuits(self):
         """
@@ -1711,6 +1734,7 @@ class CablePathTestCase(TestCase):
         self.assertPathIsSet(interface2, path2)
         self.assertPathIsSet(interface3, path3)
         self.assertPathIsSet(interface4, path4)
+        self.assertGraphTraceMatches()
 
     def test_219_interface_to_interface_duplex_via_multiple_rearports(self):
         """
@@ -1876,6 +1900,7 @@ class CablePathTestCase(TestCase):
             is_active=True
         )
         self.assertEqual(CablePath.objects.count(), 3)
+        self.assertGraphTraceMatches()
 
     def test_221_non_symmetric_paths(self):
         """
@@ -1996,6 +2021,7 @@ class CablePathTestCase(TestCase):
             is_active=True
         )
         self.assertEqual(CablePath.objects.count(), 3)
+        self.assertGraphTraceMatches()
 
     def test_301_create_path_via_existing_cable(self):
         """
@@ -2148,6 +2174,199 @@ class CablePathTestCase(TestCase):
             is_active=True
         )
 
+    def test_304_retrace_existing_paths_in_place(self):
+        """
+        [IF1] --C1-- [FP1] [RP1] --C2-- [IF2]
+        [IF1] --C1-- [FP1] [RP1] --C3-- [IF3]
+        """
+        interface1 = Interface.objects.create(device=self.device, name='Interface 1')
+        interface2 = Interface.objects.create(device=self.device, name='Interface 2')
+        interface3 = Interface.objects.create(device=self.device, name='Interface 3')
+        rearport1 = RearPort.objects.create(device=self.device, name='Rear Port 1', positions=1)
+        frontport1 = FrontPort.objects.create(
+            device=self.device, name='Front Port 1', rear_port=rearport1, rear_port_position=1
+        )
+
+        # Create cables 1 and 2
+        cable1 = Cable(
+            a_terminations=[interface1],
+            b_terminations=[frontport1]
+        )
+        cable1.save()
+        cable2 = Cable(
+            a_terminations=[rearport1],
+            b_terminations=[interface2]
+        )
+        cable2.save()
+        path1 = self.assertPathExists(
+            (interface1, cable1, frontport1, rearport1, cable2, interface2),
+            is_complete=True,
+            is_active=True
+        )
+
+        # Rebuilding an unchanged path should leave it as-is
+        rebuild_paths([rearport1])
+        self.assertEqual(CablePath.objects.get(pk=path1.pk).path, path1.path)
+        self.assertEqual(CablePath.objects.count(), 2)
+
+        # Delete cable 2
+        cable2.delete()
+        self.assertPathExists(
+            (interface1, cable1, frontport1, rearport1),
+            is_complete=False,
+            pk=path1.pk
+        )
+        self.assertEqual(CablePath.objects.count(), 1)
+
+        # Create cable 3
+        cable3 = Cable(
+            a_terminations=[rearport1],
+            b_terminations=[interface3]
+        )
+        cable3.save()
+        self.assertPathExists(
+            (interface1, cable1, frontport1, rearport1, cable3, interface3),
+            is_complete=True,
+            is_active=True,
+            pk=path1.pk
+        )
+        self.assertEqual(CablePath.objects.count(), 2)
+        interface1.refresh_from_db()
+        self.assertPathIsSet(interface1, path1)
+
+    def test_305_deferred_tracing(self):
+        """
+        [IF1] --C1-- [FP1] [RP1] --C2-- [RP2] [FP2] --C3-- [IF2]
+        """
+        interface1 = Interface.objects.create(device=self.device, name='Interface 1')
+        interface2 = Interface.objects.create(device=self.device, name='Interface 2')
+        rearport1 = RearPort.objects.create(device=self.device, name='Rear Port 1', positions=1)
+        rearport2 = RearPort.objects.create(device=self.device, name='Rear Port 2', positions=1)
+        frontport1 = FrontPort.objects.create(
+            device=self.device, name='Front Port 1', rear_port=rearport1, rear_port_position=1
+        )
+        frontport2 = FrontPort.objects.create(
+            device=self.device, name='Front Port 2', rear_port=rearport2, rear_port_position=1
+        )
+
+        with deferred_tracing():
+            cable1 = Cable(
+                a_terminations=[interface1],
+                b_terminations=[frontport1]
+            )
+            cable1.save()
+            cable2 = Cable(
+                a_terminations=[rearport1],
+                b_terminations=[rearport2]
+            )
+            cable2.save()
+            cable3 = Cable(
+                a_terminations=[frontport2],
+                b_terminations=[interface2]
+            )
+            cable3.save()
+
+            # No paths should be traced until the context is exited
+            self.assertEqual(CablePath.objects.count(), 0)
+
+        path1 = self.assertPathExists(
+            (interface1, cable1, frontport1, rearport1, cable2, rearport2, frontport2, cable3, interface2),
+            is_complete=True,
+            is_active=True
+        )
+        path2 = self.assertPathExists(
+            (interface2, cable3, frontport2, rearport2, cable2, rearport1, frontport1, cable1, interface1),
+            is_complete=True,
+            is_active=True
+        )
+        self.assertEqual(CablePath.objects.count(), 2)
+        interface1.refresh_from_db()
+        interface2.refresh_from_db()
+        self.assertPathIsSet(interface1, path1)
+        self.assertPathIsSet(interface2, path2)
+
+        # Delete cable 2 within a deferred context
+        with deferred_tracing():
+            cable2.delete()
+            self.assertEqual(CablePath.objects.get(pk=path1.pk).path, path1.path)
+
+        self.assertPathExists(
+            (interface1, cable1, frontport1, rearport1),
+            is_complete=False,
+            pk=path1.pk
+        )
+        self.assertPathExists(
+            (interface2, cable3, frontport2, rearport2),
+            is_complete=False,
+            pk=path2.pk
+        )
+        self.assertEqual(CablePath.objects.count(), 2)
+
+        # Nothing should be traced if an exception is raised within the context
+        with self.assertRaises(RuntimeError):
+            with deferred_tracing():
+                Cable(a_terminations=[rearport1], b_terminations=[rearport2]).save()
+                raise RuntimeError
+        self.assertPathExists(
+            (interface1, cable1, frontport1, rearport1),
+            is_complete=False,
+            pk=path1.pk
+        )
+
+    @override_settings(CABLE_TRACE_CACHE_TIMEOUT=3600)
+    def test_306_cached_trace_invalidation(self):
+        """
+        [IF1] --C1-- [FP1] [RP1] --C2-- [IF2]
+        """
+        interface1 = Interface.objects.create(device=self.device, name='Interface 1')
+        interface2 = Interface.objects.create(device=self.device, name='Interface 2')
+        rearport1 = RearPort.objects.create(device=self.device, name='Rear Port 1', positions=1)
+        frontport1 = FrontPort.objects.create(
+            device=self.device, name='Front Port 1', rear_port=rearport1, rear_port_position=1
+        )
+        cable1 = Cable(
+            a_terminations=[interface1],
+            b_terminations=[frontport1]
+        )
+        cable1.save()
+        path1 = self.assertPathExists(
+            (interface1, cable1, frontport1, rearport1),
+            is_complete=False
+        )
+        cache_trace(path1, 'test', 'Trace 1')
+        self.assertEqual(get_cached_trace(path1, 'test'), 'Trace 1')
+
+        # Modifying a cable in the path should invalidate the cached trace
+        cable1.label = 'Cable 1'
+        cable1.save()
+        self.assertIsNone(get_cached_trace(path1, 'test'))
+
+        # A cached trace should not be returned once the path has changed
+        cache_trace(path1, 'test', 'Trace 1')
+        cable2 = Cable(
+            a_terminations=[rearport1],
+            b_terminations=[interface2]
+        )
+        cable2.save()
+        path1 = self.assertPathExists(
+            (interface1, cable1, frontport1, rearport1, cable2, interface2),
+            is_complete=True,
+            pk=path1.pk
+        )
+        self.assertIsNone(get_cached_trace(path1, 'test'))
+
+        # Renaming an object in the path should invalidate the cached trace
+        cache_trace(path1, 'test', 'Trace 1')
+        interface2.name = 'Interface 2A'
+        interface2.save()
+        self.assertIsNone(get_cached_trace(path1, 'test'))
+
+        # Renaming the parent Device of an object in the path should invalidate the cached trace
+        cache_trace(path1, 'test', 'Trace 1')
+        self.device.name = 'Test Device 2'
+        self.device.save()
+        self.assertIsNone(get_cached_trace(path1, 'test'))
+
     def test_401_exclude_midspan_devices(self):
         """
         [IF1] --C1-- [FP1][Test Device][RP1] --C2-- [RP2][Test Device][FP2] --C3-- [IF2]
@@ -2237,3 +2456,68 @@ class CablePathTestCase(TestCase):
             is_active=True
         )
         self.assertEqual(CablePath.objects.count(), 0)
+
+
+class TracePathsCommandTestCase(TransactionTestCase):
+    """
+    Test the trace_paths management command.
+    """
+    def setUp(self):
+        site = Site.objects.create(name='Site', slug='site')
+        manufacturer = Manufacturer.objects.create(name='Generic', slug='generic')
+        device_type = DeviceType.objects.create(manufacturer=manufacturer, model='Test Device')
+        role = DeviceRole.objects.create(name='Device Role', slug='device-role')
+        device = Device.objects.create(site=site, device_type=device_type, role=role, name='Test Device')
+
+        self.interfaces = [
+            Interface.objects.create(device=device, name=f'Interface {i}') for i in range(1, 7)
+        ]
+        for a, b in ((0, 1), (2, 3), (4, 5)):
+            Cable(a_terminations=[self.interfaces[a]], b_terminations=[self.interfaces[b]]).save()
+
+    def assertPathsTraced(self):
+        self.assertEqual(CablePath.objects.count(), len(self.interfaces))
+        for interface in self.interfaces:
+            interface.refresh_from_db()
+            self.assertIsNotNone(interface._path)
+            self.assertEqual(interface._path.origins, [interface])
+            self.assertTrue(interface._path.is_complete)
+
+    def test_dry_run(self):
+        CablePath.objects.filter(pk=self.interfaces[0]._path_id).delete()
+
+        stdout = StringIO()
+        call_command('trace_paths', dry_run=True, stdout=stdout)
+
+        # No path should have been created
+        self.assertEqual(CablePath.objects.count(), len(self.interfaces) - 1)
+        self.assertIn(f'interface {self.interfaces[0].pk}: path would be created', stdout.getvalue())
+
+        # Forcing a dry run should report no changes for correctly traced paths
+        stdout = StringIO()
+        call_command('trace_paths', force=True, dry_run=True, stdout=stdout)
+        self.assertIn('1 of 6 interfaces would have their paths changed', stdout.getvalue())
+        self.assertEqual(CablePath.objects.count(), len(self.interfaces) - 1)
+
+    def test_batches(self):
+        CablePath.objects.all().delete()
+
+        stdout = StringIO()
+        call_command('trace_paths', batch_size=4, stdout=stdout)
+
+        self.assertPathsTraced()
+        # Progress is reported upon the completion of each batch
+        self.assertIn('] 66%', stdout.getvalue())
+
+    @patch('dcim.management.commands.trace_paths.CHUNK_SIZE', 2)
+    def test_workers(self):
+        CablePath.objects.all().delete()
+
+        call_command('trace_paths', workers=2, batch_size=1, stdout=StringIO())
+
+        self.assertPathsTraced()
+
+        # Forcing recalculation should replace all paths
+        call_command('trace_paths', workers=2, force=True, no_input=True, stdout=StringIO())
+
+        self.assertPathsTraced()
@@ -1,8 +1,18 @@
+import hashlib
 import itertools
+import json
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
 
+from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
 from django.db import transaction
 
+# Cables and path nodes queued for tracing by deferred_tracing()
+deferred_paths = ContextVar('deferred_paths', default=None)
+
 
 def compile_path_node(ct_id, object_id):
     return f'{ct_id}:{object_id}'
@@ -32,6 +42,68 @@ def path_node_to_object(repr):
     return ct.model_class().objects.filter(pk=object_id).first()
 
 
+def cablepath_hash(cablepath):
+    """
+    Return a digest of a CablePath's content, which changes whenever the path is retraced to a different result.
+    """
+    content = [cablepath.path, cablepath.is_active, cablepath.is_complete, cablepath.is_split]
+    return hashlib.sha256(json.dumps(content).encode('utf-8')).hexdigest()
+
+
+def get_cached_trace(cablepath, variant):
+    """
+    Return a cached rendering of the trace for the given CablePath, or None if none has been cached or the path has
+    changed since.
+
+    :param cablepath: The CablePath traced from the origin object
+    :param variant: A string identifying the rendering (e.g. an SVG of a certain width)
+    """
+    if not settings.CABLE_TRACE_CACHE_TIMEOUT:
+        return None
+    entry = cache.get(f'dcim.cabletrace.{cablepath.pk}')
+    if entry and entry['hash'] == cablepath_hash(cablepath):
+        return entry['variants'].get(variant)
+
+
+def cache_trace(cablepath, variant, data):
+    """
+    Cache a rendering of the trace for the given CablePath. All renderings of a path are stored in a single cache entry
+    keyed by the CablePath's ID, along with the path's content hash.
+    """
+    if not settings.CABLE_TRACE_CACHE_TIMEOUT:
+        return
+    key = f'dcim.cabletrace.{cablepath.pk}'
+    digest = cablepath_hash(cablepath)
+    entry = cache.get(key)
+    if not entry or entry['hash'] != digest:
+        entry = {
+            'hash': digest,
+            'variants': {},
+        }
+    entry['variants'][variant] = data
+    cache.set(key, entry, settings.CABLE_TRACE_CACHE_TIMEOUT)
+
+
+def invalidate_cached_traces(cablepath_ids):
+    """
+    Discard the cached traces of the specified CablePaths.
+    """
+    if settings.CABLE_TRACE_CACHE_TIMEOUT:
+        cache.delete_many([f'dcim.cabletrace.{pk}' for pk in cablepath_ids])
+
+
+def invalidate_cached_traces_for_nodes(nodes):
+    """
+    Discard the cached traces of all CablePaths which traverse any of the specified path nodes.
+    """
+    from dcim.models import CablePath
+
+    if settings.CABLE_TRACE_CACHE_TIMEOUT and nodes:
+        invalidate_cached_traces(
+            CablePath.objects.filter(_nodes__overlap=list(nodes)).values_list('pk', flat=True)
+        )
+
+
 def create_cablepath(terminations):
     """
     Create CablePaths for all paths originating from the specified set of nodes.
@@ -45,16 +117,136 @@ def create_cablepath(terminations):
         cp.save()
 
 
+def cablepath_changed(cablepath, existing):
+    """
+    Return True if a newly traced CablePath (or None) differs from an existing CablePath (or None).
+    """
+    if cablepath is None or existing is None:
+        return cablepath is not existing
+    return any(
+        getattr(cablepath, attr) != getattr(existing, attr)
+        for attr in ('path', 'is_active', 'is_complete', 'is_split')
+    )
+
+
+def retrace_paths(cable_paths):
+    """
+    Retrace the specified CablePaths in place. All paths are traced against a common CableGraph, so that cables and
+    ports shared among them are loaded only once. A CablePath is saved only if its result has changed, and is deleted
+    if it can no longer be traced.
+
+    :param cable_paths: Iterable of CablePath instances
+    """
+    from dcim.graph import CableGraph
+
+    cable_paths = list(cable_paths)
+    if not cable_paths:
+        return
+    invalidate_cached_traces([cablepath.pk for cablepath in cable_paths])
+
+    # Fetch the originating terminations of all paths in bulk
+    origin_ids = defaultdict(set)
+    for cablepath in cable_paths:
+        for node in cablepath.path[0]:
+            ct_id, object_id = decompile_path_node(node)
+            origin_ids[ct_id].add(object_id)
+    origins = {}
+    for ct_id, object_ids in origin_ids.items():
+        model = ContentType.objects.get_for_id(ct_id).model_class()
+        for obj in model.objects.filter(pk__in=object_ids):
+            origins[(ct_id, obj.pk)] = obj
+
+    graph = CableGraph()
+    with transaction.atomic():
+        for cablepath in cable_paths:
+            # Disregard any originating terminations which have since been deleted or disconnected
+            terminations = [
+                origins[node] for node in map(decompile_path_node, cablepath.path[0])
+                if node in origins and (origins[node].cable_id or getattr(origins[node], 'wireless_link_id', None))
+            ]
+            _new = graph.trace(terminations)
+            if _new is None:
+                cablepath.delete()
+            elif cablepath_changed(_new, cablepath):
+                cablepath.path = _new.path
+                cablepath.is_complete = _new.is_complete
+                cablepath.is_active = _new.is_active
+                cablepath.is_split = _new.is_split
+                cablepath.save()
+
+
 def rebuild_paths(terminations):
     """
     Rebuild all CablePaths which traverse the specified nodes.
     """
     from dcim.models import CablePath
 
-    for obj in terminations:
-        cable_paths = CablePath.objects.filter(_nodes__contains=obj)
+    cable_paths = CablePath.objects.filter(
+        _nodes__overlap=[object_to_path_node(obj) for obj in terminations]
+    ).order_by('pk')
+    retrace_paths(cable_paths)
 
-        with transaction.atomic():
-            for cp in cable_paths:
-                cp.delete()
-                create_cablepath(cp.origins)
+
+def trace_deferred_paths(cable_ids, nodes):
+    """
+    Trace all CablePaths affected by a batch of cable changes. New CablePaths are created from the path endpoints of
+    each Cable, and any existing CablePaths which traverse a modified Cable's pass-through terminations, or any of the
+    given nodes, are retraced once each.
+
+    :param cable_ids: Iterable of IDs of Cables whose terminations have been modified
+    :param nodes: Iterable of path nodes (see object_to_path_node()) whose CablePaths should be retraced
+    """
+    from dcim.choices import CableEndChoices
+    from dcim.graph import CableGraph
+    from dcim.models import Cable, CablePath, PathEndpoint
+
+    nodes = set(nodes)
+    created = []
+    graph = CableGraph.for_cables(cable_ids)
+    with transaction.atomic():
+        # Cables may have been deleted after being queued
+        cables = Cable.objects.filter(pk__in=cable_ids).prefetch_related('terminations__termination')
+        for cable in cables:
+            for cable_end in (CableEndChoices.SIDE_A, CableEndChoices.SIDE_B):
+                terminations = [t.termination for t in cable.terminations.all() if t.cable_end == cable_end]
+                if not terminations:
+                    continue
+                # Examine type of first termination to determine object type (all must be the same)
+                if isinstance(terminations[0], PathEndpoint):
+                    cablepath = graph.trace(terminations)
+                    if cablepath:
+                        cablepath.save()
+                        created.append(cablepath.pk)
+                else:
+                    nodes.update(object_to_path_node(t) for t in terminations)
+
+        # Retrace existing paths, skipping those just created from the current state of the graph
+        if nodes:
+            retrace_paths(
+                CablePath.objects.filter(_nodes__overlap=list(nodes)).exclude(pk__in=created).order_by('pk')
+            )
+
+
+@contextmanager
+def deferred_tracing():
+    """
+    Defer the tracing of CablePaths for any Cables saved or deleted within the context. Affected Cables and path nodes
+    are collected, and a single deduplicated batch trace is run upon exiting the context. Nothing is traced if an
+    exception is raised. This should be used within a transaction (e.g. when importing cables in bulk), so that no
+    path is left untraced on commit. Nested contexts defer to the outermost one.
+    """
+    if deferred_paths.get() is not None:
+        yield
+        return
+
+    queue = {
+        'cables': set(),
+        'nodes': set(),
+    }
+    token = deferred_paths.set(queue)
+    try:
+        yield
+    finally:
+        deferred_paths.reset(token)
+
+    trace_deferred_paths(queue['cables'], queue['nodes'])
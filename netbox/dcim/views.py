@@ -31,6 +31,7 @@ from virtualization.models import VirtualMachine
 from . import filtersets, forms, tables
 from .choices import DeviceFaceChoices
 from .models import *
+from .utils import cache_trace, deferred_tracing, get_cached_trace
 
 CABLE_TERMINATION_TYPES = {
     'dcim.consoleport': ConsolePort,
@@ -190,7 +191,10 @@ class PathTraceView(generic.ObjectView):
             }
 
         # Get the total length of the cable and whether the length is definitive (fully defined)
-        total_length, is_definitive = path.get_total_length() if path else (None, False)
+        if (length := get_cached_trace(path, 'length')) is None:
+            length = path.get_total_length()
+            cache_trace(path, 'length', length)
+        total_length, is_definitive = length
 
         # Determine the path to the SVG trace image
         api_viewname = f"{path.origin_type.app_label}-api:{path.origin_type.model}-trace"
@@ -3258,6 +3262,11 @@ class CableBulkImportView(generic.BulkImportView):
     queryset = Cable.objects.all()
     model_form = forms.CableImportForm
 
+    def create_and_update_objects(self, form, request):
+        # Trace all affected cable paths once, after every cable has been saved
+        with deferred_tracing():
+            return super().create_and_update_objects(form, request)
+
 
 class CableBulkEditView(generic.BulkEditView):
     queryset = Cable.objects.prefetch_related(
@@ -1,10 +1,15 @@
+import json
+
+from django.http import StreamingHttpResponse
 from jinja2.exceptions import TemplateError
 from rest_framework.response import Response
 
+from extras.configtemplates import render_config_templates, stream_archive
 from .nested_serializers import NestedConfigTemplateSerializer
 
 __all__ = (
     'ConfigContextQuerySetMixin',
+    'ConfigTemplateRenderMixin',
 )
 
 
@@ -50,3 +55,23 @@ class ConfigTemplateRenderMixin:
             'configtemplate': template_serializer.data,
             'content': output
         })
+
+    def render_configtemplates(self, request, queryset, object_name):
+        """
+        Render the preferred ConfigTemplate for each object in the given queryset, streaming the results as
+        newline-delimited JSON or, if the "archive" query parameter is true, as a gzipped tar archive.
+        """
+        queryset = queryset.annotate_config_context_data().prefetch_related(
+            'config_template', 'role__config_template', 'platform__config_template'
+        )
+        records = render_config_templates(queryset, object_name, extra_context=request.data)
+
+        if request.query_params.get('archive', '').lower() in ('true', '1'):
+            response = StreamingHttpResponse(stream_archive(records), content_type='application/gzip')
+            response['Content-Disposition'] = f'attachment; filename="{object_name}-configs.tar.gz"'
+            return response
+
+        return StreamingHttpResponse(
+            (json.dumps(record) + '\n' for record in records),
+            content_type='application/x-ndjson'
+        )
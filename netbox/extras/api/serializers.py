@@ -73,8 +73,8 @@ class WebhookSerializer(NetBoxModelSerializer):
         fields = [
             'id', 'url', 'display', 'content_types', 'name', 'type_create', 'type_update', 'type_delete',
             'type_job_start', 'type_job_end', 'payload_url', 'enabled', 'http_method', 'http_content_type',
-            'additional_headers', 'body_template', 'secret', 'conditions', 'ssl_verification', 'ca_file_path',
-            'custom_fields', 'tags', 'created', 'last_updated',
+            'additional_headers', 'body_template', 'secret', 'batch_size', 'conditions', 'ssl_verification',
+            'ca_file_path', 'custom_fields', 'tags', 'created', 'last_updated',
         ]
 
 
@@ -592,6 +592,16 @@ class ObjectChangeSerializer(BaseModelSerializer):
     changed_object = serializers.SerializerMethodField(
         read_only=True
     )
+    prechange_data = serializers.JSONField(
+        source='get_prechange_data',
+        read_only=True,
+        allow_null=True
+    )
+    postchange_data = serializers.JSONField(
+        source='get_postchange_data',
+        read_only=True,
+        allow_null=True
+    )
 
     class Meta:
         model = ObjectChange
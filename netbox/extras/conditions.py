@@ -61,6 +61,14 @@ class Condition:
         self.eval_func = getattr(self, f'eval_{op}')
         self.negate = negate
 
+        # Split the attribute path and compile any regular expression ahead of evaluation
+        self.attr_path = attr.split('.')
+        if op == self.REGEX:
+            try:
+                self.pattern = re.compile(value)
+            except re.error as e:
+                raise ValueError(f"Invalid regular expression: {e}")
+
     def eval(self, data):
         """
         Evaluate the provided data to determine whether it matches the condition.
@@ -72,7 +80,7 @@ class Condition:
             return dict.get(obj, key)
 
         try:
-            value = functools.reduce(_get, self.attr.split('.'), data)
+            value = functools.reduce(_get, self.attr_path, data)
         except TypeError:
             # Invalid key path
             value = None
@@ -115,7 +123,7 @@ class Condition:
     # Regular expressions
 
     def eval_regex(self, value):
-        return re.match(self.value, value) is not None
+        return self.pattern.match(value) is not None
 
 
 class ConditionSet:
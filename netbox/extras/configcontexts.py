@@ -0,0 +1,381 @@
+import threading
+import time
+
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Q
+from django_pglocks import advisory_lock
+from django_rq import get_queue
+from mptt.models import MPTTModel
+
+from netbox.constants import ADVISORY_LOCK_KEYS, RQ_QUEUE_LOW
+from .models import CachedConfigContext, ConfigContext
+
+__all__ = (
+    'ConfigContextIndex',
+    'get_config_context_index',
+    'invalidate_config_context_index',
+    'invalidate_cached_config_contexts',
+    'invalidate_for_instance',
+    'invalidate_for_m2m_change',
+    'refresh_cached_config_contexts',
+)
+
+# Models to which config contexts apply
+CONFIG_CONTEXT_MODELS = ('dcim.device', 'virtualization.virtualmachine')
+
+# Models which are referenced by ConfigContext assignments, mapped to the lookups relating each model to which config
+# contexts apply to an instance. A change to any of these objects invalidates the cached config context data of its
+# related objects. (For a hierarchical model, the objects related to its descendants are included.)
+DEPENDENCIES = {
+    'dcim.location': {
+        'dcim.device': ('location',),
+    },
+    'dcim.rack': {
+        'dcim.device': ('rack',),
+    },
+    'dcim.site': {
+        'dcim.device': ('site',),
+        'virtualization.virtualmachine': ('site', 'cluster__site'),
+    },
+    'virtualization.cluster': {
+        'virtualization.virtualmachine': ('cluster',),
+    },
+    'tenancy.tenant': {
+        'dcim.device': ('tenant',),
+        'virtualization.virtualmachine': ('tenant',),
+    },
+}
+
+# Models a change to which invalidates all cached config context data (e.g. because it may affect a hierarchy)
+GLOBAL_DEPENDENCIES = ('extras.configcontext', 'dcim.region', 'dcim.sitegroup')
+
+# Models the deletion of which invalidates all cached config context data (because assignments are removed)
+DELETION_DEPENDENCIES = (
+    'dcim.location', 'dcim.platform', 'extras.tag', 'tenancy.tenantgroup', 'virtualization.clustergroup',
+    'virtualization.clustertype',
+)
+
+# Objects pending the recomputation of their config context data, mapped by model
+_pending = threading.local()
+
+# The number of objects for which config context data is computed per query
+CHUNK_SIZE = 1000
+
+# ConfigContext assignment fields
+ASSIGNMENT_FIELDS = (
+    'regions', 'site_groups', 'sites', 'locations', 'device_types', 'roles', 'platforms', 'cluster_types',
+    'cluster_groups', 'clusters', 'tenant_groups', 'tenants', 'tags',
+)
+
+# Models which may be assigned to ConfigContexts. The deletion of any of these objects removes its assignments without
+# sending m2m_changed, so it invalidates the ConfigContextIndex.
+ASSIGNMENT_MODELS = (
+    'dcim.region', 'dcim.sitegroup', 'dcim.site', 'dcim.location', 'dcim.devicetype', 'dcim.devicerole',
+    'dcim.platform', 'virtualization.clustertype', 'virtualization.clustergroup', 'virtualization.cluster',
+    'tenancy.tenantgroup', 'tenancy.tenant', 'extras.tag',
+)
+
+# The cache key holding a counter which is incremented whenever ConfigContext assignments change
+INDEX_VERSION_KEY = 'config_context_index_version'
+
+# The cache key holding a counter which is incremented whenever the invalidation of cached config context data has been
+# committed
+GENERATION_KEY = 'cached_config_context_generation'
+
+# The number of times the data for a chunk of objects is recomputed if invalidated while being computed
+REFRESH_ATTEMPTS = 3
+
+# The ConfigContextIndex for this process
+_index = None
+
+# Callbacks scheduled by invalidate_config_context_index() to run once the current transaction has been committed
+_pending_bumps = threading.local()
+
+
+class ConfigContextIndex:
+    """
+    An in-memory representation of all active ConfigContexts and their assignments, used to determine the
+    ConfigContexts applicable to an object without querying the database for them.
+    """
+    def __init__(self, version=None):
+        self.version = version
+
+        # Active ConfigContexts, ordered by weight and name
+        self.contexts = list(
+            ConfigContext.objects.filter(is_active=True).order_by('weight', 'name').values_list('pk', 'data')
+        )
+
+        # Map each ConfigContext to the set of assigned object IDs for each type of assignment
+        self.assignments = {pk: {} for pk, _ in self.contexts}
+        for field_name in ASSIGNMENT_FIELDS:
+            field = ConfigContext._meta.get_field(field_name)
+            through = field.remote_field.through.objects.filter(
+                **{f'{field.m2m_field_name()}__is_active': True}
+            ).values_list(field.m2m_column_name(), field.m2m_reverse_name())
+            for context_id, object_id in through:
+                self.assignments[context_id].setdefault(field_name, set()).add(object_id)
+
+    @staticmethod
+    def get_object_attributes(obj):
+        """
+        Return a dictionary mapping each assignment field to the set of IDs which the given object matches.
+        """
+        def pks(*objects):
+            return {o.pk for o in objects if o is not None}
+
+        cluster = getattr(obj, 'cluster', None)
+        region = getattr(obj.site, 'region', None)
+        sitegroup = getattr(obj.site, 'group', None)
+
+        return {
+            'regions': pks(*region.get_ancestors(include_self=True)) if region else set(),
+            'site_groups': pks(*sitegroup.get_ancestors(include_self=True)) if sitegroup else set(),
+            'sites': pks(obj.site),
+            'locations': pks(getattr(obj, 'location', None)),
+            'device_types': pks(getattr(obj, 'device_type', None)),
+            'roles': pks(obj.role),
+            'platforms': pks(obj.platform),
+            'cluster_types': pks(getattr(cluster, 'type', None)),
+            'cluster_groups': pks(getattr(cluster, 'group', None)),
+            'clusters': pks(cluster),
+            'tenant_groups': pks(obj.tenant.group if obj.tenant else None),
+            'tenants': pks(obj.tenant),
+            'tags': set(obj.tags.values_list('pk', flat=True)),
+        }
+
+    def get_for_object(self, obj):
+        """
+        Return a list of (pk, data) tuples for each ConfigContext applicable to the given object, ordered by weight and
+        name. A ConfigContext applies if, for each type of assignment it has, the object matches at least one assigned
+        object.
+        """
+        attributes = self.get_object_attributes(obj)
+
+        return [
+            (pk, data) for pk, data in self.contexts
+            if all(
+                assigned & attributes[field_name]
+                for field_name, assigned in self.assignments[pk].items()
+            )
+        ]
+
+
+def get_index_version():
+    """
+    Return a value identifying the current state of all ConfigContexts and their assignments. This is a counter which
+    is incremented upon every change to them, so that the database need not be queried.
+    """
+    version = cache.get(INDEX_VERSION_KEY)
+    if version is None:
+        # Start a new counter, distinct from any value held by one which has been evicted
+        cache.add(INDEX_VERSION_KEY, time.time_ns(), None)
+        version = cache.get(INDEX_VERSION_KEY)
+
+    return version
+
+
+def _increment(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def get_generation():
+    """
+    Return the number of committed invalidations of cached config context data.
+    """
+    return cache.get(GENERATION_KEY, 0)
+
+
+def bump_index_version():
+    """
+    Signal all processes to rebuild their ConfigContextIndex.
+    """
+    _increment(INDEX_VERSION_KEY)
+
+
+def invalidate_config_context_index():
+    """
+    Signal all processes to rebuild their ConfigContextIndex, both now and once the current transaction has been
+    committed (in case an index has been rebuilt from uncommitted data in the meantime).
+    """
+    pending = getattr(_pending_bumps, 'callbacks', None)
+    if pending is None:
+        pending = _pending_bumps.callbacks = []
+
+    def on_commit():
+        if on_commit in pending:
+            pending.remove(on_commit)
+        bump_index_version()
+
+    bump_index_version()
+    pending.append(on_commit)
+    transaction.on_commit(on_commit)
+
+
+def get_config_context_index():
+    """
+    Return the ConfigContextIndex for this process, rebuilding it if ConfigContexts have changed since it was built.
+    """
+    global _index
+
+    # An index built within a transaction which has since been rolled back may reflect the discarded changes, and no
+    # callback will be run to signal its rebuild. Discard it if any change to ConfigContexts has been rolled back.
+    pending = getattr(_pending_bumps, 'callbacks', None)
+    if pending:
+        scheduled = {func for sids, func, robust in connection.run_on_commit}
+        if any(func not in scheduled for func in pending):
+            pending[:] = [func for func in pending if func in scheduled]
+            _index = None
+
+    version = get_index_version()
+    if _index is None or _index.version != version:
+        _index = ConfigContextIndex(version)
+
+    return _index
+
+
+def invalidate_cached_config_contexts(model_label=None, pks=None):
+    """
+    Delete the cached config context data for the specified objects (or all objects of the specified model, or all
+    objects if no model is specified), and schedule its recomputation once the current transaction has been committed.
+    """
+    queryset = CachedConfigContext.objects.all()
+    if model_label is not None:
+        queryset = queryset.filter(object_type=ContentType.objects.get_for_model(apps.get_model(model_label)))
+        if pks is not None:
+            queryset = queryset.filter(object_id__in=pks)
+    queryset._raw_delete(queryset.db)
+
+    # Record the objects to be refreshed (None indicates all objects)
+    pending = getattr(_pending, 'objects', None)
+    if pending is None:
+        pending = _pending.objects = {}
+    for label in ([model_label] if model_label else CONFIG_CONTEXT_MODELS):
+        if model_label is None or pks is None or pending.get(label, set()) is None:
+            pending[label] = None
+        else:
+            pending.setdefault(label, set()).update(pks)
+
+    transaction.on_commit(enqueue_pending_refreshes)
+
+
+def enqueue_pending_refreshes():
+    """
+    Enqueue a background job to recompute the config context data of all objects for which it has been invalidated.
+    """
+    pending = getattr(_pending, 'objects', None)
+    if not pending:
+        return
+    _pending.objects = {}
+
+    # Prevent any refresh already in progress from caching data computed before the invalidation was committed
+    _increment(GENERATION_KEY)
+
+    queue = get_queue(RQ_QUEUE_LOW)
+    for model_label, pks in pending.items():
+        queue.enqueue(
+            'extras.configcontexts.refresh_cached_config_contexts',
+            model_label=model_label,
+            pks=sorted(pks) if pks is not None else None
+        )
+
+
+def refresh_cached_config_contexts(model_label=None, pks=None):
+    """
+    Compute and cache the config context data for the specified objects (or all objects of the specified model, or all
+    objects to which config contexts apply). Return the number of objects updated. Data which is invalidated while
+    being computed is recomputed, up to REFRESH_ATTEMPTS times, and otherwise left to be resolved on demand.
+    """
+    count = 0
+
+    for label in ([model_label] if model_label else CONFIG_CONTEXT_MODELS):
+        model = apps.get_model(label)
+        content_type = ContentType.objects.get_for_model(model)
+        queryset = model.objects.order_by('pk')
+        if pks is not None:
+            queryset = queryset.filter(pk__in=pks)
+        object_ids = list(queryset.values_list('pk', flat=True))
+
+        for i in range(0, len(object_ids), CHUNK_SIZE):
+            for attempt in range(REFRESH_ATTEMPTS):
+                generation = get_generation()
+                results = model.objects.filter(
+                    pk__in=object_ids[i:i + CHUNK_SIZE]
+                ).annotate_config_context_data(cached=False).values_list('pk', 'config_context_data')
+
+                # Cache the data only if no invalidation has been committed since it was computed. (Otherwise, it may
+                # be stale; recompute it.) Writes are serialized, so that data cached by a refresh scheduled upon the
+                # invalidation cannot be overwritten by an earlier one.
+                with advisory_lock(ADVISORY_LOCK_KEYS['cached-config-contexts']):
+                    if get_generation() != generation:
+                        continue
+                    CachedConfigContext.objects.bulk_create(
+                        [
+                            CachedConfigContext(object_type=content_type, object_id=pk, data=data or [])
+                            for pk, data in results
+                        ],
+                        update_conflicts=True,
+                        unique_fields=('object_type', 'object_id'),
+                        update_fields=('data', 'timestamp')
+                    )
+                count += len(results)
+                break
+
+    return count
+
+
+def invalidate_for_instance(instance, deleted=False):
+    """
+    Invalidate any cached config context data which depends on the given object, which has been saved or deleted.
+    """
+    model_label = instance._meta.label_lower
+
+    if deleted and model_label in ASSIGNMENT_MODELS:
+        invalidate_config_context_index()
+
+    if model_label in CONFIG_CONTEXT_MODELS:
+        if deleted:
+            CachedConfigContext.objects.filter(
+                object_type=ContentType.objects.get_for_model(instance),
+                object_id=instance.pk
+            ).delete()
+        else:
+            invalidate_cached_config_contexts(model_label, [instance.pk])
+
+    elif model_label in GLOBAL_DEPENDENCIES or (deleted and model_label in DELETION_DEPENDENCIES):
+        if model_label == 'extras.configcontext':
+            invalidate_config_context_index()
+        invalidate_cached_config_contexts()
+
+    elif model_label in DEPENDENCIES:
+        for dependent_label, lookups in DEPENDENCIES[model_label].items():
+            query = Q()
+            for lookup in lookups:
+                if isinstance(instance, MPTTModel):
+                    query |= Q(**{f'{lookup}__in': instance.get_descendants(include_self=True)})
+                else:
+                    query |= Q(**{lookup: instance})
+            pks = apps.get_model(dependent_label).objects.filter(query).values_list('pk', flat=True)
+            invalidate_cached_config_contexts(dependent_label, list(pks))
+
+
+def invalidate_for_m2m_change(instance, model, pk_set):
+    """
+    Invalidate any cached config context data which depends on a many-to-many relationship which has changed (e.g. the
+    assignment of tags to a device).
+    """
+    model_label = instance._meta.label_lower
+    related_label = model._meta.label_lower
+
+    if 'extras.configcontext' in (model_label, related_label):
+        invalidate_config_context_index()
+        invalidate_cached_config_contexts()
+    elif model_label in CONFIG_CONTEXT_MODELS:
+        invalidate_cached_config_contexts(model_label, [instance.pk])
+    elif related_label in CONFIG_CONTEXT_MODELS:
+        invalidate_cached_config_contexts(related_label, list(pk_set) if pk_set is not None else None)
@@ -0,0 +1,156 @@
+import io
+import json
+import multiprocessing
+import tarfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.utils.text import slugify
+from jinja2.exceptions import TemplateError
+
+__all__ = (
+    'get_render_pool',
+    'render_config_template',
+    'render_config_templates',
+    'stream_archive',
+)
+
+# The number of objects retrieved from the database and dispatched for rendering at a time
+CHUNK_SIZE = 100
+
+# The process pool used to render ConfigTemplates
+_pool = None
+
+
+def _init_worker():
+    import django
+    django.setup()
+
+
+def get_render_pool():
+    """
+    Return the process pool used to render ConfigTemplates, or None if CONFIG_RENDER_PROCESSES is not enabled. Worker
+    processes are spawned (rather than forked) so that they do not share the database connections of this process.
+    """
+    global _pool
+
+    if not settings.CONFIG_RENDER_PROCESSES:
+        return None
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.CONFIG_RENDER_PROCESSES,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker
+        )
+
+    return _pool
+
+
+def render_config_template(configtemplate, context):
+    """
+    Render the given ConfigTemplate. Return a tuple of the output and an error message (if rendering failed). Any
+    exception raised while rendering is reported as an error, so that it does not abort the rendering of other objects.
+    """
+    try:
+        return configtemplate.render(context=context), None
+    except TemplateError as e:
+        return None, f"An error occurred while rendering the template (line {e.lineno}): {e}"
+    except Exception as e:
+        return None, f"An error occurred while rendering the template: {type(e).__name__}: {e}"
+
+
+def render_config_templates(queryset, object_name, extra_context=None):
+    """
+    Render the preferred ConfigTemplate for each object in the given queryset of Devices or VirtualMachines, which
+    should be annotated with config context data. Yield a dictionary for each object, in order, containing either the
+    rendered content or an error message.
+
+    :param object_name: The name under which each object is passed to the template (e.g. "device")
+    :param extra_context: Additional context data for all templates
+    """
+    pool = get_render_pool()
+    chunk = []
+
+    def render_chunk():
+        tasks = [(obj, configtemplate, context) for obj, configtemplate, context in chunk if configtemplate]
+        if pool is not None:
+            try:
+                results = pool.map(
+                    render_config_template,
+                    [task[1] for task in tasks],
+                    [task[2] for task in tasks],
+                    chunksize=max(len(tasks) // settings.CONFIG_RENDER_PROCESSES, 1)
+                )
+                results = dict(zip([task[0].pk for task in tasks], results))
+            except BrokenProcessPool:
+                global _pool
+                _pool = None
+                raise
+        else:
+            results = {
+                obj.pk: render_config_template(configtemplate, context) for obj, configtemplate, context in tasks
+            }
+
+        for obj, configtemplate, context in chunk:
+            record = {
+                'id': obj.pk,
+                'name': str(obj),
+            }
+            if configtemplate is None:
+                record['error'] = f'No config template found for this {object_name}.'
+            else:
+                output, error = results[obj.pk]
+                record['configtemplate'] = {
+                    'id': configtemplate.pk,
+                    'name': configtemplate.name,
+                }
+                if error:
+                    record['error'] = error
+                else:
+                    record['content'] = output
+            yield record
+
+    for obj in queryset.iterator(chunk_size=CHUNK_SIZE):
+        context = obj.get_config_context()
+        if extra_context:
+            context.update(extra_context)
+        context[object_name] = obj
+        chunk.append((obj, obj.get_config_template(), context))
+
+        if len(chunk) == CHUNK_SIZE:
+            yield from render_chunk()
+            chunk = []
+
+    yield from render_chunk()
+
+
+def stream_archive(records):
+    """
+    Write the rendered content of each record yielded by render_config_templates() to a gzipped tar archive, yielding
+    the archive as it is written. Any errors are recorded in a file named "errors.ndjson" at the end of the archive.
+    """
+    buffer = io.BytesIO()
+    errors = []
+
+    def add_file(archive, name, content):
+        data = content.encode()
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        archive.addfile(info, io.BytesIO(data))
+
+    with tarfile.open(fileobj=buffer, mode='w|gz') as archive:
+        for record in records:
+            if 'error' in record:
+                errors.append(record)
+            else:
+                add_file(archive, f"{slugify(record['name'])}-{record['id']}", record['content'])
+            if buffer.tell():
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+
+        if errors:
+            add_file(archive, 'errors.ndjson', ''.join(json.dumps(error) + '\n' for error in errors))
+
+    yield buffer.getvalue()
@@ -1,25 +1,58 @@
 from contextlib import contextmanager
 
-from netbox.context import current_request, webhooks_queue
+from django.conf import settings
+from django.db import connection, transaction
+
+from netbox.context import current_request, objectchange_queue, search_queue, webhooks_queue
+from netbox.search.backends import flush_search_queue
+from .models import ObjectChange
 from .webhooks import flush_webhooks
 
 
+def get_committed_objectchanges(objectchanges):
+    """
+    Return the queued ObjectChanges whose changes have not been rolled back. A change is considered committed if its
+    on_commit() callback has run, or is still pending within a transaction which remains open.
+    """
+    pending = {func for sids, func, robust in connection.run_on_commit}
+    return [
+        objectchange for objectchange in objectchanges
+        if objectchange._committed or objectchange._on_commit in pending
+    ]
+
+
 @contextmanager
 def change_logging(request):
     """
     Enable change logging by connecting the appropriate signals to their receivers before code is run, and
-    disconnecting them afterward.
+    disconnecting them afterward. The code is run within a transaction, in which the queued ObjectChanges are written
+    once it completes, so that no change is committed without its record.
 
     :param request: WSGIRequest object with a unique `id` set
     """
     current_request.set(request)
-    webhooks_queue.set([])
+    objectchange_queue.set([])
+    search_queue.set(None)
+    webhooks_queue.set({})
+
+    try:
+        with transaction.atomic():
+            yield
+
+            # Write queued ObjectChanges to the database, omitting any for changes which have been rolled back
+            objectchanges = get_committed_objectchanges(objectchange_queue.get())
+            ObjectChange.encode_deltas(objectchanges, settings.CHANGELOG_SNAPSHOT_INTERVAL)
+            ObjectChange.objects.bulk_create(objectchanges)
 
-    yield
+        # Flush objects queued for search indexing to RQ
+        flush_search_queue(search_queue.get())
 
-    # Flush queued webhooks to RQ
-    flush_webhooks(webhooks_queue.get())
+        # Flush queued webhooks to RQ
+        flush_webhooks(webhooks_queue.get())
 
-    # Clear context vars
-    current_request.set(None)
-    webhooks_queue.set([])
+    finally:
+        # Clear context vars
+        current_request.set(None)
+        objectchange_queue.set([])
+        search_queue.set(None)
+        webhooks_queue.set({})
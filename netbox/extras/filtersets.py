@@ -51,7 +51,7 @@ class WebhookFilterSet(NetBoxModelFilterSet):
         model = Webhook
         fields = [
             'id', 'name', 'type_create', 'type_update', 'type_delete', 'type_job_start', 'type_job_end', 'payload_url',
-            'enabled', 'http_method', 'http_content_type', 'secret', 'ssl_verification', 'ca_file_path',
+            'enabled', 'http_method', 'http_content_type', 'secret', 'batch_size', 'ssl_verification', 'ca_file_path',
         ]
 
     def search(self, queryset, name, value):
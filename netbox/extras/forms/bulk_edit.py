@@ -221,12 +221,17 @@ class WebhookBulkEditForm(NetBoxModelBulkEditForm):
         label=_('Secret'),
         required=False
     )
+    batch_size = forms.IntegerField(
+        required=False,
+        min_value=1,
+        label=_('Batch size')
+    )
     ca_file_path = forms.CharField(
         required=False,
         label=_('CA file path')
     )
 
-    nullable_fields = ('secret', 'conditions', 'ca_file_path')
+    nullable_fields = ('secret', 'batch_size', 'conditions', 'ca_file_path')
 
 
 class TagBulkEditForm(BulkEditForm):
@@ -234,6 +234,7 @@ class WebhookForm(NetBoxModelForm):
         (_('Events'), ('type_create', 'type_update', 'type_delete', 'type_job_start', 'type_job_end')),
         (_('HTTP Request'), (
             'payload_url', 'http_method', 'http_content_type', 'additional_headers', 'body_template', 'secret',
+            'batch_size',
         )),
         (_('Conditions'), ('conditions',)),
         (_('SSL'), ('ssl_verification', 'ca_file_path')),
@@ -89,6 +89,16 @@ class ObjectChangeType(BaseObjectType):
         fields = '__all__'
         filterset_class = filtersets.ObjectChangeFilterSet
 
+    @classmethod
+    def get_queryset(cls, queryset, info):
+        return super().get_queryset(queryset, info).rebuild_deltas()
+
+    def resolve_prechange_data(self, info):
+        return self.get_prechange_data()
+
+    def resolve_postchange_data(self, info):
+        return self.get_postchange_data()
+
 
 class SavedFilterType(ObjectType):
 
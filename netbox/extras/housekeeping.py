@@ -0,0 +1,133 @@
+import time
+from datetime import timedelta
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+from django_rq import get_queue
+
+from core.models import Job
+from netbox.config import Config
+from netbox.constants import RQ_QUEUE_LOW
+from .models import ObjectChange
+from .partitioning import drop_expired_partitions, is_partitioned
+
+__all__ = (
+    'delete_in_batches',
+    'purge_expired_changes',
+    'purge_expired_jobs',
+    'purge_expired_records',
+    'schedule_purge',
+)
+
+# The default number of records deleted per batch
+BATCH_SIZE = 10000
+
+
+def delete_in_batches(queryset, batch_size=BATCH_SIZE, sleep=0, max_batches=None, raw=False, log=None):
+    """
+    Delete all objects in the given queryset in successive ranges of `batch_size` primary keys, each in its own
+    transaction, pausing for `sleep` seconds between batches. Stop after `max_batches` batches, if specified. Return
+    the number of objects deleted.
+
+    :param raw: Delete objects without collecting related objects or sending signals
+    :param log: A callable to which progress messages are passed
+    """
+    bounds = queryset.aggregate(min_pk=Min('pk'), max_pk=Max('pk'))
+    if bounds['min_pk'] is None:
+        return 0
+
+    deleted = 0
+    batches = 0
+    start = bounds['min_pk']
+    while start is not None and (max_batches is None or batches < max_batches):
+        if batches and sleep:
+            time.sleep(sleep)
+
+        batch = queryset.filter(pk__gte=start, pk__lt=start + batch_size)
+        with transaction.atomic():
+            if raw:
+                count = batch._raw_delete(using=DEFAULT_DB_ALIAS)
+            else:
+                count = batch.delete()[0]
+        deleted += count
+        batches += 1
+
+        if log is not None:
+            span = bounds['max_pk'] - bounds['min_pk'] + 1
+            percent = int(min(start + batch_size - bounds['min_pk'], span) / span * 100)
+            log(f"Deleted {deleted} records ({percent}% of ID range)")
+
+        # Skip ahead to the next remaining object (if any)
+        start = queryset.filter(
+            pk__gte=start + batch_size,
+            pk__lte=bounds['max_pk']
+        ).aggregate(min_pk=Min('pk'))['min_pk']
+
+    return deleted
+
+
+def purge_expired_changes(cutoff, log=None, **kwargs):
+    """
+    Delete all ObjectChanges recorded before the given cutoff time, dropping any expired changelog partitions first.
+    Any remaining delta-encoded change based on an expired change is first re-materialized as a full snapshot. Return
+    the number of records deleted (excluding dropped partitions).
+    """
+    materialized = ObjectChange.materialize_snapshots(cutoff)
+    if materialized and log is not None:
+        log(f"Re-materialized {materialized} delta-encoded records as full snapshots")
+
+    if is_partitioned():
+        for partition in drop_expired_partitions(cutoff):
+            if log is not None:
+                log(f"Dropped expired partition {partition}")
+
+    return delete_in_batches(ObjectChange.objects.filter(time__lt=cutoff), raw=True, log=log, **kwargs)
+
+
+def purge_expired_jobs(cutoff, log=None, **kwargs):
+    """
+    Delete all Jobs created before the given cutoff time. Return the number of records deleted.
+    """
+    return delete_in_batches(Job.objects.filter(created__lt=cutoff), log=log, **kwargs)
+
+
+def purge_expired_records(interval=None, batch_size=BATCH_SIZE, sleep=0, max_batches=None):
+    """
+    Background job which deletes changelog records and jobs which have exceeded their configured retention periods.
+    If an interval (in seconds) is specified, the job reschedules itself to run again after the interval elapses.
+    """
+    config = Config()
+    now = timezone.now()
+    kwargs = {
+        'batch_size': batch_size,
+        'sleep': sleep,
+        'max_batches': max_batches,
+    }
+
+    if config.CHANGELOG_RETENTION:
+        purge_expired_changes(now - timedelta(days=config.CHANGELOG_RETENTION), **kwargs)
+    if config.JOB_RETENTION:
+        purge_expired_jobs(now - timedelta(days=config.JOB_RETENTION), **kwargs)
+
+    if interval:
+        schedule_purge(interval, **kwargs)
+
+
+def schedule_purge(interval, **kwargs):
+    """
+    Schedule purge_expired_records() to run after `interval` seconds (and repeatedly thereafter), replacing any purge
+    already scheduled.
+    """
+    queue = get_queue(RQ_QUEUE_LOW)
+    registry = queue.scheduled_job_registry
+    for job in registry.job_class.fetch_many(registry.get_job_ids(), connection=queue.connection):
+        if job is not None and job.func_name == 'extras.housekeeping.purge_expired_records':
+            registry.remove(job, delete_job=True)
+
+    return queue.enqueue_in(
+        timedelta(seconds=interval),
+        purge_expired_records,
+        interval=interval,
+        **kwargs
+    )
@@ -30,5 +30,20 @@ class NetContainsOrEquals(Lookup):
         return 'CAST(%s AS INET) >>= %s' % (lhs, rhs), params
 
 
+class TrigramSimilar(Lookup):
+    """
+    Case-insensitive trigram similarity match (requires the pg_trgm extension). Both sides are converted to uppercase
+    so that the trigram index on UPPER(value) can be used.
+    """
+    lookup_name = 'trigram_similar'
+
+    def as_sql(self, qn, connection):
+        lhs, lhs_params = self.process_lhs(qn, connection)
+        rhs, rhs_params = self.process_rhs(qn, connection)
+        params = lhs_params + rhs_params
+        return 'UPPER(%s) %%%% UPPER(%s)' % (lhs, rhs), params
+
+
 CharField.register_lookup(Empty)
 CachedValueField.register_lookup(NetContainsOrEquals)
+CachedValueField.register_lookup(TrigramSimilar)
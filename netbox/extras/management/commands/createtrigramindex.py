@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from extras.models import CachedValue
+
+TRIGRAM_INDEX = 'extras_cachedvalue_value_trgm'
+
+
+class Command(BaseCommand):
+    help = "Enable the PostgreSQL pg_trgm extension and create the trigram index used by TrigramSearchBackend"
+
+    def handle(self, *args, **options):
+        table = CachedValue._meta.db_table
+
+        with connection.cursor() as cursor:
+            cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            exists = TRIGRAM_INDEX in connection.introspection.get_constraints(cursor, table)
+
+        if exists:
+            if options['verbosity']:
+                self.stdout.write(f"The trigram index {TRIGRAM_INDEX} already exists.")
+        else:
+            if options['verbosity']:
+                self.stdout.write(f"Creating the trigram index {TRIGRAM_INDEX} (this may take some time)...")
+            index = next(index for index in CachedValue._meta.indexes if index.name == TRIGRAM_INDEX)
+            # Build the index concurrently to avoid locking the cache table
+            with connection.schema_editor(atomic=False) as schema_editor:
+                schema_editor.add_index(CachedValue, index, concurrently=True)
+
+        if options['verbosity']:
+            self.stdout.write("Finished.", self.style.SUCCESS)
@@ -5,18 +5,36 @@ import requests
 from django.conf import settings
 from django.core.cache import cache
 from django.core.management.base import BaseCommand
-from django.db import DEFAULT_DB_ALIAS
 from django.utils import timezone
 from packaging import version
 
-from core.models import Job
-from extras.models import ObjectChange
+from extras.housekeeping import BATCH_SIZE, purge_expired_changes, purge_expired_jobs, schedule_purge
+from extras.partitioning import create_partitions, is_partitioned
 from netbox.config import Config
 
 
 class Command(BaseCommand):
     help = "Perform nightly housekeeping tasks. (This command can be run at any time.)"
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help=f"Maximum number of expired records to delete per transaction (default: {BATCH_SIZE})"
+        )
+        parser.add_argument(
+            '--batch-sleep', type=float, default=0,
+            help="Number of seconds to pause between batches of deletions (default: 0)"
+        )
+        parser.add_argument(
+            '--schedule-purge', type=int, metavar='INTERVAL',
+            help="Instead of deleting expired records now, schedule a background job to delete them every INTERVAL "
+                 "seconds"
+        )
+        parser.add_argument(
+            '--max-batches', type=int,
+            help="Maximum number of batches deleted per run of the scheduled background job"
+        )
+
     def handle(self, *args, **options):
         config = Config()
 
@@ -37,59 +55,62 @@ class Command(BaseCommand):
                     f"clearing sessions; skipping."
                 )
 
-        # Delete expired ObjectChanges
-        if options['verbosity']:
-            self.stdout.write("[*] Checking for expired changelog records")
-        if config.CHANGELOG_RETENTION:
-            cutoff = timezone.now() - timedelta(days=config.CHANGELOG_RETENTION)
-            if options['verbosity'] >= 2:
-                self.stdout.write(f"\tRetention period: {config.CHANGELOG_RETENTION} days")
-                self.stdout.write(f"\tCut-off time: {cutoff}")
-            expired_records = ObjectChange.objects.filter(time__lt=cutoff).count()
-            if expired_records:
+        # Create upcoming changelog partitions (if the changelog table has been partitioned)
+        if is_partitioned():
+            if options['verbosity']:
+                self.stdout.write("[*] Creating upcoming changelog partitions")
+            for partition in create_partitions():
                 if options['verbosity']:
-                    self.stdout.write(
-                        f"\tDeleting {expired_records} expired records... ",
-                        self.style.WARNING,
-                        ending=""
-                    )
-                    self.stdout.flush()
-                ObjectChange.objects.filter(time__lt=cutoff)._raw_delete(using=DEFAULT_DB_ALIAS)
+                    self.stdout.write(f"\tCreated partition {partition}", self.style.SUCCESS)
+
+        batch_kwargs = {
+            'batch_size': options['batch_size'],
+            'sleep': options['batch_sleep'],
+        }
+        log = self._log if options['verbosity'] else None
+
+        if options['schedule_purge']:
+            # Schedule a recurring background job to delete expired records
+            if options['verbosity']:
+                self.stdout.write("[*] Scheduling the deletion of expired records")
+            schedule_purge(options['schedule_purge'], max_batches=options['max_batches'], **batch_kwargs)
+            if options['verbosity']:
+                self.stdout.write(
+                    f"\tExpired records will be deleted every {options['schedule_purge']} seconds.", self.style.SUCCESS
+                )
+
+        else:
+            # Delete expired ObjectChanges
+            if options['verbosity']:
+                self.stdout.write("[*] Checking for expired changelog records")
+            if config.CHANGELOG_RETENTION:
+                cutoff = timezone.now() - timedelta(days=config.CHANGELOG_RETENTION)
+                if options['verbosity'] >= 2:
+                    self.stdout.write(f"\tRetention period: {config.CHANGELOG_RETENTION} days")
+                    self.stdout.write(f"\tCut-off time: {cutoff}")
+                deleted = purge_expired_changes(cutoff, log=log, **batch_kwargs)
                 if options['verbosity']:
-                    self.stdout.write("Done.", self.style.SUCCESS)
+                    self.stdout.write(f"\tDeleted {deleted} expired records.", self.style.SUCCESS)
             elif options['verbosity']:
-                self.stdout.write("\tNo expired records found.", self.style.SUCCESS)
-        elif options['verbosity']:
-            self.stdout.write(
-                f"\tSkipping: No retention period specified (CHANGELOG_RETENTION = {config.CHANGELOG_RETENTION})"
-            )
+                self.stdout.write(
+                    f"\tSkipping: No retention period specified (CHANGELOG_RETENTION = {config.CHANGELOG_RETENTION})"
+                )
 
-        # Delete expired Jobs
-        if options['verbosity']:
-            self.stdout.write("[*] Checking for expired jobs")
-        if config.JOB_RETENTION:
-            cutoff = timezone.now() - timedelta(days=config.JOB_RETENTION)
-            if options['verbosity'] >= 2:
-                self.stdout.write(f"\tRetention period: {config.JOB_RETENTION} days")
-                self.stdout.write(f"\tCut-off time: {cutoff}")
-            expired_records = Job.objects.filter(created__lt=cutoff).count()
-            if expired_records:
-                if options['verbosity']:
-                    self.stdout.write(
-                        f"\tDeleting {expired_records} expired records... ",
-                        self.style.WARNING,
-                        ending=""
-                    )
-                    self.stdout.flush()
-                Job.objects.filter(created__lt=cutoff).delete()
+            # Delete expired Jobs
+            if options['verbosity']:
+                self.stdout.write("[*] Checking for expired jobs")
+            if config.JOB_RETENTION:
+                cutoff = timezone.now() - timedelta(days=config.JOB_RETENTION)
+                if options['verbosity'] >= 2:
+                    self.stdout.write(f"\tRetention period: {config.JOB_RETENTION} days")
+                    self.stdout.write(f"\tCut-off time: {cutoff}")
+                deleted = purge_expired_jobs(cutoff, log=log, **batch_kwargs)
                 if options['verbosity']:
-                    self.stdout.write("Done.", self.style.SUCCESS)
+                    self.stdout.write(f"\tDeleted {deleted} expired records.", self.style.SUCCESS)
             elif options['verbosity']:
-                self.stdout.write("\tNo expired records found.", self.style.SUCCESS)
-        elif options['verbosity']:
-            self.stdout.write(
-                f"\tSkipping: No retention period specified (JOB_RETENTION = {config.JOB_RETENTION})"
-            )
+                self.stdout.write(
+                    f"\tSkipping: No retention period specified (JOB_RETENTION = {config.JOB_RETENTION})"
+                )
 
         # Check for new releases (if enabled)
         if options['verbosity']:
@@ -131,3 +152,7 @@ class Command(BaseCommand):
 
         if options['verbosity']:
             self.stdout.write("Finished.", self.style.SUCCESS)
+
+    def _log(self, message):
+        self.stdout.write(f"\t{message}")
+        self.stdout.flush()
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from extras.partitioning import convert_to_partitioned, create_partitions, get_partitions, is_partitioned
+
+
+class Command(BaseCommand):
+    help = "Partition the changelog table by month, or create upcoming partitions if already partitioned"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--convert', action='store_true',
+            help="Convert the existing changelog table to a partitioned table (locks the table while running)"
+        )
+        parser.add_argument(
+            '--months-ahead', type=int, default=3,
+            help="Number of future months for which partitions should be created (default: 3)"
+        )
+
+    def handle(self, *args, **options):
+        if is_partitioned():
+            created = create_partitions(months_ahead=options['months_ahead'])
+        elif options['convert']:
+            if options['verbosity']:
+                self.stdout.write("Converting the changelog table to a partitioned table...")
+            convert_to_partitioned(months_ahead=options['months_ahead'])
+            created = [name for name, _ in get_partitions()]
+        else:
+            raise CommandError(
+                "The changelog table is not partitioned. Specify --convert to convert the existing table."
+            )
+
+        if options['verbosity']:
+            for name in created:
+                self.stdout.write(f"\tCreated partition {name}")
+            self.stdout.write("Finished.", self.style.SUCCESS)
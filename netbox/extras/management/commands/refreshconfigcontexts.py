@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from extras.configcontexts import CONFIG_CONTEXT_MODELS, refresh_cached_config_contexts
+
+
+class Command(BaseCommand):
+    help = "Compute and cache the config context data of all devices and virtual machines"
+
+    def handle(self, *args, **options):
+        for model_label in CONFIG_CONTEXT_MODELS:
+            if options['verbosity']:
+                self.stdout.write(f"Refreshing config context data for {model_label}... ", ending="")
+                self.stdout.flush()
+            count = refresh_cached_config_contexts(model_label)
+            if options['verbosity']:
+                self.stdout.write(f"{count} objects", self.style.SUCCESS)
+
+        if options['verbosity']:
+            self.stdout.write("Finished.", self.style.SUCCESS)
@@ -1,9 +1,63 @@
+import multiprocessing
+from concurrent.futures import as_completed, ProcessPoolExecutor
+
 from django.contrib.contenttypes.models import ContentType
 from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import F, Max, Min, OuterRef, Q, Subquery
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 
+from extras.models import CachedValue
 from netbox.registry import registry
 from netbox.search.backends import search_backend
 
+# The span of primary keys assigned to each unit of work when reindexing in parallel
+CHUNK_SIZE = 10000
+
+
+def get_queryset(model, since=None):
+    """
+    Return the queryset of objects to be indexed for the given model. If `since` is specified, return only those
+    objects which have been updated since that time and since they were last cached.
+    """
+    queryset = model.objects.all()
+
+    if since and hasattr(model, 'last_updated'):
+        content_type = ContentType.objects.get_for_model(model)
+        last_cached = CachedValue.objects.filter(
+            object_type=content_type,
+            object_id=OuterRef('pk')
+        ).order_by('-timestamp').values('timestamp')[:1]
+        queryset = queryset.filter(last_updated__gte=since).annotate(
+            last_cached=Subquery(last_cached)
+        ).filter(
+            Q(last_cached__isnull=True) | Q(last_updated__gt=F('last_cached'))
+        )
+
+    return queryset
+
+
+def reindex_chunk(model, since=None, pk_range=None):
+    """
+    Reindex all objects of the given model (optionally limited to an inclusive range of primary keys). Returns
+    the number of cache entries created.
+    """
+    queryset = get_queryset(model, since)
+    if pk_range:
+        queryset = queryset.filter(pk__gte=pk_range[0], pk__lte=pk_range[1])
+
+    # Replace any existing entries for the affected objects
+    if since:
+        content_type = ContentType.objects.get_for_model(model)
+        object_ids = list(queryset.values_list('pk', flat=True))
+        return sum(
+            search_backend.refresh(content_type, object_ids[i:i + CHUNK_SIZE])
+            for i in range(0, len(object_ids), CHUNK_SIZE)
+        )
+
+    return search_backend.cache(queryset.iterator(), remove_existing=False)
+
 
 class Command(BaseCommand):
     help = 'Reindex objects for search'
@@ -20,6 +74,17 @@ class Command(BaseCommand):
             action='store_true',
             help="For each model, reindex objects only if no cache entries already exist"
         )
+        parser.add_argument(
+            '--since',
+            metavar='TIMESTAMP',
+            help="Reindex only objects updated since the given time which have changed since they were last cached"
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help="Number of worker processes across which models (and ranges of objects) are divided"
+        )
 
     def _get_indexers(self, *model_names):
         indexers = {}
@@ -57,36 +122,98 @@ class Command(BaseCommand):
 
         return indexers
 
+    def _get_chunks(self, model, since=None):
+        """
+        Divide the objects of a model into ranges of primary keys for parallel processing.
+        """
+        pk_bounds = get_queryset(model, since).aggregate(Min('pk'), Max('pk'))
+        if pk_bounds['pk__min'] is None:
+            return []
+        return [
+            (start, start + CHUNK_SIZE - 1)
+            for start in range(pk_bounds['pk__min'], pk_bounds['pk__max'] + 1, CHUNK_SIZE)
+        ]
+
+    def _reindex_parallel(self, models, since, workers):
+        """
+        Reindex the given models using a pool of worker processes. Returns a mapping of models to the number of
+        cache entries created for each.
+        """
+        counts = {model: 0 for model in models}
+        chunks = [
+            (model, pk_range) for model in models for pk_range in self._get_chunks(model, since)
+        ]
+        self.stdout.write(f'Dispatching {len(chunks)} chunks to {workers} workers... ', ending='')
+        self.stdout.flush()
+
+        # Close any open database connections so that they are not shared with forked workers
+        connections.close_all()
+
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork')) as executor:
+            futures = {
+                executor.submit(reindex_chunk, model, since, pk_range): model for model, pk_range in chunks
+            }
+            for future in as_completed(futures):
+                counts[futures[future]] += future.result()
+        self.stdout.write('Done.')
+
+        return counts
+
     def handle(self, *model_labels, **kwargs):
 
         # Determine which models to reindex
         indexers = self._get_indexers(*model_labels)
         if not indexers:
             raise CommandError("No indexers found!")
+        if kwargs['workers'] < 1:
+            raise CommandError("The number of workers must be at least 1.")
+        since = None
+        if kwargs['since']:
+            try:
+                since = parse_datetime(kwargs['since'])
+            except ValueError:
+                since = None
+            if since is None:
+                raise CommandError(f"Invalid timestamp: {kwargs['since']}")
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
         self.stdout.write(f'Reindexing {len(indexers)} models.')
 
-        # Clear all cached values for the specified models (if not being lazy)
-        if not kwargs['lazy']:
+        # Clear all cached values for the specified models (if not being lazy or incremental)
+        if not kwargs['lazy'] and not since:
             self.stdout.write('Clearing cached values... ', ending='')
             self.stdout.flush()
             deleted_count = search_backend.clear()
             self.stdout.write(f'{deleted_count} entries deleted.')
 
+        # Skip models which have already been cached (if being lazy)
+        models = list(indexers.keys())
+        if kwargs['lazy']:
+            for model in list(models):
+                content_type = ContentType.objects.get_for_model(model)
+                if cached_count := search_backend.count(object_types=[content_type]):
+                    self.stdout.write(
+                        f'  {model._meta.app_label}.{model._meta.model_name}... '
+                        f'Skipping (found {cached_count} existing).'
+                    )
+                    models.remove(model)
+
         # Index models
         self.stdout.write('Indexing models')
-        for model, idx in indexers.items():
+        if kwargs['workers'] > 1:
+            counts = self._reindex_parallel(models, since, kwargs['workers'])
+        else:
+            counts = {}
+        for model in models:
             app_label = model._meta.app_label
             model_name = model._meta.model_name
             self.stdout.write(f'  {app_label}.{model_name}... ', ending='')
             self.stdout.flush()
 
-            if kwargs['lazy']:
-                content_type = ContentType.objects.get_for_model(model)
-                if cached_count := search_backend.count(object_types=[content_type]):
-                    self.stdout.write(f'Skipping (found {cached_count} existing).')
-                    continue
-
-            i = search_backend.cache(model.objects.iterator(), remove_existing=False)
+            if model in counts:
+                i = counts[model]
+            else:
+                i = reindex_chunk(model, since)
             if i:
                 self.stdout.write(f'{i} entries cached.')
             else:
@@ -0,0 +1,50 @@
+import logging
+
+from django.core.management.base import BaseCommand
+from django_rq import get_queue
+
+from extras import webhooks_worker
+from netbox.config import get_config
+from netbox.constants import RQ_QUEUE_DEFAULT
+from utilities.rqworker import ThreadedWorker
+
+logger = logging.getLogger('netbox.webhooks_worker')
+
+
+class Command(BaseCommand):
+    help = "Run a worker dedicated to the delivery of webhooks"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'queues', nargs='*', type=str,
+            help="The queue(s) to service (defaults to the queue to which webhooks are mapped)"
+        )
+        parser.add_argument(
+            '--threads', type=int, default=8,
+            help="Maximum number of webhooks to deliver concurrently (default: 8)"
+        )
+        parser.add_argument(
+            '--max-per-target', type=int, default=4,
+            help="Maximum number of concurrent requests to any one host (default: 4)"
+        )
+        parser.add_argument(
+            '--burst', action='store_true',
+            help="Exit once all queues are empty"
+        )
+
+    def handle(self, *args, **options):
+        queue_names = options['queues'] or [get_config().QUEUE_MAPPINGS.get('webhook', RQ_QUEUE_DEFAULT)]
+        queues = [get_queue(name) for name in queue_names]
+        logger.info(
+            f"Starting webhook worker on queue(s) {', '.join(queue_names)} with {options['threads']} threads "
+            f"(max {options['max_per_target']} per target)"
+        )
+
+        # Reuse connections to each webhook target for the life of the worker
+        webhooks_worker.session_pool = webhooks_worker.SessionPool(max_per_target=options['max_per_target'])
+        try:
+            worker = ThreadedWorker(queues, connection=queues[0].connection, threads=options['threads'])
+            worker.work(burst=options['burst'], with_scheduler=True)
+        finally:
+            webhooks_worker.session_pool.close()
+            webhooks_worker.session_pool = None
@@ -0,0 +1,48 @@
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.contrib.postgres.operations import AddIndexConcurrently, TrigramExtension
+from django.db import migrations
+
+
+class TrigramSearchOnlyMixin:
+    """
+    Apply an operation to the database only if the trigram search backend is configured, as enabling the pg_trgm
+    extension may require privileges which the NetBox database user does not hold. (The extension and index can be
+    created later by running `manage.py createtrigramindex`.)
+    """
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        from netbox.search.backends import trigram_search_enabled
+
+        if trigram_search_enabled():
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+
+class CreateTrigramExtension(TrigramSearchOnlyMixin, TrigramExtension):
+    pass
+
+
+class AddTrigramIndexConcurrently(TrigramSearchOnlyMixin, AddIndexConcurrently):
+    pass
+
+
+class Migration(migrations.Migration):
+    # Build the index concurrently to avoid locking the cache table on large installations
+    atomic = False
+
+    dependencies = [
+        ('extras', '0098_webhook_custom_field_data_webhook_tags'),
+    ]
+
+    operations = [
+        CreateTrigramExtension(),
+        AddTrigramIndexConcurrently(
+            model_name='cachedvalue',
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper('value'),
+                    name='gin_trgm_ops'
+                ),
+                name='extras_cachedvalue_value_trgm'
+            ),
+        ),
+    ]
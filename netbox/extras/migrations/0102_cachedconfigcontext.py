@@ -0,0 +1,30 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('extras', '0101_objectchange_delta_depth'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CachedConfigContext',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False)),
+                ('timestamp', models.DateTimeField(auto_now=True)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('data', models.JSONField(default=list)),
+                ('object_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='contenttypes.contenttype')),
+            ],
+            options={
+                'ordering': ('object_type', 'object_id'),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='cachedconfigcontext',
+            constraint=models.UniqueConstraint(fields=('object_type', 'object_id'), name='extras_cachedconfigcontext_unique_object'),
+        ),
+    ]
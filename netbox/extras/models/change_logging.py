@@ -1,8 +1,11 @@
 from django.conf import settings
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 from extras.choices import *
@@ -21,7 +24,7 @@ class ObjectChange(models.Model):
     """
     time = models.DateTimeField(
         verbose_name=_('time'),
-        auto_now_add=True,
+        default=timezone.now,
         editable=False,
         db_index=True
     )
@@ -88,6 +91,16 @@ class ObjectChange(models.Model):
         blank=True,
         null=True
     )
+    delta_depth = models.PositiveSmallIntegerField(
+        verbose_name=_('delta depth'),
+        default=0,
+        editable=False,
+        help_text=_(
+            "The number of consecutive delta-encoded changes to the object ending with this one. If non-zero, "
+            "prechange_data and postchange_data hold only the differences from the post-change data of the preceding "
+            "change."
+        )
+    )
 
     objects = ObjectChangeQuerySet.as_manager()
 
@@ -117,5 +130,235 @@ class ObjectChange(models.Model):
     def get_absolute_url(self):
         return reverse('extras:objectchange', args=[self.pk])
 
+    @staticmethod
+    def _get_delta(data, new_data):
+        """
+        Return the differences of new_data from data.
+        """
+        return {
+            'changed': {k: v for k, v in new_data.items() if k not in data or data[k] != v},
+            'removed': [k for k in data if k not in new_data],
+        }
+
+    @staticmethod
+    def _apply_delta(data, delta):
+        """
+        Return a copy of the given data with the given differences applied.
+        """
+        data = {k: v for k, v in data.items() if k not in delta['removed']}
+        data.update(delta['changed'])
+        return data
+
+    def encode_delta(self, depth, data):
+        """
+        Replace the pre- and post-change data with their differences from the given post-change data of the object's
+        preceding change. The pre-change data normally matches it, in which case prechange_data is cleared; it may
+        differ where the object was modified without recording a change (e.g. by QuerySet.update()).
+        """
+        prechange_delta = self._get_delta(data, self.prechange_data)
+        self.prechange_data = prechange_delta if prechange_delta['changed'] or prechange_delta['removed'] else None
+        self.postchange_data = self._get_delta(data, self.postchange_data)
+        self.delta_depth = depth
+
+    def apply_delta(self, data):
+        """
+        Return a copy of the given data (the post-change data of the preceding change) with this change's post-change
+        differences applied.
+        """
+        return self._apply_delta(data, self.postchange_data)
+
+    def _rebuild_data(self, chain):
+        """
+        Return the pre- and post-change data for this (delta-encoded) change, given the preceding changes to the object
+        back to the most recent full snapshot, in chronological order. If the chain is incomplete, the pre-change data
+        cannot be rebuilt and only the changed attributes are returned as post-change data.
+        """
+        if [change.delta_depth for change in chain] != list(range(self.delta_depth)) or not chain[0].postchange_data:
+            return None, self.postchange_data['changed']
+
+        data = chain[0].postchange_data
+        for change in chain[1:]:
+            data = change.apply_delta(data)
+        prechange_data = self._apply_delta(data, self.prechange_data) if self.prechange_data else data
+        return prechange_data, self.apply_delta(data)
+
+    def get_data(self):
+        """
+        Return the pre- and post-change data for this change, rebuilding them from the preceding changes to the object
+        if delta-encoded. If the full snapshot on which a delta is based has since been deleted, the pre-change data
+        cannot be rebuilt and only the changed attributes are returned as post-change data.
+        """
+        if not self.delta_depth:
+            return self.prechange_data, self.postchange_data
+        if hasattr(self, '_data'):
+            return self._data
+
+        # Retrieve the preceding changes back to the most recent full snapshot
+        chain = ObjectChange.objects.filter(
+            Q(time__lt=self.time) | Q(time=self.time, pk__lt=self.pk),
+            changed_object_type=self.changed_object_type_id,
+            changed_object_id=self.changed_object_id
+        ).order_by('-time', '-pk')[:self.delta_depth]
+        self._data = self._rebuild_data(list(reversed(chain)))
+
+        return self._data
+
+    def get_prechange_data(self):
+        return self.get_data()[0]
+
+    def get_postchange_data(self):
+        return self.get_data()[1]
+
+    @classmethod
+    def _get_history(cls, objectchanges, limit, until=None):
+        """
+        Return a dictionary mapping each object changed by the given ObjectChanges to its `limit` most recently recorded
+        changes (optionally up to the given time), in chronological order.
+        """
+        object_ids = {}
+        for objectchange in objectchanges:
+            object_ids.setdefault(objectchange.changed_object_type_id, set()).add(objectchange.changed_object_id)
+        query = Q()
+        for content_type_id, ids in object_ids.items():
+            query |= Q(changed_object_type=content_type_id, changed_object_id__in=ids)
+        if until is not None:
+            query &= Q(time__lte=until)
+
+        history = {}
+        changes = cls.objects.filter(query).annotate(
+            row_number=Window(
+                RowNumber(),
+                partition_by=[F('changed_object_type'), F('changed_object_id')],
+                order_by=[F('time').desc(), F('pk').desc()]
+            )
+        ).filter(row_number__lte=limit).order_by('time', 'pk')
+        for change in changes:
+            history.setdefault((change.changed_object_type_id, change.changed_object_id), []).append(change)
+
+        return history
+
+    @classmethod
+    def bulk_rebuild_data(cls, objectchanges):
+        """
+        Rebuild the pre- and post-change data of all delta-encoded changes among the given ObjectChanges, retrieving
+        the preceding changes to their objects in a single query. The data of any change whose preceding changes were
+        not all retrieved (e.g. where the ObjectChanges have been filtered) is instead rebuilt individually on access.
+        """
+        deltas = [
+            objectchange for objectchange in objectchanges
+            if objectchange.delta_depth and not hasattr(objectchange, '_data')
+        ]
+        if not deltas:
+            return
+
+        history = cls._get_history(
+            deltas,
+            limit=len(deltas) + max(objectchange.delta_depth for objectchange in deltas),
+            until=max(objectchange.time for objectchange in deltas)
+        )
+        for objectchange in deltas:
+            changes = history.get((objectchange.changed_object_type_id, objectchange.changed_object_id), [])
+            positions = {change.pk: i for i, change in enumerate(changes)}
+            i = positions.get(objectchange.pk)
+            if i is not None and i >= objectchange.delta_depth:
+                objectchange._data = objectchange._rebuild_data(changes[i - objectchange.delta_depth:i])
+
+    @classmethod
+    def encode_deltas(cls, objectchanges, interval):
+        """
+        Delta-encode updates among the given (unsaved, chronologically ordered) ObjectChanges, such that a full
+        snapshot of each object is retained at least once per `interval` changes. Each delta is encoded against the
+        (rebuilt) post-change data of the object's preceding change, from which it is rebuilt on read.
+        """
+        if interval < 2:
+            return
+
+        updates = [
+            objectchange for objectchange in objectchanges
+            if objectchange.action == ObjectChangeActionChoices.ACTION_UPDATE
+        ]
+        if not updates:
+            return
+
+        # Determine the delta depth and rebuild the post-change data of the most recently recorded change to each
+        # updated object. The data of a change whose chain is incomplete is unknown.
+        previous = {}
+        for key, changes in cls._get_history(updates, limit=interval).items():
+            latest = changes[-1]
+            if not latest.delta_depth:
+                previous[key] = (0, latest.postchange_data)
+            else:
+                prechange_data, postchange_data = latest._rebuild_data(changes[:-1][-latest.delta_depth:])
+                previous[key] = (latest.delta_depth, postchange_data if prechange_data is not None else None)
+
+        for objectchange in objectchanges:
+            key = (objectchange.changed_object_type_id, objectchange.changed_object_id)
+            depth, data = previous.get(key, (None, None))
+            postchange_data = objectchange.postchange_data
+            if (
+                objectchange.action == ObjectChangeActionChoices.ACTION_UPDATE and
+                objectchange.prechange_data is not None and
+                postchange_data is not None and
+                depth is not None and
+                depth + 1 < interval and
+                data is not None
+            ):
+                objectchange.encode_delta(depth + 1, data)
+                previous[key] = (depth + 1, postchange_data)
+            else:
+                previous[key] = (0, postchange_data)
+
+    @classmethod
+    def materialize_snapshots(cls, cutoff):
+        """
+        Prepare for the deletion of all changes recorded before the given cutoff time. Where the oldest remaining change
+        to an object is delta-encoded against changes which are to be deleted, it is re-materialized as a full snapshot
+        and the depths of the subsequent deltas based on it are reduced accordingly. Return the number of changes
+        re-materialized.
+        """
+        # Find the oldest remaining change to each object. (Deltas are selected only once the window function has been
+        # evaluated, as a filter on delta_depth would otherwise restrict the rows over which it is computed.)
+        oldest = cls.objects.filter(time__gte=cutoff).annotate(
+            row_number=Window(
+                RowNumber(),
+                partition_by=[F('changed_object_type'), F('changed_object_id')],
+                order_by=[F('time').asc(), F('pk').asc()]
+            )
+        ).filter(row_number=1).values_list('pk', 'delta_depth')
+        pks = [pk for pk, delta_depth in oldest if delta_depth]
+
+        count = 0
+        for pk in pks:
+            with transaction.atomic():
+                objectchange = cls.objects.get(pk=pk)
+                prechange_data, postchange_data = objectchange.get_data()
+                if prechange_data is None:
+                    # The chain is already incomplete, so the data cannot be rebuilt
+                    continue
+                depth = objectchange.delta_depth
+
+                # Collect the subsequent deltas belonging to the same chain
+                subsequent = []
+                changes = cls.objects.filter(
+                    Q(time__gt=objectchange.time) | Q(time=objectchange.time, pk__gt=objectchange.pk),
+                    changed_object_type=objectchange.changed_object_type_id,
+                    changed_object_id=objectchange.changed_object_id
+                ).order_by('time', 'pk').values_list('pk', 'delta_depth')
+                for change_pk, delta_depth in changes.iterator():
+                    if delta_depth != depth + len(subsequent) + 1:
+                        break
+                    subsequent.append(change_pk)
+
+                cls.objects.filter(pk=pk).update(
+                    prechange_data=prechange_data,
+                    postchange_data=postchange_data,
+                    delta_depth=0
+                )
+                if subsequent:
+                    cls.objects.filter(pk__in=subsequent).update(delta_depth=F('delta_depth') - depth)
+                count += 1
+
+        return count
+
     def get_action_color(self):
         return ObjectChangeActionChoices.colors.get(self.action)
@@ -1,10 +1,16 @@
+import functools
+import hashlib
+import json
+
 from django.apps import apps
 from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
 from django.core.validators import ValidationError
 from django.db import models
 from django.urls import reverse
 from django.utils.translation import gettext_lazy as _
-from jinja2.loaders import BaseLoader
+from jinja2.bccache import MemcachedBytecodeCache
 from jinja2.sandbox import SandboxedEnvironment
 
 from extras.querysets import ConfigContextQuerySet
@@ -12,10 +18,12 @@ from netbox.config import get_config
 from netbox.registry import registry
 from netbox.models import ChangeLoggedModel
 from netbox.models.features import CloningMixin, ExportTemplatesMixin, SyncedDataMixin, TagsMixin
+from utilities.fields import RestrictedGenericForeignKey
 from utilities.jinja2 import ConfigTemplateLoader
 from utilities.utils import deepmerge
 
 __all__ = (
+    'CachedConfigContext',
     'ConfigContext',
     'ConfigContextModel',
     'ConfigTemplate',
@@ -157,6 +165,47 @@ class ConfigContext(SyncedDataMixin, CloningMixin, ChangeLoggedModel):
     sync_data.alters_data = True
 
 
+class CachedConfigContext(models.Model):
+    """
+    The config context data applicable to a Device or VirtualMachine, materialized from all matching ConfigContexts to
+    avoid resolving them on every request. The cached data is discarded whenever a ConfigContext or any attribute of
+    the object by which ConfigContexts are assigned changes, and recomputed in the background.
+    """
+    timestamp = models.DateTimeField(
+        verbose_name=_('timestamp'),
+        auto_now=True,
+        editable=False
+    )
+    object_type = models.ForeignKey(
+        to=ContentType,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    object_id = models.PositiveBigIntegerField()
+    object = RestrictedGenericForeignKey(
+        ct_field='object_type',
+        fk_field='object_id'
+    )
+    data = models.JSONField(
+        verbose_name=_('data'),
+        default=list
+    )
+
+    class Meta:
+        ordering = ('object_type', 'object_id')
+        constraints = (
+            models.UniqueConstraint(
+                fields=('object_type', 'object_id'),
+                name='%(app_label)s_%(class)s_unique_object'
+            ),
+        )
+        verbose_name = _('cached config context')
+        verbose_name_plural = _('cached config contexts')
+
+    def __str__(self):
+        return f'{self.object_type} {self.object_id}'
+
+
 class ConfigContextModel(models.Model):
     """
     A model which includes local configuration context data. This local data will override any inherited data from
@@ -181,8 +230,14 @@ class ConfigContextModel(models.Model):
         data = {}
 
         if not hasattr(self, 'config_context_data'):
-            # The annotation is not available, so we fall back to manually querying for the config context objects
-            config_context_data = ConfigContext.objects.get_for_object(self, aggregate_data=True)
+            # The annotation is not available, so we fall back to the cached data (if any) or to manually querying for
+            # the config context objects
+            config_context_data = CachedConfigContext.objects.filter(
+                object_type=ContentType.objects.get_for_model(self),
+                object_id=self.pk
+            ).values_list('data', flat=True).first()
+            if config_context_data is None:
+                config_context_data = ConfigContext.objects.get_for_object(self, aggregate_data=True) or []
         else:
             # The attribute may exist, but the annotated value could be None if there is no config context data
             config_context_data = self.config_context_data or []
@@ -257,47 +312,98 @@ class ConfigTemplate(SyncedDataMixin, ExportTemplatesMixin, TagsMixin, ChangeLog
         """
         Render the contents of the template.
         """
-        _context = dict()
-
-        # Populate the default template context with NetBox model classes, namespaced by app
-        # TODO: Devise a canonical mechanism for identifying the models to include (see #13427)
-        for app, model_names in registry['model_features']['custom_fields'].items():
-            _context.setdefault(app, {})
-            for model_name in model_names:
-                model = apps.get_registered_model(app, model_name)
-                _context[app][model.__name__] = model
+        # Populate the default template context with NetBox model classes, namespaced by app. Each namespace is copied,
+        # as a template may modify it.
+        _context = {app: dict(models) for app, models in get_template_models().items()}
 
         # Add the provided context data, if any
         if context is not None:
             _context.update(context)
 
-        # Initialize the Jinja2 environment and instantiate the Template
-        environment = self._get_environment()
-        if self.data_file:
-            template = environment.get_template(self.data_file.path)
-        else:
-            template = environment.from_string(self.template_code)
-        output = template.render(**_context)
+        output = self.get_template().render(**_context)
 
         # Replace CRLF-style line terminators
         return output.replace('\r\n', '\n')
 
-    def _get_environment(self):
+    def get_template(self):
         """
-        Instantiate and return a Jinja2 environment suitable for rendering the ConfigTemplate.
+        Return the compiled Jinja2 Template. Compiled templates are cached per process until the ConfigTemplate (or
+        its DataFile) is modified.
         """
-        # Initialize the template loader & cache the base template code (if applicable)
         if self.data_file:
-            loader = ConfigTemplateLoader(data_source=self.data_source)
-            loader.cache_templates({
-                self.data_file.path: self.template_code
-            })
+            source_hash = self.data_file.hash
         else:
-            loader = BaseLoader()
+            source_hash = hashlib.sha256(self.template_code.encode()).hexdigest()
+        key = (
+            self.last_updated,
+            source_hash,
+            self.data_source.last_synced if self.data_source else None,
+        )
+
+        if self.pk and (compiled := _compiled_templates.get(self.pk)) and compiled[0] == key:
+            return compiled[1]
+
+        # Initialize the Jinja2 environment and instantiate the Template
+        environment = self._get_environment()
+        template = environment.get_template(self._get_template_name())
+        if self.pk:
+            _compiled_templates[self.pk] = (key, template)
+
+        return template
+
+    def _get_template_name(self):
+        if self.data_file:
+            return self.data_file.path
+        return f'config-template-{self.pk}'
+
+    def _get_environment(self):
+        """
+        Instantiate and return a Jinja2 environment suitable for rendering the ConfigTemplate.
+        """
+        # Initialize the template loader & cache the base template code
+        loader = ConfigTemplateLoader(data_source=self.data_source if self.data_file else None)
+        loader.cache_templates({
+            self._get_template_name(): self.template_code
+        })
 
         # Initialize the environment
-        env_params = self.environment_params or {}
+        env_params = {
+            'bytecode_cache': get_bytecode_cache(self.environment_params or {}),
+            **(self.environment_params or {}),
+        }
         environment = SandboxedEnvironment(loader=loader, **env_params)
         environment.filters.update(get_config().JINJA2_FILTERS)
 
         return environment
+
+
+# Compiled Jinja2 Templates, mapped by ConfigTemplate ID
+_compiled_templates = {}
+
+
+def get_bytecode_cache(environment_params):
+    """
+    Return a cache for the Jinja2 bytecode of templates compiled with the given environment parameters, shared among
+    processes via the Django cache. Bytecode is keyed by a hash of the parameters, as they affect compilation (e.g.
+    the delimiters used).
+    """
+    params_hash = hashlib.sha256(json.dumps(environment_params, sort_keys=True, default=str).encode()).hexdigest()
+    return MemcachedBytecodeCache(cache, prefix=f'jinja2/bytecode/{params_hash}/', ignore_memcache_errors=True)
+
+
+@functools.cache
+def get_template_models():
+    """
+    Return the NetBox model classes made available to ConfigTemplates, namespaced by app. This is computed once per
+    process.
+    """
+    namespace = {}
+
+    # TODO: Devise a canonical mechanism for identifying the models to include (see #13427)
+    for app, model_names in registry['model_features']['custom_fields'].items():
+        namespace.setdefault(app, {})
+        for model_name in model_names:
+            model = apps.get_registered_model(app, model_name)
+            namespace[app][model.__name__] = model
+
+    return namespace
@@ -5,7 +5,7 @@ from django.conf import settings
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 from django.core.cache import cache
-from django.core.validators import ValidationError
+from django.core.validators import MinValueValidator, ValidationError
 from django.db import models
 from django.http import HttpResponse
 from django.urls import reverse
@@ -117,6 +117,16 @@ class Webhook(CustomFieldsMixin, ExportTemplatesMixin, TagsMixin, ChangeLoggedMo
             "the same context as the request body (below)."
         )
     )
+    batch_size = models.PositiveIntegerField(
+        verbose_name=_('batch size'),
+        blank=True,
+        null=True,
+        validators=(MinValueValidator(1),),
+        help_text=_(
+            "If set, all matching events of the same type resulting from a single request are delivered together, in "
+            "batches of up to this many objects. Leave blank to send a separate request for each object."
+        )
+    )
     body_template = models.TextField(
         verbose_name=_('body template'),
         blank=True,
@@ -206,8 +216,14 @@ class Webhook(CustomFieldsMixin, ExportTemplatesMixin, TagsMixin, ChangeLoggedMo
         """
         if not self.additional_headers:
             return {}
+        return self.parse_headers(render_jinja2(self.additional_headers, context))
+
+    @staticmethod
+    def parse_headers(data):
+        """
+        Parse rendered additional_headers into a dict of Header: Value pairs.
+        """
         ret = {}
-        data = render_jinja2(self.additional_headers, context)
         for line in data.splitlines():
             header, value = line.split(':', 1)
             ret[header.strip()] = value.strip()
@@ -1,7 +1,9 @@
 import uuid
 
 from django.contrib.contenttypes.models import ContentType
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.db import models
+from django.db.models.functions import Upper
 from django.utils.translation import gettext_lazy as _
 
 from utilities.fields import RestrictedGenericForeignKey
@@ -51,6 +53,10 @@ class CachedValue(models.Model):
 
     class Meta:
         ordering = ('weight', 'object_type', 'object_id')
+        indexes = (
+            # Trigram index supporting case-insensitive partial matching (used by TrigramSearchBackend)
+            GinIndex(OpClass(Upper('value'), name='gin_trgm_ops'), name='extras_cachedvalue_value_trgm'),
+        )
         verbose_name = _('cached value')
         verbose_name_plural = _('cached values')
 
@@ -0,0 +1,203 @@
+import re
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import connection, transaction
+from django.utils.dateparse import parse_datetime
+
+from .models import ObjectChange
+
+__all__ = (
+    'convert_to_partitioned',
+    'create_partitions',
+    'drop_expired_partitions',
+    'get_partitions',
+    'is_partitioned',
+)
+
+TABLE = ObjectChange._meta.db_table
+LEGACY_TABLE = f'{TABLE}_legacy'
+DEFAULT_PARTITION = f'{TABLE}_default'
+
+
+def _month_start(dt, offset=0):
+    """
+    Return the start (in UTC) of the month containing the given datetime, plus `offset` months.
+    """
+    month = dt.year * 12 + dt.month - 1 + offset
+    return datetime(month // 12, month % 12 + 1, 1, tzinfo=dt_timezone.utc)
+
+
+def _partition_name(start):
+    return f'{TABLE}_p{start:%Y%m}'
+
+
+def is_partitioned():
+    """
+    Return True if the ObjectChange table has been converted to a partitioned table.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass",
+            [TABLE]
+        )
+        return cursor.fetchone() is not None
+
+
+def get_partitions():
+    """
+    Return a list of (name, upper_bound) tuples for each partition of the ObjectChange table, ordered by upper bound.
+    The upper bound of the default partition is None.
+    """
+    partitions = []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = %s::regclass",
+            [TABLE]
+        )
+        for name, bound in cursor.fetchall():
+            if match := re.search(r"TO \('([^']+)'\)", bound):
+                partitions.append((name, parse_datetime(match.group(1))))
+            else:
+                partitions.append((name, None))
+
+    return sorted(partitions, key=lambda p: (p[1] is None, p[1]))
+
+
+@transaction.atomic
+def create_partitions(months_ahead=3, now=None):
+    """
+    Create a monthly partition for each month from the current one through `months_ahead` months in the future,
+    skipping any month already covered by an existing partition. Any records for a new partition's month which have
+    been stored in the default partition are moved to the new partition. Return the names of the partitions created.
+    """
+    now = now or datetime.now(tz=dt_timezone.utc)
+    partitions = get_partitions()
+    covered_until = max((upper for _, upper in partitions if upper is not None), default=None)
+    has_default = any(upper is None for _, upper in partitions)
+
+    created = []
+    with connection.cursor() as cursor:
+        for offset in range(months_ahead + 1):
+            start = _month_start(now, offset)
+            end = _month_start(now, offset + 1)
+            if covered_until and end <= covered_until:
+                continue
+            name = _partition_name(start)
+
+            # A partition cannot be created while the default partition holds records within its range, so detach the
+            # default partition until they have been moved
+            if has_default:
+                cursor.execute(
+                    f'SELECT EXISTS (SELECT 1 FROM "{DEFAULT_PARTITION}" WHERE time >= %s AND time < %s)',
+                    [start, end]
+                )
+                move_records = cursor.fetchone()[0]
+            else:
+                move_records = False
+            if move_records:
+                cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+                cursor.execute(f'ALTER TABLE "{TABLE}" DETACH PARTITION "{DEFAULT_PARTITION}"')
+
+            cursor.execute(
+                f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{TABLE}" FOR VALUES FROM (%s) TO (%s)',
+                [start, end]
+            )
+
+            if move_records:
+                cursor.execute(
+                    f'WITH moved AS (DELETE FROM "{DEFAULT_PARTITION}" WHERE time >= %s AND time < %s RETURNING *) '
+                    f'INSERT INTO "{name}" SELECT * FROM moved',
+                    [start, end]
+                )
+                cursor.execute(f'ALTER TABLE "{TABLE}" ATTACH PARTITION "{DEFAULT_PARTITION}" DEFAULT')
+            created.append(name)
+
+    return created
+
+
+def drop_expired_partitions(cutoff):
+    """
+    Drop all partitions which contain only records older than the specified cutoff time. Return the names of the
+    partitions dropped.
+    """
+    dropped = []
+    with connection.cursor() as cursor:
+        for name, upper in get_partitions():
+            if upper is not None and upper <= cutoff:
+                cursor.execute(f'DROP TABLE "{name}"')
+                dropped.append(name)
+
+    return dropped
+
+
+@transaction.atomic
+def convert_to_partitioned(months_ahead=3):
+    """
+    Convert the ObjectChange table to a table partitioned by month on `time`. The existing table is retained as a
+    single partition holding all records through the end of the current month; it will be dropped once all of its
+    records have expired. A default partition catches any records falling outside of the defined partitions.
+    """
+    now = datetime.now(tz=dt_timezone.utc)
+    legacy_upper = _month_start(now, 1)
+
+    with connection.cursor() as cursor:
+        # Check any deferred constraints now, as a table with pending trigger events cannot be altered
+        cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+        cursor.execute(f'LOCK TABLE "{TABLE}" IN ACCESS EXCLUSIVE MODE')
+        cursor.execute(f'ALTER TABLE "{TABLE}" RENAME TO "{LEGACY_TABLE}"')
+
+        # Rename the existing table's constraints & indexes, so that their original names are available for the new
+        # (parent) table
+        cursor.execute(
+            "SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass AND contype IN ('p', 'f')",
+            [LEGACY_TABLE]
+        )
+        constraints = [row[0] for row in cursor.fetchall()]
+        for name in constraints:
+            cursor.execute(f'ALTER TABLE "{LEGACY_TABLE}" RENAME CONSTRAINT "{name}" TO "{name[:56]}_legacy"')
+        cursor.execute(
+            "SELECT indexrelid::regclass::text, pg_get_indexdef(indexrelid) FROM pg_index "
+            "WHERE indrelid = %s::regclass AND NOT indisprimary",
+            [LEGACY_TABLE]
+        )
+        indexes = cursor.fetchall()
+        for name, _ in indexes:
+            cursor.execute(f'ALTER INDEX "{name}" RENAME TO "{name[:56]}_legacy"')
+
+        # Create the partitioned table. Its primary key must include the partition key.
+        cursor.execute(
+            f'CREATE TABLE "{TABLE}" (LIKE "{LEGACY_TABLE}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+            f'PARTITION BY RANGE (time)'
+        )
+        cursor.execute(f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{TABLE}_pkey" PRIMARY KEY (id, time)')
+
+        # Assign IDs from a new sequence owned by the partitioned table, continuing from the existing table
+        cursor.execute(f'ALTER TABLE "{LEGACY_TABLE}" ALTER COLUMN id DROP IDENTITY IF EXISTS')
+        cursor.execute(f'ALTER TABLE "{LEGACY_TABLE}" ALTER COLUMN id DROP DEFAULT')
+        cursor.execute(f'ALTER TABLE "{TABLE}" ALTER COLUMN id DROP DEFAULT')
+        cursor.execute(f'CREATE SEQUENCE "{TABLE}_id_seq" OWNED BY "{TABLE}".id')
+        cursor.execute(f'SELECT setval(\'"{TABLE}_id_seq"\', COALESCE(MAX(id), 0) + 1, false) FROM "{LEGACY_TABLE}"')
+        cursor.execute(f'ALTER TABLE "{TABLE}" ALTER COLUMN id SET DEFAULT nextval(\'"{TABLE}_id_seq"\')')
+
+        # Recreate foreign keys and indexes on the partitioned table
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype = 'f'",
+            [LEGACY_TABLE]
+        )
+        for name, definition in cursor.fetchall():
+            name = name.removesuffix('_legacy')
+            cursor.execute(f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{name}" {definition}')
+        for name, definition in indexes:
+            definition = re.sub(r'^CREATE (UNIQUE )?INDEX \S+ ON (ONLY )?\S+', '', definition)
+            cursor.execute(f'CREATE INDEX "{name}" ON "{TABLE}" {definition}')
+
+        # Attach the existing table as the partition for all records through the end of the current month
+        cursor.execute(
+            f'ALTER TABLE "{TABLE}" ATTACH PARTITION "{LEGACY_TABLE}" FOR VALUES FROM (MINVALUE) TO (%s)',
+            [legacy_upper]
+        )
+        cursor.execute(f'CREATE TABLE "{DEFAULT_PARTITION}" PARTITION OF "{TABLE}" DEFAULT')
+
+    create_partitions(months_ahead=months_ahead, now=now)
@@ -1,7 +1,8 @@
 from django.apps import apps
 from django.contrib.contenttypes.models import ContentType
-from django.contrib.postgres.aggregates import JSONBAgg
-from django.db.models import OuterRef, Subquery, Q
+from django.db.models import JSONField, OuterRef, Subquery, Q
+from django.db.models.query import ModelIterable
+from django.db.models.functions import Coalesce
 from django.db.utils import ProgrammingError
 
 from extras.models.tags import TaggedItem
@@ -11,57 +12,44 @@ from utilities.querysets import RestrictedQuerySet
 
 class ConfigContextQuerySet(RestrictedQuerySet):
 
+    # Bulk operations do not send the signals upon which the ConfigContextIndex is invalidated. (bulk_update() is
+    # implemented using update().)
+
+    def bulk_create(self, *args, **kwargs):
+        from extras.configcontexts import invalidate_config_context_index
+
+        objs = super().bulk_create(*args, **kwargs)
+        invalidate_config_context_index()
+        return objs
+
+    def update(self, **kwargs):
+        from extras.configcontexts import invalidate_config_context_index
+
+        count = super().update(**kwargs)
+        invalidate_config_context_index()
+        return count
+
     def get_for_object(self, obj, aggregate_data=False):
         """
         Return all applicable ConfigContexts for a given object. Only active ConfigContexts will be included.
 
+        Applicable ConfigContexts are determined using the in-memory ConfigContextIndex, which is rebuilt whenever
+        ConfigContexts or their assignments change.
+
         Args:
-          aggregate_data: If True, use the JSONBAgg aggregate function to return only the list of JSON data objects
+          aggregate_data: If True, return only the list of JSON data objects
         """
+        from extras.configcontexts import get_config_context_index
 
-        role = obj.role
-
-        # Device type and location assignment is relevant only for Devices
-        device_type = getattr(obj, 'device_type', None)
-        location = getattr(obj, 'location', None)
-
-        # Get assigned cluster, group, and type (if any)
-        cluster = getattr(obj, 'cluster', None)
-        cluster_type = getattr(cluster, 'type', None)
-        cluster_group = getattr(cluster, 'group', None)
-
-        # Get the group of the assigned tenant, if any
-        tenant_group = obj.tenant.group if obj.tenant else None
-
-        # Match against the directly assigned region as well as any parent regions.
-        region = getattr(obj.site, 'region', None)
-        regions = region.get_ancestors(include_self=True) if region else []
-
-        # Match against the directly assigned site group as well as any parent site groups.
-        sitegroup = getattr(obj.site, 'group', None)
-        sitegroups = sitegroup.get_ancestors(include_self=True) if sitegroup else []
-
-        queryset = self.filter(
-            Q(regions__in=regions) | Q(regions=None),
-            Q(site_groups__in=sitegroups) | Q(site_groups=None),
-            Q(sites=obj.site) | Q(sites=None),
-            Q(locations=location) | Q(locations=None),
-            Q(device_types=device_type) | Q(device_types=None),
-            Q(roles=role) | Q(roles=None),
-            Q(platforms=obj.platform) | Q(platforms=None),
-            Q(cluster_types=cluster_type) | Q(cluster_types=None),
-            Q(cluster_groups=cluster_group) | Q(cluster_groups=None),
-            Q(clusters=cluster) | Q(clusters=None),
-            Q(tenant_groups=tenant_group) | Q(tenant_groups=None),
-            Q(tenants=obj.tenant) | Q(tenants=None),
-            Q(tags__slug__in=obj.tags.slugs()) | Q(tags=None),
-            is_active=True,
-        ).order_by('weight', 'name').distinct()
+        contexts = get_config_context_index().get_for_object(obj)
+
+        if aggregate_data and not self.query.has_filters():
+            return [data for _, data in contexts]
+
+        queryset = self.filter(pk__in=[pk for pk, _ in contexts]).order_by('weight', 'name')
 
         if aggregate_data:
-            return queryset.aggregate(
-                config_context_data=JSONBAgg('data', ordering=['weight', 'name'])
-            )['config_context_data']
+            return list(queryset.values_list('data', flat=True))
 
         return queryset
 
@@ -75,19 +63,34 @@ class ConfigContextModelQuerySet(RestrictedQuerySet):
     This offers a substantial performance gain over ConfigContextQuerySet.get_for_object() when dealing with
     multiple objects. This allows the annotation to be entirely optional.
     """
-    def annotate_config_context_data(self):
+    def annotate_config_context_data(self, cached=True):
         """
-        Attach the subquery annotation to the base queryset
+        Attach the subquery annotation to the base queryset. If `cached` is True, the materialized data for each object
+        (see CachedConfigContext) is used where available.
         """
-        from extras.models import ConfigContext
-        return self.annotate(
-            config_context_data=Subquery(
-                ConfigContext.objects.filter(
-                    self._get_config_context_filters()
-                ).annotate(
-                    _data=EmptyGroupByJSONBAgg('data', ordering=['weight', 'name'])
-                ).values("_data").order_by()
+        from extras.models import CachedConfigContext, ConfigContext
+        config_context_data = Subquery(
+            ConfigContext.objects.filter(
+                self._get_config_context_filters()
+            ).annotate(
+                _data=EmptyGroupByJSONBAgg('data', ordering=['weight', 'name'])
+            ).values("_data").order_by()
+        )
+        if cached:
+            # Resolve the applicable ConfigContexts only for objects which have no cached data
+            config_context_data = Coalesce(
+                Subquery(
+                    CachedConfigContext.objects.filter(
+                        object_type__app_label=self.model._meta.app_label,
+                        object_type__model=self.model._meta.model_name,
+                        object_id=OuterRef('pk')
+                    ).values('data')
+                ),
+                config_context_data,
+                output_field=JSONField()
             )
+        return self.annotate(
+            config_context_data=config_context_data
         ).distinct()
 
     def _get_config_context_filters(self):
@@ -157,6 +160,30 @@ class ConfigContextModelQuerySet(RestrictedQuerySet):
 
 class ObjectChangeQuerySet(RestrictedQuerySet):
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._rebuild_deltas = False
+
+    def rebuild_deltas(self):
+        """
+        Rebuild the data of delta-encoded changes in bulk when the QuerySet is evaluated, rather than individually as
+        each is accessed.
+        """
+        clone = self._chain()
+        clone._rebuild_deltas = True
+        return clone
+
+    def _clone(self):
+        clone = super()._clone()
+        clone._rebuild_deltas = self._rebuild_deltas
+        return clone
+
+    def _fetch_all(self):
+        rebuild_deltas = self._rebuild_deltas and self._result_cache is None and self._iterable_class is ModelIterable
+        super()._fetch_all()
+        if rebuild_deltas:
+            self.model.bulk_rebuild_data(self._result_cache)
+
     def valid_models(self):
         # Exclude any change records which refer to an instance of a model that's no longer installed. This
         # can happen when a plugin is removed but its data remains in the database, for example.
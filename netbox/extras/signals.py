@@ -2,18 +2,21 @@ import importlib
 import logging
 
 from django.contrib.contenttypes.models import ContentType
-from django.db.models.signals import m2m_changed, post_save, pre_delete
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
 from django.dispatch import receiver, Signal
+from django.utils import timezone
 from django_prometheus.models import model_deletes, model_inserts, model_updates
 
 from extras.validators import CustomValidator
 from netbox.config import get_config
-from netbox.context import current_request, webhooks_queue
+from netbox.context import current_request, objectchange_queue, webhooks_queue
 from netbox.signals import post_clean
 from utilities.exceptions import AbortRequest
 from .choices import ObjectChangeActionChoices
-from .models import ConfigRevision, CustomField, ObjectChange, TaggedItem
-from .webhooks import enqueue_object, get_snapshots, serialize_for_webhook
+from .configcontexts import invalidate_for_instance, invalidate_for_m2m_change
+from .models import ConfigRevision, CustomField, TaggedItem, Webhook
+from .webhooks import clear_webhook_index, enqueue_object
 
 #
 # Change logging/webhooks
@@ -23,16 +26,34 @@ from .webhooks import enqueue_object, get_snapshots, serialize_for_webhook
 clear_webhooks = Signal()
 
 
-def is_same_object(instance, webhook_data, request_id):
+def enqueue_objectchange(objectchange, request):
     """
-    Compare the given instance to the most recent queued webhook object, returning True
-    if they match. This check is used to avoid creating duplicate webhook entries.
+    Queue an ObjectChange to be written to the database in bulk upon exiting the change_logging() context.
     """
-    return (
-        ContentType.objects.get_for_model(instance) == webhook_data['content_type'] and
-        instance.pk == webhook_data['object_id'] and
-        request_id == webhook_data['request_id']
-    )
+    objectchange.time = timezone.now()
+    objectchange.user = request.user
+    objectchange.user_name = request.user.username
+    objectchange.request_id = request.id
+
+    # Discard any cached references to the changed and related objects, as they may be deleted before the ObjectChange
+    # is written (which bulk_create() would otherwise reject)
+    for field_name in ('changed_object', 'related_object'):
+        field = objectchange._meta.get_field(field_name)
+        if field.is_cached(objectchange):
+            field.delete_cached_value(objectchange)
+
+    # Mark the ObjectChange as committed once the change is. If the transaction or savepoint in which the change was made
+    # is rolled back instead, Django discards this callback, and change_logging() discards the ObjectChange.
+    def commit():
+        objectchange._committed = True
+
+    objectchange._committed = False
+    objectchange._on_commit = commit
+    transaction.on_commit(commit)
+
+    queue = objectchange_queue.get()
+    queue.append(objectchange)
+    objectchange_queue.set(queue)
 
 
 @receiver((post_save, m2m_changed))
@@ -65,27 +86,21 @@ def handle_changed_object(sender, instance, **kwargs):
     # Record an ObjectChange if applicable
     if hasattr(instance, 'to_objectchange'):
         if m2m_changed:
-            ObjectChange.objects.filter(
-                changed_object_type=ContentType.objects.get_for_model(instance),
-                changed_object_id=instance.pk,
-                request_id=request.id
-            ).update(
-                postchange_data=instance.to_objectchange(action).postchange_data
-            )
+            # Update the most recent queued ObjectChange for the object (if any) with the new M2M assignments
+            content_type = ContentType.objects.get_for_model(instance)
+            for objectchange in reversed(objectchange_queue.get()):
+                if (
+                    objectchange.changed_object_type_id == content_type.pk and
+                    objectchange.changed_object_id == instance.pk
+                ):
+                    objectchange.postchange_data = instance.to_objectchange(action).postchange_data
+                    break
         else:
-            objectchange = instance.to_objectchange(action)
-            objectchange.user = request.user
-            objectchange.request_id = request.id
-            objectchange.save()
+            enqueue_objectchange(instance.to_objectchange(action), request)
 
-    # If this is an M2M change, update the previously queued webhook (from post_save)
+    # Enqueue webhooks (an M2M change updates any event previously queued for the object from post_save)
     queue = webhooks_queue.get()
-    if m2m_changed and queue and is_same_object(instance, queue[-1], request.id):
-        instance.refresh_from_db()  # Ensure that we're working with fresh M2M assignments
-        queue[-1]['data'] = serialize_for_webhook(instance)
-        queue[-1]['snapshots']['postchange'] = get_snapshots(instance, action)['postchange']
-    else:
-        enqueue_object(queue, instance, request.user, request.id, action)
+    enqueue_object(queue, instance, request.user, request.id, action, refresh=m2m_changed)
     webhooks_queue.set(queue)
 
     # Increment metric counters
@@ -109,10 +124,7 @@ def handle_deleted_object(sender, instance, **kwargs):
     if hasattr(instance, 'to_objectchange'):
         if hasattr(instance, 'snapshot') and not getattr(instance, '_prechange_snapshot', None):
             instance.snapshot()
-        objectchange = instance.to_objectchange(ObjectChangeActionChoices.ACTION_DELETE)
-        objectchange.user = request.user
-        objectchange.request_id = request.id
-        objectchange.save()
+        enqueue_objectchange(instance.to_objectchange(ObjectChangeActionChoices.ACTION_DELETE), request)
 
     # Enqueue webhooks
     queue = webhooks_queue.get()
@@ -130,7 +142,57 @@ def clear_webhook_queue(sender, **kwargs):
     """
     logger = logging.getLogger('webhooks')
     logger.info(f"Clearing {len(webhooks_queue.get())} queued webhooks ({sender})")
-    webhooks_queue.set([])
+    webhooks_queue.set({})
+
+
+@receiver(clear_webhooks)
+def clear_objectchange_queue(sender, **kwargs):
+    """
+    Delete any queued ObjectChanges, as the changes they record have been rolled back
+    """
+    logger = logging.getLogger('netbox.changelog')
+    logger.info(f"Clearing {len(objectchange_queue.get())} queued change records ({sender})")
+    objectchange_queue.set([])
+
+
+#
+# Webhooks
+#
+
+def handle_webhook_changed(**kwargs):
+    """
+    Invalidate the cached index of enabled Webhooks whenever a Webhook or its assigned content types are changed.
+    """
+    clear_webhook_index()
+    # Clear the index again upon commit, in case it has been rebuilt from uncommitted data in the meantime
+    transaction.on_commit(clear_webhook_index)
+
+
+post_save.connect(handle_webhook_changed, sender=Webhook)
+post_delete.connect(handle_webhook_changed, sender=Webhook)
+m2m_changed.connect(handle_webhook_changed, sender=Webhook.content_types.through)
+
+
+#
+# Cached config contexts
+#
+
+@receiver((post_save, post_delete))
+def handle_config_context_dependency_changed(sender, instance, raw=False, **kwargs):
+    """
+    Invalidate any cached config context data which depends on an object that has been saved or deleted.
+    """
+    if not raw:
+        invalidate_for_instance(instance, deleted=kwargs['signal'] is post_delete)
+
+
+@receiver(m2m_changed)
+def handle_config_context_assignment_changed(sender, instance, action, model, pk_set, **kwargs):
+    """
+    Invalidate any cached config context data which depends on a many-to-many assignment that has changed.
+    """
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_for_m2m_change(instance, model, pk_set)
 
 
 #
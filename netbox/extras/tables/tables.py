@@ -294,6 +294,9 @@ class WebhookTable(NetBoxTable):
     type_job_end = columns.BooleanColumn(
         verbose_name=_('Job End')
     )
+    batch_size = tables.Column(
+        verbose_name=_('Batch Size')
+    )
     ssl_validation = columns.BooleanColumn(
         verbose_name=_('SSL Validation')
     )
@@ -305,8 +308,8 @@ class WebhookTable(NetBoxTable):
         model = Webhook
         fields = (
             'pk', 'id', 'name', 'content_types', 'enabled', 'type_create', 'type_update', 'type_delete',
-            'type_job_start', 'type_job_end', 'http_method', 'payload_url', 'secret', 'ssl_validation', 'ca_file_path',
-            'tags', 'created', 'last_updated',
+            'type_job_start', 'type_job_end', 'http_method', 'payload_url', 'secret', 'batch_size', 'ssl_validation',
+            'ca_file_path', 'tags', 'created', 'last_updated',
         )
         default_columns = (
             'pk', 'name', 'content_types', 'enabled', 'type_create', 'type_update', 'type_delete', 'type_job_start',
@@ -1,13 +1,26 @@
+import uuid
+from datetime import timedelta
+from unittest.mock import patch
+
 from django.contrib.contenttypes.models import ContentType
+from django.db import connection, transaction
+from django.test import RequestFactory, TestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 
 from dcim.choices import SiteStatusChoices
 from dcim.models import Site
 from extras.choices import *
+from extras.context_managers import change_logging
 from extras.models import CustomField, CustomFieldChoiceSet, ObjectChange, Tag
+from extras.housekeeping import delete_in_batches, purge_expired_changes
+from extras.partitioning import (
+    convert_to_partitioned, create_partitions, drop_expired_partitions, get_partitions, is_partitioned,
+)
 from utilities.testing import APITestCase
 from utilities.testing.utils import create_tags, post_data
+from users.models import ObjectPermission
 from utilities.testing.views import ModelViewTestCase
 
 
@@ -207,6 +220,39 @@ class ChangeLogViewTest(ModelViewTestCase):
         self.assertEqual(objectchange.prechange_data['slug'], sites[0].slug)
         self.assertEqual(objectchange.postchange_data, None)
 
+    def test_rolled_back_savepoint(self):
+        request = RequestFactory().get('/')
+        request.id = uuid.uuid4()
+        request.user = self.user
+
+        with change_logging(request):
+            Site.objects.create(name='Site 1', slug='site-1')
+            time = timezone.now()
+            try:
+                with transaction.atomic():
+                    Site.objects.create(name='Site 2', slug='site-2')
+                    raise ValueError
+            except ValueError:
+                pass
+
+        # Only the change which was not rolled back is recorded, with the time at which it was made
+        objectchange = ObjectChange.objects.get()
+        self.assertEqual(objectchange.object_repr, 'Site 1')
+        self.assertLessEqual(objectchange.time, time)
+
+    def test_failed_objectchange_write(self):
+        request = RequestFactory().get('/')
+        request.id = uuid.uuid4()
+        request.user = self.user
+
+        # If the change records cannot be written, the changes they record are rolled back
+        with patch.object(ObjectChange, 'encode_deltas', side_effect=ValueError):
+            with self.assertRaises(ValueError):
+                with change_logging(request):
+                    Site.objects.create(name='Site 1', slug='site-1')
+        self.assertFalse(Site.objects.filter(slug='site-1').exists())
+        self.assertFalse(ObjectChange.objects.exists())
+
 
 class ChangeLogAPITest(APITestCase):
 
@@ -414,6 +460,79 @@ class ChangeLogAPITest(APITestCase):
         self.assertEqual(objectchange.postchange_data['name'], data[0]['name'])
         self.assertEqual(objectchange.postchange_data['slug'], data[0]['slug'])
 
+    @override_settings(CHANGELOG_SNAPSHOT_INTERVAL=3)
+    def test_delta_encoded_changes(self):
+        self.add_permissions('dcim.add_site', 'dcim.change_site', 'extras.view_objectchange')
+        response = self.client.post(
+            reverse('dcim-api:site-list'), {'name': 'Site 1', 'slug': 'site-1'}, format='json', **self.header
+        )
+        self.assertHttpStatus(response, status.HTTP_201_CREATED)
+        url = reverse('dcim-api:site-detail', kwargs={'pk': response.data['id']})
+        for i in range(2, 5):
+            response = self.client.patch(url, {'name': f'Site {i}'}, format='json', **self.header)
+            self.assertHttpStatus(response, status.HTTP_200_OK)
+
+        # A full snapshot is recorded for every third change
+        objectchanges = ObjectChange.objects.order_by('time', 'pk')
+        self.assertEqual([oc.delta_depth for oc in objectchanges], [0, 1, 2, 0])
+        self.assertIsNone(objectchanges[2].prechange_data)
+        self.assertEqual(objectchanges[2].postchange_data['changed']['name'], 'Site 3')
+        self.assertNotIn('slug', objectchanges[2].postchange_data['changed'])
+
+        # Complete data is rebuilt when reading a delta-encoded change
+        response = self.client.get(
+            reverse('extras-api:objectchange-detail', kwargs={'pk': objectchanges[2].pk}), **self.header
+        )
+        self.assertHttpStatus(response, status.HTTP_200_OK)
+        self.assertEqual(response.data['prechange_data']['name'], 'Site 2')
+        self.assertEqual(response.data['postchange_data']['name'], 'Site 3')
+        self.assertEqual(response.data['postchange_data']['slug'], 'site-1')
+
+        # A change made without recording an ObjectChange is reflected in the rebuilt pre-change data
+        Site.objects.filter(pk=objectchanges[3].changed_object_id).update(description='Foo')
+        response = self.client.patch(url, {'name': 'Site 5'}, format='json', **self.header)
+        self.assertHttpStatus(response, status.HTTP_200_OK)
+        objectchange = ObjectChange.objects.order_by('time', 'pk').last()
+        self.assertEqual(objectchange.delta_depth, 1)
+        self.assertEqual(objectchange.get_prechange_data()['description'], 'Foo')
+        self.assertEqual(objectchange.get_prechange_data()['name'], 'Site 4')
+        self.assertEqual(objectchange.get_postchange_data()['description'], 'Foo')
+        self.assertEqual(objectchange.get_postchange_data()['name'], 'Site 5')
+
+        # The data for a list of changes is rebuilt in bulk
+        objectchanges = list(ObjectChange.objects.rebuild_deltas())
+        with self.assertNumQueries(0):
+            for objectchange in objectchanges:
+                objectchange.get_data()
+        response = self.client.get(reverse('extras-api:objectchange-list'), **self.header)
+        self.assertHttpStatus(response, status.HTTP_200_OK)
+        self.assertEqual(
+            [oc['postchange_data']['name'] for oc in reversed(response.data['results'])],
+            ['Site 1', 'Site 2', 'Site 3', 'Site 4', 'Site 5']
+        )
+
+    def test_rolled_back_changes(self):
+        data = {
+            'name': 'Site 1',
+            'slug': 'site-1',
+            'status': SiteStatusChoices.STATUS_ACTIVE,
+        }
+        obj_perm = ObjectPermission(
+            name='Test permission',
+            constraints={'status': SiteStatusChoices.STATUS_PLANNED},
+            actions=['add']
+        )
+        obj_perm.save()
+        obj_perm.users.add(self.user)
+        obj_perm.object_types.add(ContentType.objects.get_for_model(Site))
+        url = reverse('dcim-api:site-list')
+
+        # The site is saved, then rolled back for violating the permission constraint
+        response = self.client.post(url, data, format='json', **self.header)
+        self.assertHttpStatus(response, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(Site.objects.count(), 0)
+        self.assertEqual(ObjectChange.objects.count(), 0)
+
     def test_bulk_delete_objects(self):
         sites = (
             Site(name='Site 1', slug='site-1'),
@@ -451,3 +570,110 @@ class ChangeLogAPITest(APITestCase):
         self.assertEqual(objectchange.prechange_data['name'], 'Site 1')
         self.assertEqual(objectchange.prechange_data['slug'], 'site-1')
         self.assertEqual(objectchange.postchange_data, None)
+
+
+class ChangeLogPartitioningTest(TestCase):
+
+    @staticmethod
+    def _create_objectchange(site):
+        objectchange = site.to_objectchange(ObjectChangeActionChoices.ACTION_UPDATE)
+        objectchange.user_name = 'user1'
+        objectchange.request_id = uuid.uuid4()
+        objectchange.save()
+        return objectchange
+
+    def test_partitioning(self):
+        site = Site.objects.create(name='Site 1', slug='site-1')
+        objectchange1 = self._create_objectchange(site)
+        self.assertFalse(is_partitioned())
+
+        convert_to_partitioned(months_ahead=2)
+        self.assertTrue(is_partitioned())
+
+        # The existing table is retained as a partition, alongside two future months and the default partition
+        partitions = get_partitions()
+        self.assertEqual(len(partitions), 4)
+        self.assertEqual(partitions[0][0], 'extras_objectchange_legacy')
+        self.assertEqual(partitions[-1], ('extras_objectchange_default', None))
+
+        # Existing records are retained, and new records continue to be assigned unique IDs
+        objectchange2 = self._create_objectchange(site)
+        self.assertGreater(objectchange2.pk, objectchange1.pk)
+        self.assertEqual(ObjectChange.objects.count(), 2)
+
+        # Dropping expired partitions removes the existing table only once all of its records have expired
+        self.assertEqual(drop_expired_partitions(objectchange2.time), [])
+        self.assertEqual(drop_expired_partitions(partitions[0][1]), ['extras_objectchange_legacy'])
+        self.assertEqual(ObjectChange.objects.count(), 0)
+
+    def test_create_partitions(self):
+        site = Site.objects.create(name='Site 1', slug='site-1')
+        convert_to_partitioned(months_ahead=0)
+
+        # A record for a month beyond the last partition is stored in the default partition
+        objectchange = site.to_objectchange(ObjectChangeActionChoices.ACTION_UPDATE)
+        objectchange.user_name = 'user1'
+        objectchange.request_id = uuid.uuid4()
+        objectchange.time = get_partitions()[0][1] + timedelta(days=1)
+        objectchange.save()
+
+        # Creating a partition for that month moves the record into it
+        created = create_partitions(months_ahead=1)
+        self.assertEqual(len(created), 1)
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT id FROM "{created[0]}"')
+            self.assertEqual(cursor.fetchall(), [(objectchange.pk,)])
+            cursor.execute('SELECT COUNT(*) FROM "extras_objectchange_default"')
+            self.assertEqual(cursor.fetchone()[0], 0)
+        self.assertEqual(get_partitions()[-1], ('extras_objectchange_default', None))
+
+
+class ChangeLogPurgeTest(TestCase):
+
+    def test_purge_expired_changes(self):
+        site = Site.objects.create(name='Site 1', slug='site-1')
+        for _ in range(5):
+            objectchange = site.to_objectchange(ObjectChangeActionChoices.ACTION_UPDATE)
+            objectchange.user_name = 'user1'
+            objectchange.request_id = uuid.uuid4()
+            objectchange.save()
+        cutoff = ObjectChange.objects.order_by('time').last().time
+
+        # Delete a limited number of batches
+        messages = []
+        deleted = delete_in_batches(
+            ObjectChange.objects.filter(time__lt=cutoff), batch_size=2, max_batches=1, raw=True, log=messages.append
+        )
+        self.assertEqual(deleted, 2)
+        self.assertEqual(len(messages), 1)
+        self.assertEqual(ObjectChange.objects.count(), 3)
+
+        # Delete all remaining expired records
+        self.assertEqual(purge_expired_changes(cutoff, batch_size=2), 2)
+        self.assertEqual(ObjectChange.objects.count(), 1)
+
+    def test_purge_delta_encoded_changes(self):
+        site = Site.objects.create(name='Site 1', slug='site-1')
+        now = timezone.now()
+        objectchanges = []
+        for i in range(2, 7):
+            site.snapshot()
+            site.name = f'Site {i}'
+            objectchange = site.to_objectchange(ObjectChangeActionChoices.ACTION_UPDATE)
+            objectchange.user_name = 'user1'
+            objectchange.request_id = uuid.uuid4()
+            objectchange.time = now - timedelta(minutes=10 - i)
+            objectchanges.append(objectchange)
+        ObjectChange.encode_deltas(objectchanges, 4)
+        ObjectChange.objects.bulk_create(objectchanges)
+        self.assertEqual([oc.delta_depth for oc in objectchanges], [0, 1, 2, 3, 0])
+
+        # The oldest remaining change is re-materialized as a full snapshot before its base is deleted
+        self.assertEqual(purge_expired_changes(objectchanges[2].time), 2)
+        objectchanges = ObjectChange.objects.order_by('time', 'pk')
+        self.assertEqual([oc.delta_depth for oc in objectchanges], [0, 1, 0])
+        self.assertEqual(objectchanges[0].prechange_data['name'], 'Site 3')
+        self.assertEqual(objectchanges[0].postchange_data['name'], 'Site 4')
+        self.assertEqual(objectchanges[0].postchange_data['slug'], 'site-1')
+        self.assertEqual(objectchanges[1].get_prechange_data()['name'], 'Site 4')
+        self.assertEqual(objectchanges[1].get_postchange_data()['name'], 'Site 5')
@@ -0,0 +1,68 @@
+from concurrent.futures.process import BrokenProcessPool
+from unittest.mock import Mock, patch
+
+from django.test import TestCase, override_settings
+
+from dcim.models import Device, DeviceRole
+from extras import configtemplates
+from extras.configtemplates import render_config_templates
+from extras.models import ConfigTemplate
+from utilities.testing import create_test_device
+
+
+class RenderConfigTemplatesTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(1, 4):
+            create_test_device(f'Device {i}', local_context_data={'foo': i})
+        config_template = ConfigTemplate.objects.create(
+            name='Config Template 1',
+            template_code='{{ device.name }}: {{ foo }}{{ bar }}'
+        )
+        DeviceRole.objects.update(config_template=config_template)
+
+    def tearDown(self):
+        # Shut down any process pool started by a test
+        if configtemplates._pool is not None:
+            configtemplates._pool.shutdown()
+            configtemplates._pool = None
+
+    def get_devices(self):
+        return Device.objects.order_by('name').annotate_config_context_data()
+
+    def test_render(self):
+        records = list(render_config_templates(self.get_devices(), 'device', extra_context={'bar': 'X'}))
+        self.assertEqual(
+            [record['content'] for record in records],
+            ['Device 1: 1X', 'Device 2: 2X', 'Device 3: 3X']
+        )
+
+    def test_render_error(self):
+        ConfigTemplate.objects.update(template_code='{{ device.name }}: {{ 2 / (foo - 2) }}')
+        records = list(render_config_templates(self.get_devices(), 'device'))
+
+        # An exception raised while rendering the template for one object is reported as its error
+        self.assertEqual(records[0]['content'], 'Device 1: -2.0')
+        self.assertEqual(records[1]['error'], 'An error occurred while rendering the template: ZeroDivisionError: division by zero')
+        self.assertEqual(records[2]['content'], 'Device 3: 2.0')
+
+    @override_settings(CONFIG_RENDER_PROCESSES=2)
+    def test_render_in_process_pool(self):
+        records = list(render_config_templates(self.get_devices(), 'device', extra_context={'bar': 'X'}))
+        self.assertIsNotNone(configtemplates._pool)
+        self.assertEqual(
+            [record['content'] for record in records],
+            ['Device 1: 1X', 'Device 2: 2X', 'Device 3: 3X']
+        )
+
+    @override_settings(CONFIG_RENDER_PROCESSES=2)
+    def test_broken_process_pool(self):
+        pool = Mock()
+        pool.map.side_effect = BrokenProcessPool
+        with patch.object(configtemplates, '_pool', pool):
+            with self.assertRaises(BrokenProcessPool):
+                list(render_config_templates(self.get_devices(), 'device'))
+
+            # The broken pool is discarded, so that a new one is started for the next request
+            self.assertIsNone(configtemplates._pool)
@@ -1,8 +1,16 @@
+import itertools
+from unittest.mock import patch
+
 from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
 from django.test import TestCase
 
-from dcim.models import Device, DeviceRole, DeviceType, Location, Manufacturer, Platform, Region, Site, SiteGroup
-from extras.models import ConfigContext, Tag
+from dcim.models import (
+    Device, DeviceRole, DeviceType, Location, Manufacturer, Platform, Rack, Region, Site, SiteGroup,
+)
+from extras.configcontexts import get_config_context_index, refresh_cached_config_contexts
+from extras.models import CachedConfigContext, ConfigContext, ConfigTemplate, Tag
+from extras.models.configs import get_template_models
 from tenancy.models import Tenant, TenantGroup
 from utilities.exceptions import AbortRequest
 from virtualization.models import Cluster, ClusterGroup, ClusterType, VirtualMachine
@@ -164,6 +172,102 @@ class ConfigContextTest(TestCase):
         annotated_queryset = Device.objects.filter(name=device.name).annotate_config_context_data()
         self.assertEqual(device.get_config_context(), annotated_queryset[0].get_config_context())
 
+    def test_config_context_index(self):
+        device = Device.objects.first()
+        context = ConfigContext.objects.create(name='context 1', weight=100, data={'a': 1})
+        index = get_config_context_index()
+        self.assertIs(get_config_context_index(), index)
+        self.assertEqual(index.get_for_object(device), [(context.pk, {'a': 1})])
+
+        # Assigning the ConfigContext to a different site should rebuild the index
+        site = Site.objects.create(name='Site 2', slug='site-2')
+        context.sites.add(site)
+        self.assertIsNot(get_config_context_index(), index)
+        index = get_config_context_index()
+        self.assertEqual(ConfigContext.objects.get_for_object(device).count(), 0)
+        self.assertEqual(device.get_config_context(), {})
+
+        # Deleting the assigned site (which removes the assignment without sending m2m_changed) should rebuild the index
+        site.delete()
+        self.assertIsNot(get_config_context_index(), index)
+        self.assertEqual(device.get_config_context(), {'a': 1})
+        index = get_config_context_index()
+
+        # Updating ConfigContexts in bulk (which sends no signals) should rebuild the index
+        ConfigContext.objects.update(data={'a': 2})
+        self.assertIsNot(get_config_context_index(), index)
+        self.assertEqual(device.get_config_context(), {'a': 2})
+
+        # An index reflecting changes which have been rolled back should be discarded
+        with transaction.atomic():
+            ConfigContext.objects.create(name='context 2', weight=200, data={'b': 2})
+            self.assertEqual(device.get_config_context(), {'a': 2, 'b': 2})
+            transaction.set_rollback(True)
+        self.assertEqual(device.get_config_context(), {'a': 2})
+
+    def test_cached_config_context(self):
+        device = Device.objects.first()
+        context = ConfigContext.objects.create(name='context 1', weight=100, data={'a': 1})
+        refresh_cached_config_contexts()
+        cached = CachedConfigContext.objects.get(object_id=device.pk)
+        self.assertEqual(cached.data, [{'a': 1}])
+
+        # Cached data is used in place of resolving config contexts
+        CachedConfigContext.objects.filter(pk=cached.pk).update(data=[{'a': 2}])
+        annotated_queryset = Device.objects.filter(pk=device.pk).annotate_config_context_data()
+        self.assertEqual(annotated_queryset[0].get_config_context(), {'a': 2})
+        self.assertEqual(Device.objects.get(pk=device.pk).get_config_context(), {'a': 2})
+
+        # Changing a ConfigContext invalidates all cached data
+        context.data = {'a': 3}
+        context.save()
+        self.assertFalse(CachedConfigContext.objects.exists())
+        annotated_queryset = Device.objects.filter(pk=device.pk).annotate_config_context_data()
+        self.assertEqual(annotated_queryset[0].get_config_context(), {'a': 3})
+
+        # Changing the tags assigned to a device invalidates its cached data
+        refresh_cached_config_contexts()
+        device.tags.add(Tag.objects.first())
+        self.assertFalse(CachedConfigContext.objects.filter(object_id=device.pk).exists())
+
+        # Changing the region of a device's site invalidates its cached data
+        region = Region.objects.create(name='Region 2', slug='region-2')
+        refresh_cached_config_contexts()
+        site = device.site
+        site.region = region
+        site.save()
+        self.assertFalse(CachedConfigContext.objects.filter(object_id=device.pk).exists())
+
+        # Moving the rack of a device to another site (which updates the device's site) invalidates its cached data
+        rack = Rack.objects.create(name='Rack 1', site=site)
+        device.rack = rack
+        device.save()
+        refresh_cached_config_contexts()
+        rack.site = Site.objects.create(name='Site 2', slug='site-2')
+        rack.save()
+        self.assertFalse(CachedConfigContext.objects.filter(object_id=device.pk).exists())
+
+        # Moving the parent location of a device's location to another site invalidates its cached data
+        location1 = Location.objects.create(name='Location 1', slug='location-1', site=rack.site)
+        location2 = Location.objects.create(name='Location 2', slug='location-2', site=rack.site, parent=location1)
+        rack.location = location2
+        rack.save()
+        refresh_cached_config_contexts()
+        location1.site = site
+        location1.save()
+        self.assertFalse(CachedConfigContext.objects.filter(object_id=device.pk).exists())
+
+    def test_cached_config_context_invalidated_during_refresh(self):
+        ConfigContext.objects.create(name='context 1', weight=100, data={'a': 1})
+
+        # Data which is invalidated each time it has been computed is not cached
+        with patch('extras.configcontexts.get_generation', side_effect=itertools.count()):
+            self.assertEqual(refresh_cached_config_contexts('dcim.device'), 0)
+        self.assertFalse(CachedConfigContext.objects.exists())
+
+        self.assertEqual(refresh_cached_config_contexts('dcim.device'), Device.objects.count())
+        self.assertTrue(CachedConfigContext.objects.exists())
+
     def test_annotation_same_as_get_for_object_device_relations(self):
         region = Region.objects.first()
         sitegroup = SiteGroup.objects.first()
@@ -438,3 +542,51 @@ class ConfigContextTest(TestCase):
         annotated_queryset = Device.objects.filter(name=device.name).annotate_config_context_data()
         self.assertEqual(ConfigContext.objects.get_for_object(device).count(), 2)
         self.assertEqual(device.get_config_context(), annotated_queryset[0].get_config_context())
+
+
+class ConfigTemplateTest(TestCase):
+
+    def test_render(self):
+        Site.objects.create(name='Site 1', slug='site-1')
+        config_template = ConfigTemplate.objects.create(
+            name='Config Template 1',
+            template_code='{{ foo }} {{ dcim.Site.objects.first().name }}'
+        )
+        self.assertEqual(config_template.render({'foo': 'bar'}), 'bar Site 1')
+
+    def test_render_isolated_namespace(self):
+        config_template = ConfigTemplate.objects.create(
+            name='Config Template 1',
+            template_code="{{ dcim.pop('Site') }}"
+        )
+        config_template.render()
+
+        # Changes made to the model namespace by a template do not persist
+        self.assertIn('Site', get_template_models()['dcim'])
+        self.assertEqual(config_template.render(), "<class 'dcim.models.sites.Site'>")
+
+    def test_compiled_template_cache(self):
+        config_template = ConfigTemplate.objects.create(
+            name='Config Template 1',
+            template_code='Foo: {{ foo }}'
+        )
+        template = config_template.get_template()
+
+        # The compiled template should be reused until the ConfigTemplate is modified
+        self.assertIs(ConfigTemplate.objects.get(pk=config_template.pk).get_template(), template)
+        config_template.template_code = 'Bar: {{ foo }}'
+        config_template.save()
+        self.assertIsNot(config_template.get_template(), template)
+        self.assertEqual(config_template.render({'foo': 1}), 'Bar: 1')
+
+    def test_bytecode_cache_environment_params(self):
+        config_template = ConfigTemplate.objects.create(
+            name='Config Template 1',
+            template_code='[[ foo ]] {{ foo }}'
+        )
+        self.assertEqual(config_template.render({'foo': 1}), '[[ foo ]] 1')
+
+        # Bytecode compiled with different environment parameters should not be reused
+        config_template.environment_params = {'variable_start_string': '[[', 'variable_end_string': ']]'}
+        config_template.save()
+        self.assertEqual(config_template.render({'foo': 1}), '1 {{ foo }}')
@@ -13,8 +13,11 @@ from dcim.choices import SiteStatusChoices
 from dcim.models import Site
 from extras.choices import ObjectChangeActionChoices
 from extras.models import Tag, Webhook
-from extras.webhooks import enqueue_object, flush_webhooks, generate_signature, serialize_for_webhook
-from extras.webhooks_worker import eval_conditions, process_webhook
+from extras.webhooks import (
+    clear_webhook_index, enqueue_object, flush_webhooks, generate_signature, serialize_for_webhook,
+)
+from extras import webhooks_worker
+from extras.webhooks_worker import SessionPool, eval_conditions, get_compiled_webhook, process_webhook
 from utilities.testing import APITestCase
 
 
@@ -27,6 +30,9 @@ class WebhookTest(APITestCase):
         self.queue = django_rq.get_queue('default')
         self.queue.empty()
 
+        # Discard any webhook index cached by a previous test
+        clear_webhook_index()
+
     @classmethod
     def setUpTestData(cls):
 
@@ -122,6 +128,35 @@ class WebhookTest(APITestCase):
             self.assertEqual(job.kwargs['snapshots']['postchange']['name'], response.data[i]['name'])
             self.assertEqual(job.kwargs['snapshots']['postchange']['tags'], ['Bar', 'Foo'])
 
+    def test_enqueue_webhook_batch(self):
+        Webhook.objects.filter(type_create=True).update(batch_size=2)
+
+        # Create multiple objects via the REST API
+        data = [
+            {
+                'name': f'Site {i}',
+                'slug': f'site-{i}',
+            } for i in range(1, 4)
+        ]
+        url = reverse('dcim-api:site-list')
+        self.add_permissions('dcim.add_site')
+        response = self.client.post(url, data, format='json', **self.header)
+        self.assertHttpStatus(response, status.HTTP_201_CREATED)
+        self.assertEqual(Site.objects.count(), 3)
+
+        # Verify that the objects were queued in two batches
+        self.assertEqual(self.queue.count, 2)
+        for job, sites in zip(self.queue.jobs, (response.data[:2], response.data[2:])):
+            self.assertEqual(job.func_name, 'extras.webhooks_worker.process_webhook_batch')
+            self.assertEqual(job.kwargs['webhook'], Webhook.objects.get(type_create=True))
+            self.assertEqual(job.kwargs['event'], ObjectChangeActionChoices.ACTION_CREATE)
+            self.assertEqual(job.kwargs['model_name'], 'site')
+            self.assertEqual([obj['id'] for obj in job.kwargs['data']], [site['id'] for site in sites])
+            self.assertEqual(
+                [obj['postchange']['name'] for obj in job.kwargs['snapshots']],
+                [site['name'] for site in sites]
+            )
+
     def test_enqueue_webhook_update(self):
         site = Site.objects.create(name='Site 1', slug='site-1')
         site.tags.set(Tag.objects.filter(name__in=['Foo', 'Bar']))
@@ -253,6 +288,62 @@ class WebhookTest(APITestCase):
             self.assertEqual(job.kwargs['snapshots']['prechange']['name'], sites[i].name)
             self.assertEqual(job.kwargs['snapshots']['prechange']['tags'], ['Bar', 'Foo'])
 
+    def test_enqueue_object_without_webhooks(self):
+        site = Site.objects.create(name='Site 1', slug='site-1')
+        tag = Tag.objects.first()
+
+        # No Webhook exists for tags, so the tag should not be enqueued
+        webhooks_queue = {}
+        for instance in (site, tag):
+            enqueue_object(
+                webhooks_queue,
+                instance=instance,
+                user=self.user,
+                request_id=uuid.uuid4(),
+                action=ObjectChangeActionChoices.ACTION_CREATE
+            )
+        self.assertEqual(len(webhooks_queue), 1)
+        self.assertEqual(list(webhooks_queue.values())[0]['object_id'], site.pk)
+
+        # Disabling the only creation Webhook for sites should invalidate the cached webhook index
+        webhook = Webhook.objects.get(type_create=True)
+        webhook.enabled = False
+        webhook.save()
+        webhooks_queue = {}
+        enqueue_object(
+            webhooks_queue,
+            instance=site,
+            user=self.user,
+            request_id=uuid.uuid4(),
+            action=ObjectChangeActionChoices.ACTION_CREATE
+        )
+        self.assertEqual(len(webhooks_queue), 0)
+
+    def test_enqueue_object_coalesce(self):
+        site = Site.objects.create(name='Site 1', slug='site-1')
+        request_id = uuid.uuid4()
+        webhooks_queue = {}
+
+        # Create the site, then update it twice within the same request
+        enqueue_object(webhooks_queue, site, self.user, request_id, ObjectChangeActionChoices.ACTION_CREATE)
+        for name in ('Site X', 'Site Y'):
+            site.snapshot()
+            site.name = name
+            site.save()
+            enqueue_object(webhooks_queue, site, self.user, request_id, ObjectChangeActionChoices.ACTION_UPDATE)
+
+        # The changes should be coalesced into a single creation event reflecting the final state of the site
+        self.assertEqual(len(webhooks_queue), 1)
+        data = list(webhooks_queue.values())[0]
+        self.assertEqual(data['event'], ObjectChangeActionChoices.ACTION_CREATE)
+        self.assertEqual(data['data']['name'], 'Site Y')
+        self.assertIsNone(data['snapshots']['prechange'])
+        self.assertEqual(data['snapshots']['postchange']['name'], 'Site Y')
+
+        # A change in a different request should be queued separately
+        enqueue_object(webhooks_queue, site, self.user, uuid.uuid4(), ObjectChangeActionChoices.ACTION_UPDATE)
+        self.assertEqual(len(webhooks_queue), 2)
+
     def test_webhook_conditions(self):
         # Create a conditional Webhook
         webhook = Webhook(
@@ -284,6 +375,22 @@ class WebhookTest(APITestCase):
         # Evaluate the conditions (status='active')
         self.assertTrue(eval_conditions(webhook, data))
 
+    def test_compiled_webhook_cache(self):
+        webhook = Webhook.objects.get(type_create=True)
+        context = {'event': 'created', 'data': {'name': 'Site 1'}}
+
+        # The compiled webhook is reused until the webhook is modified
+        compiled = get_compiled_webhook(webhook)
+        self.assertIs(get_compiled_webhook(Webhook.objects.get(pk=webhook.pk)), compiled)
+        self.assertEqual(compiled.render_headers(context), {'X-Foo': 'Bar'})
+        self.assertEqual(compiled.render_payload_url(context), webhook.payload_url)
+
+        webhook.additional_headers = 'X-Name: {{ data.name }}'
+        webhook.save()
+        recompiled = get_compiled_webhook(webhook)
+        self.assertIsNot(recompiled, compiled)
+        self.assertEqual(recompiled.render_headers(context), {'X-Name': 'Site 1'})
+
     def test_webhooks_worker(self):
 
         request_id = uuid.uuid4()
@@ -313,7 +420,7 @@ class WebhookTest(APITestCase):
             return HttpResponse()
 
         # Enqueue a webhook for processing
-        webhooks_queue = []
+        webhooks_queue = {}
         site = Site.objects.create(name='Site 1', slug='site-1')
         enqueue_object(
             webhooks_queue,
@@ -330,3 +437,47 @@ class WebhookTest(APITestCase):
         # Patch the Session object with our dummy_send() method, then process the webhook for sending
         with patch.object(Session, 'send', dummy_send) as mock_send:
             process_webhook(**job.kwargs)
+
+    def test_webhooks_worker_session_pool(self):
+        pool = SessionPool(max_per_target=2)
+        with pool.session('https://example.com/webhook/1') as session1:
+            pass
+        with pool.session('https://example.com/webhook/2') as session2:
+            pass
+        with pool.session('https://example.org/webhook/1') as session3:
+            pass
+        with pool.session('https://example.com/webhook/1', verify=False) as session4:
+            pass
+
+        # Sessions are shared per target and SSL verification setting
+        self.assertIs(session1, session2)
+        self.assertIsNot(session1, session3)
+        self.assertIsNot(session1, session4)
+        self.assertFalse(session4.verify)
+
+        # Process a webhook using the session pool
+        sent_requests = []
+
+        def dummy_send(session, request, **kwargs):
+            sent_requests.append((session, request))
+            return HttpResponse()
+
+        webhooks_queue = {}
+        site = Site.objects.create(name='Site 1', slug='site-1')
+        enqueue_object(
+            webhooks_queue,
+            instance=site,
+            user=self.user,
+            request_id=uuid.uuid4(),
+            action=ObjectChangeActionChoices.ACTION_CREATE
+        )
+        flush_webhooks(webhooks_queue)
+        job = self.queue.jobs[0]
+
+        with patch.object(webhooks_worker, 'session_pool', pool), patch.object(Session, 'send', dummy_send):
+            process_webhook(**job.kwargs)
+            process_webhook(**job.kwargs)
+        pool.close()
+
+        self.assertEqual(len(sent_requests), 2)
+        self.assertIs(sent_requests[0][0], sent_requests[1][0])
@@ -653,17 +653,19 @@ class ObjectChangeView(generic.ObjectView):
         next_change = objectchanges.filter(time__gt=instance.time).order_by('time').first()
         prev_change = objectchanges.filter(time__lt=instance.time).order_by('-time').first()
 
-        if not instance.prechange_data and instance.action in ['update', 'delete'] and prev_change:
+        # Rebuild the data for delta-encoded changes
+        prechange_data, postchange_data = instance.get_data()
+
+        if not prechange_data and not instance.delta_depth and instance.action in ['update', 'delete'] and prev_change:
             non_atomic_change = True
-            prechange_data = prev_change.postchange_data
+            prechange_data = prev_change.get_postchange_data()
         else:
             non_atomic_change = False
-            prechange_data = instance.prechange_data
 
-        if prechange_data and instance.postchange_data:
+        if prechange_data and postchange_data:
             diff_added = shallow_compare_dict(
                 prechange_data or dict(),
-                instance.postchange_data or dict(),
+                postchange_data or dict(),
                 exclude=['last_updated'],
             )
             diff_removed = {
@@ -674,6 +676,8 @@ class ObjectChangeView(generic.ObjectView):
             diff_removed = None
 
         return {
+            'prechange_data': instance.get_prechange_data(),
+            'postchange_data': postchange_data,
             'diff_added': diff_added,
             'diff_removed': diff_removed,
             'next_change': next_change,
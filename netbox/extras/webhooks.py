@@ -2,6 +2,7 @@ import hashlib
 import hmac
 
 from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
 from django.utils import timezone
 from django_rq import get_queue
 
@@ -14,6 +15,13 @@ from utilities.utils import serialize_object
 from .choices import *
 from .models import Webhook
 
+# Map each type of change to the Webhook field which enables it
+ACTION_FLAGS = {
+    ObjectChangeActionChoices.ACTION_CREATE: 'type_create',
+    ObjectChangeActionChoices.ACTION_UPDATE: 'type_update',
+    ObjectChangeActionChoices.ACTION_DELETE: 'type_delete',
+}
+
 
 def serialize_for_webhook(instance):
     """
@@ -55,10 +63,37 @@ def generate_signature(request_body, secret):
     return hmac_prep.hexdigest()
 
 
-def enqueue_object(queue, instance, user, request_id, action):
+def get_webhook_index():
+    """
+    Return the IDs of all content types for which at least one enabled Webhook exists, mapped by action flag (e.g.
+    `type_create`). The index is cached until any Webhook is modified.
+    """
+    index = cache.get('webhook_index')
+    if index is None:
+        index = {action_flag: set() for action_flag in ACTION_FLAGS.values()}
+        webhooks = Webhook.objects.filter(enabled=True).values_list('content_types', *ACTION_FLAGS.values())
+        for content_type_id, *flags in webhooks:
+            for action_flag, enabled in zip(ACTION_FLAGS.values(), flags):
+                if enabled and content_type_id is not None:
+                    index[action_flag].add(content_type_id)
+        cache.set('webhook_index', index, None)
+
+    return index
+
+
+def clear_webhook_index():
+    """
+    Invalidate the cached index of enabled Webhooks.
+    """
+    cache.delete('webhook_index')
+
+
+def enqueue_object(queue, instance, user, request_id, action, refresh=False):
     """
     Enqueue a serialized representation of a created/updated/deleted object for the processing of
-    webhooks once the request has completed.
+    webhooks once the request has completed. `queue` is a dictionary keyed by content type, object ID, and request ID.
+    If `refresh` is True (e.g. following an M2M change), the instance is reloaded from the database before it is
+    serialized.
     """
     # Determine whether this type of object supports webhooks
     app_label = instance._meta.app_label
@@ -66,20 +101,42 @@ def enqueue_object(queue, instance, user, request_id, action):
     if model_name not in registry['model_features']['webhooks'].get(app_label, []):
         return
 
-    queue.append({
-        'content_type': ContentType.objects.get_for_model(instance),
+    content_type = ContentType.objects.get_for_model(instance)
+
+    # Coalesce multiple changes to the same object within a request into a single event, retaining the original
+    # pre-change snapshot
+    key = (content_type.pk, instance.pk, request_id)
+    if key in queue:
+        if refresh:
+            instance.refresh_from_db()  # Ensure that we're working with fresh M2M assignments
+        data = queue[key]
+        if action != ObjectChangeActionChoices.ACTION_UPDATE:
+            data['event'] = action
+        data['data'] = serialize_for_webhook(instance)
+        data['snapshots']['postchange'] = get_snapshots(instance, action)['postchange']
+        return
+
+    # Skip serialization if no enabled Webhook exists for this type of object and action
+    if content_type.pk not in get_webhook_index()[ACTION_FLAGS[action]]:
+        return
+
+    if refresh:
+        instance.refresh_from_db()  # Ensure that we're working with fresh M2M assignments
+
+    queue[key] = {
+        'content_type': content_type,
         'object_id': instance.pk,
         'event': action,
         'data': serialize_for_webhook(instance),
         'snapshots': get_snapshots(instance, action),
         'username': user.username,
         'request_id': request_id
-    })
+    }
 
 
 def flush_webhooks(queue):
     """
-    Flush a list of object representation to RQ for webhook processing.
+    Flush a queue of object representations to RQ for webhook processing.
     """
     rq_queue_name = get_config().QUEUE_MAPPINGS.get('webhook', RQ_QUEUE_DEFAULT)
     rq_queue = get_queue(rq_queue_name)
@@ -88,14 +145,12 @@ def flush_webhooks(queue):
         'type_update': {},
         'type_delete': {},
     }
+    # Events for batched Webhooks, grouped by webhook, content type, and event
+    batches = {}
 
-    for data in queue:
+    for data in queue.values():
 
-        action_flag = {
-            ObjectChangeActionChoices.ACTION_CREATE: 'type_create',
-            ObjectChangeActionChoices.ACTION_UPDATE: 'type_update',
-            ObjectChangeActionChoices.ACTION_DELETE: 'type_delete',
-        }[data['event']]
+        action_flag = ACTION_FLAGS[data['event']]
         content_type = data['content_type']
 
         # Cache applicable Webhooks
@@ -108,6 +163,13 @@ def flush_webhooks(queue):
         webhooks = webhooks_cache[action_flag][content_type]
 
         for webhook in webhooks:
+            if webhook.batch_size:
+                batch = batches.setdefault((webhook.pk, content_type, data['event']), {
+                    'webhook': webhook,
+                    'events': [],
+                })
+                batch['events'].append(data)
+                continue
             rq_queue.enqueue(
                 "extras.webhooks_worker.process_webhook",
                 webhook=webhook,
@@ -120,3 +182,21 @@ def flush_webhooks(queue):
                 request_id=data['request_id'],
                 retry=get_rq_retry()
             )
+
+    # Enqueue a single job for each batch of events
+    for (_, content_type, event), batch in batches.items():
+        webhook = batch['webhook']
+        for i in range(0, len(batch['events']), webhook.batch_size):
+            events = batch['events'][i:i + webhook.batch_size]
+            rq_queue.enqueue(
+                "extras.webhooks_worker.process_webhook_batch",
+                webhook=webhook,
+                model_name=content_type.model,
+                event=event,
+                data=[data['data'] for data in events],
+                snapshots=[data['snapshots'] for data in events],
+                timestamp=str(timezone.now()),
+                username=events[0]['username'],
+                request_id=events[0]['request_id'],
+                retry=get_rq_retry()
+            )
@@ -1,16 +1,120 @@
+import json
 import logging
+import threading
+import urllib.parse
+from contextlib import contextmanager
 
 import requests
+from requests.adapters import HTTPAdapter
 from django.conf import settings
 from django_rq import job
 from jinja2.exceptions import TemplateError
+from jinja2.sandbox import SandboxedEnvironment
+from rest_framework.utils.encoders import JSONEncoder
 
 from .conditions import ConditionSet
 from .constants import WEBHOOK_EVENT_TYPES
+from .models import Webhook
 from .webhooks import generate_signature
 
 logger = logging.getLogger('netbox.webhooks_worker')
 
+# A SessionPool installed by a dedicated webhook worker (see the webhookworker management command). If None, a new
+# session is opened for each request.
+session_pool = None
+
+
+class SessionPool:
+    """
+    A set of persistent HTTP sessions, one per webhook target (scheme, host, and port) and SSL verification setting,
+    which allows connections to be kept alive and reused across deliveries. Sessions may be shared among threads; the
+    number of concurrent requests to any one target is limited to `max_per_target`.
+    """
+    def __init__(self, max_per_target=4):
+        self.max_per_target = max_per_target
+        self._sessions = {}
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    def _get_session(self, verify):
+        session = requests.Session()
+        session.verify = verify
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_per_target)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    @contextmanager
+    def session(self, url, verify=True):
+        """
+        Yield the Session for the target of the given URL, waiting until a request slot for the target is available.
+        """
+        url = urllib.parse.urlsplit(url)
+        target = (url.scheme, url.netloc)
+        with self._lock:
+            if (target, verify) not in self._sessions:
+                self._sessions[(target, verify)] = self._get_session(verify)
+            if target not in self._semaphores:
+                self._semaphores[target] = threading.BoundedSemaphore(self.max_per_target)
+            session = self._sessions[(target, verify)]
+            semaphore = self._semaphores[target]
+
+        with semaphore:
+            yield session
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+            self._semaphores.clear()
+
+
+# Compiled conditions and templates for each Webhook, keyed by ID. Entries are replaced whenever a Webhook is found to
+# have been modified since it was compiled.
+_compiled_webhooks = {}
+
+
+class CompiledWebhook:
+    """
+    The conditions and Jinja2 templates of a Webhook, compiled once for reuse across deliveries.
+    """
+    def __init__(self, webhook):
+        self.last_updated = webhook.last_updated
+        self.conditions = ConditionSet(webhook.conditions) if webhook.conditions else None
+
+        environment = SandboxedEnvironment()
+        environment.filters.update(settings.JINJA2_FILTERS)
+        self.headers_template = environment.from_string(webhook.additional_headers) \
+            if webhook.additional_headers else None
+        self.body_template = environment.from_string(webhook.body_template) if webhook.body_template else None
+        self.payload_url_template = environment.from_string(webhook.payload_url)
+
+    def render_headers(self, context):
+        if self.headers_template is None:
+            return {}
+        return Webhook.parse_headers(self.headers_template.render(**context))
+
+    def render_body(self, context):
+        if self.body_template is None:
+            return json.dumps(context, cls=JSONEncoder)
+        return self.body_template.render(**context)
+
+    def render_payload_url(self, context):
+        return self.payload_url_template.render(**context)
+
+
+def get_compiled_webhook(webhook):
+    """
+    Return the CompiledWebhook for the given Webhook, compiling it if it has not been seen or has since been modified.
+    """
+    compiled = _compiled_webhooks.get(webhook.pk)
+    if compiled is None or compiled.last_updated != webhook.last_updated:
+        compiled = CompiledWebhook(webhook)
+        if webhook.pk is not None:
+            _compiled_webhooks[webhook.pk] = compiled
+    return compiled
+
 
 def eval_conditions(webhook, data):
     """
@@ -21,48 +125,31 @@ def eval_conditions(webhook, data):
         return True
 
     logger.debug(f'Evaluating webhook conditions: {webhook.conditions}')
-    if ConditionSet(webhook.conditions).eval(data):
+    if get_compiled_webhook(webhook).conditions.eval(data):
         return True
 
     return False
 
 
-@job('default')
-def process_webhook(webhook, model_name, event, data, timestamp, username, request_id=None, snapshots=None):
+def send_webhook(webhook, context):
     """
-    Make a POST request to the defined Webhook
+    Render the request for a Webhook from the given context data and send it.
     """
-    # Evaluate webhook conditions (if any)
-    if not eval_conditions(webhook, data):
-        return
-
-    # Prepare context data for headers & body templates
-    context = {
-        'event': WEBHOOK_EVENT_TYPES[event],
-        'timestamp': timestamp,
-        'model': model_name,
-        'username': username,
-        'request_id': request_id,
-        'data': data,
-    }
-    if snapshots:
-        context.update({
-            'snapshots': snapshots
-        })
+    compiled = get_compiled_webhook(webhook)
 
     # Build the headers for the HTTP request
     headers = {
         'Content-Type': webhook.http_content_type,
     }
     try:
-        headers.update(webhook.render_headers(context))
+        headers.update(compiled.render_headers(context))
     except (TemplateError, ValueError) as e:
         logger.error(f"Error parsing HTTP headers for webhook {webhook}: {e}")
         raise e
 
     # Render the request body
     try:
-        body = webhook.render_body(context)
+        body = compiled.render_body(context)
     except TemplateError as e:
         logger.error(f"Error rendering request body for webhook {webhook}: {e}")
         raise e
@@ -70,7 +157,7 @@ def process_webhook(webhook, model_name, event, data, timestamp, username, reque
     # Prepare the HTTP request
     params = {
         'method': webhook.http_method,
-        'url': webhook.render_payload_url(context),
+        'url': compiled.render_payload_url(context),
         'headers': headers,
         'data': body.encode('utf8'),
     }
@@ -88,12 +175,15 @@ def process_webhook(webhook, model_name, event, data, timestamp, username, reque
     if webhook.secret != '':
         prepared_request.headers['X-Hook-Signature'] = generate_signature(prepared_request.body, webhook.secret)
 
-    # Send the request
-    with requests.Session() as session:
-        session.verify = webhook.ssl_verification
-        if webhook.ca_file_path:
-            session.verify = webhook.ca_file_path
-        response = session.send(prepared_request, proxies=settings.HTTP_PROXIES)
+    # Send the request, reusing a pooled connection to the target if possible
+    verify = webhook.ca_file_path or webhook.ssl_verification
+    if session_pool is not None:
+        with session_pool.session(prepared_request.url, verify) as session:
+            response = session.send(prepared_request, proxies=settings.HTTP_PROXIES)
+    else:
+        with requests.Session() as session:
+            session.verify = verify
+            response = session.send(prepared_request, proxies=settings.HTTP_PROXIES)
 
     if 200 <= response.status_code <= 299:
         logger.info(f"Request succeeded; response status {response.status_code}")
@@ -103,3 +193,59 @@ def process_webhook(webhook, model_name, event, data, timestamp, username, reque
         raise requests.exceptions.RequestException(
             f"Status {response.status_code} returned with content '{response.content}', webhook FAILED to process."
         )
+
+
+@job('default')
+def process_webhook(webhook, model_name, event, data, timestamp, username, request_id=None, snapshots=None):
+    """
+    Make a POST request to the defined Webhook
+    """
+    # Evaluate webhook conditions (if any)
+    if not eval_conditions(webhook, data):
+        return
+
+    # Prepare context data for headers & body templates
+    context = {
+        'event': WEBHOOK_EVENT_TYPES[event],
+        'timestamp': timestamp,
+        'model': model_name,
+        'username': username,
+        'request_id': request_id,
+        'data': data,
+    }
+    if snapshots:
+        context.update({
+            'snapshots': snapshots
+        })
+
+    return send_webhook(webhook, context)
+
+
+@job('default')
+def process_webhook_batch(webhook, model_name, event, data, timestamp, username, request_id=None, snapshots=None):
+    """
+    Make a single request to the defined Webhook for a batch of objects. `data` and `snapshots` are lists with one
+    entry per object.
+    """
+    snapshots = snapshots or [None] * len(data)
+
+    # Omit any objects which do not meet the webhook conditions (if any)
+    batch = [
+        (obj_data, obj_snapshots) for obj_data, obj_snapshots in zip(data, snapshots)
+        if eval_conditions(webhook, obj_data)
+    ]
+    if not batch:
+        return
+
+    # Prepare context data for headers & body templates
+    context = {
+        'event': WEBHOOK_EVENT_TYPES[event],
+        'timestamp': timestamp,
+        'model': model_name,
+        'username': username,
+        'request_id': request_id,
+        'data': [obj_data for obj_data, _ in batch],
+        'snapshots': [obj_snapshots for _, obj_snapshots in batch],
+    }
+
+    return send_webhook(webhook, context)
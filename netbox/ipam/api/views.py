@@ -12,6 +12,7 @@ from rest_framework.views import APIView
 
 from circuits.models import Provider
 from dcim.models import Site
+from extras.signals import clear_webhooks
 from ipam import filtersets
 from ipam.models import *
 from ipam.models import L2VPN, L2VPNTermination
@@ -309,6 +310,7 @@ class AvailableObjectsView(ObjectValidationMixin, APIView):
                     created = serializer.save()
                     self._validate_objects(created)
             except ObjectDoesNotExist:
+                clear_webhooks.send(sender=self)
                 raise PermissionDenied()
 
         return Response(serializer.data, status=status.HTTP_201_CREATED)
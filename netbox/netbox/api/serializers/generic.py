@@ -9,6 +9,7 @@ from utilities.utils import content_type_identifier
 
 __all__ = (
     'GenericObjectSerializer',
+    'SearchResultSerializer',
 )
 
 
@@ -43,3 +44,23 @@ class GenericObjectSerializer(serializers.Serializer):
         serializer = get_serializer_for_model(obj, prefix=NESTED_SERIALIZER_PREFIX)
         # context = {'request': self.context['request']}
         return serializer(obj, context=self.context).data
+
+
+class SearchResultSerializer(serializers.Serializer):
+    """
+    Representation of a matching CachedValue returned by a search backend.
+    """
+    object_type = serializers.SerializerMethodField(read_only=True)
+    object_id = serializers.IntegerField(read_only=True)
+    object = serializers.SerializerMethodField(read_only=True)
+    field = serializers.CharField(read_only=True)
+    value = serializers.CharField(read_only=True)
+    weight = serializers.IntegerField(read_only=True)
+
+    def get_object_type(self, obj):
+        return content_type_identifier(obj.object_type)
+
+    @extend_schema_field(serializers.JSONField(allow_null=True))
+    def get_object(self, obj):
+        serializer = get_serializer_for_model(obj.object, prefix=NESTED_SERIALIZER_PREFIX)
+        return serializer(obj.object, context=self.context).data
@@ -1,18 +1,32 @@
+import base64
+import binascii
 import platform
 
 from django import __version__ as DJANGO_VERSION
 from django.apps import apps
 from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.urls import reverse as reverse_url
 from django_rq.queues import get_connection
-from drf_spectacular.utils import extend_schema
+from drf_spectacular.utils import extend_schema, OpenApiParameter
 from drf_spectacular.types import OpenApiTypes
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.reverse import reverse
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.views import APIView
 from rq.worker import Worker
 
 from extras.plugins.utils import get_installed_plugins
 from netbox.api.authentication import IsAuthenticatedOrLoginNotRequired
+from netbox.api.serializers import SearchResultSerializer
+from netbox.config import get_config
+from netbox.forms import SearchForm
+from netbox.search import LookupTypes
+from netbox.search.backends import search_backend
+from netbox.search.suggestions import suggestion_index
+from utilities.permissions import get_permission_for_model, permission_is_exempt
+from utilities.utils import content_type_identifier, get_viewname
 
 
 class APIRootView(APIView):
@@ -35,6 +49,7 @@ class APIRootView(APIView):
             'extras': reverse('extras-api:api-root', request=request, format=format),
             'ipam': reverse('ipam-api:api-root', request=request, format=format),
             'plugins': reverse('plugins-api:api-root', request=request, format=format),
+            'search': reverse('api-search', request=request, format=format),
             'status': reverse('api-status', request=request, format=format),
             'tenancy': reverse('tenancy-api:api-root', request=request, format=format),
             'users': reverse('users-api:api-root', request=request, format=format),
@@ -70,3 +85,169 @@ class StatusView(APIView):
             'python-version': platform.python_version(),
             'rq-workers-running': Worker.count(get_connection('default')),
         })
+
+
+class SearchView(APIView):
+    """
+    Search all cached object representations. Results are ordered by weight, object type, and object ID, and are
+    paginated by cursor: Follow the `next` URL to retrieve the subsequent page of results. (Pages may contain fewer
+    than `limit` results where objects are omitted due to permissions.)
+    """
+    permission_classes = [IsAuthenticatedOrLoginNotRequired]
+    cursor_query_param = 'cursor'
+    limit_query_param = 'limit'
+
+    def get_view_name(self):
+        return "Search"
+
+    def _encode_cursor(self, position):
+        return base64.urlsafe_b64encode(':'.join(str(i) for i in position).encode()).decode()
+
+    def _decode_cursor(self, cursor):
+        try:
+            position = tuple(int(i) for i in base64.urlsafe_b64decode(cursor.encode()).decode().split(':'))
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            position = ()
+        if len(position) != 3:
+            raise ValidationError({self.cursor_query_param: "Invalid cursor."})
+        return position
+
+    def _get_limit(self, request):
+        limit = get_config().PAGINATE_COUNT
+        if self.limit_query_param in request.query_params:
+            try:
+                limit = int(request.query_params[self.limit_query_param])
+                if limit < 1:
+                    raise ValueError()
+            except ValueError:
+                raise ValidationError({self.limit_query_param: "Must be a positive integer."})
+        # Enforce maximum page size, if defined
+        if max_page_size := get_config().MAX_PAGE_SIZE:
+            limit = min(limit, max_page_size)
+        return limit
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter('q', OpenApiTypes.STR, required=True, description='Search value'),
+            OpenApiParameter('obj_types', OpenApiTypes.STR, many=True, description='Object types (app.model)'),
+            OpenApiParameter('lookup', OpenApiTypes.STR, description='Lookup type (default: icontains)'),
+            OpenApiParameter('limit', OpenApiTypes.INT, description='Number of results to return per page'),
+            OpenApiParameter('cursor', OpenApiTypes.STR, description='Pagination cursor'),
+        ],
+        responses={200: SearchResultSerializer(many=True)}
+    )
+    def get(self, request):
+        form = SearchForm(request.query_params)
+        if not form.is_valid():
+            raise ValidationError(form.errors)
+
+        # Restrict results by object type
+        object_types = []
+        for obj_type in form.cleaned_data['obj_types']:
+            app_label, model_name = obj_type.split('.')
+            object_types.append(ContentType.objects.get_by_natural_key(app_label, model_name))
+
+        after = None
+        if cursor := request.query_params.get(self.cursor_query_param):
+            after = self._decode_cursor(cursor)
+
+        results, position = search_backend.search_page(
+            form.cleaned_data['q'],
+            user=request.user,
+            object_types=object_types,
+            lookup=form.cleaned_data['lookup'] or LookupTypes.PARTIAL,
+            after=after,
+            limit=self._get_limit(request)
+        )
+
+        next_url = None
+        if position:
+            next_url = replace_query_param(
+                request.build_absolute_uri(), self.cursor_query_param, self._encode_cursor(position)
+            )
+
+        return Response({
+            'next': next_url,
+            'results': SearchResultSerializer(results, many=True, context={'request': request}).data,
+        })
+
+
+class SuggestView(APIView):
+    """
+    A lightweight endpoint returning typeahead suggestions for a search prefix, served from the suggestion index
+    (requires SEARCH_SUGGESTIONS to be enabled). Suggestions match the start of an indexed field value.
+    """
+    permission_classes = [IsAuthenticatedOrLoginNotRequired]
+    default_limit = 10
+    max_limit = 100
+
+    def get_view_name(self):
+        return "Search Suggestions"
+
+    def _get_permitted_ids(self, user, object_type, object_ids):
+        """
+        Return the subset of the given object IDs which the user is permitted to view.
+        """
+        model = object_type.model_class()
+        if model is None:
+            return set()
+        permission = get_permission_for_model(model, 'view')
+        if user.is_superuser or permission_is_exempt(permission):
+            return set(object_ids)
+        return set(model.objects.restrict(user, 'view').filter(pk__in=object_ids).values_list('pk', flat=True))
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter('q', OpenApiTypes.STR, required=True, description='Search prefix'),
+            OpenApiParameter('obj_types', OpenApiTypes.STR, many=True, description='Object types (app.model)'),
+            OpenApiParameter('limit', OpenApiTypes.INT, description='Maximum number of suggestions to return'),
+        ],
+        responses={200: OpenApiTypes.OBJECT}
+    )
+    def get(self, request):
+        if not settings.SEARCH_SUGGESTIONS:
+            raise ValidationError("Search suggestions are not enabled.")
+        q = request.query_params.get('q', '').strip()
+        if not q:
+            raise ValidationError({'q': "This parameter is required."})
+
+        try:
+            limit = min(int(request.query_params.get('limit', self.default_limit)), self.max_limit)
+            if limit < 1:
+                raise ValueError()
+        except ValueError:
+            raise ValidationError({'limit': "Must be a positive integer."})
+
+        object_type_ids = set()
+        for obj_type in request.query_params.getlist('obj_types'):
+            try:
+                app_label, model_name = obj_type.split('.')
+                object_type_ids.add(ContentType.objects.get_by_natural_key(app_label, model_name).pk)
+            except (ValueError, ContentType.DoesNotExist):
+                raise ValidationError({'obj_types': f"Invalid object type: {obj_type}"})
+
+        suggestions = suggestion_index.suggest(q, object_type_ids=object_type_ids, limit=limit)
+
+        # Omit any suggestions pertaining to an object the user does not have permission to view
+        object_ids = {}
+        for suggestion in suggestions:
+            object_ids.setdefault(suggestion['object_type_id'], []).append(suggestion['object_id'])
+        permitted = {
+            object_type_id: self._get_permitted_ids(request.user, ContentType.objects.get_for_id(object_type_id), ids)
+            for object_type_id, ids in object_ids.items()
+        }
+
+        results = []
+        for suggestion in suggestions:
+            if suggestion['object_id'] not in permitted[suggestion['object_type_id']]:
+                continue
+            object_type = ContentType.objects.get_for_id(suggestion['object_type_id'])
+            viewname = get_viewname(object_type.model_class(), action='detail', rest_api=True)
+            results.append({
+                'object_type': content_type_identifier(object_type),
+                'object_id': suggestion['object_id'],
+                'url': request.build_absolute_uri(reverse_url(viewname, kwargs={'pk': suggestion['object_id']})),
+                'value': suggestion['value'],
+            })
+
+        return Response(results)
@@ -9,6 +9,7 @@ from rest_framework import mixins as drf_mixins
 from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
 
+from extras.signals import clear_webhooks
 from utilities.exceptions import AbortRequest
 from . import mixins
 
@@ -86,6 +87,12 @@ class NetBoxModelViewSet(
 
         return super().get_serializer(*args, **kwargs)
 
+    def handle_exception(self, exc):
+        # Any changes made while handling the request have been rolled back, so discard their queued change records
+        # and webhooks
+        clear_webhooks.send(sender=self)
+        return super().handle_exception(exc)
+
     def dispatch(self, request, *args, **kwargs):
         logger = logging.getLogger(f'netbox.api.views.{self.__class__.__name__}')
 
@@ -17,6 +17,9 @@ ADVISORY_LOCK_KEYS = {
     'available-vlans': 100300,
     'available-asns': 100400,
 
+    # Cached data locks
+    'cached-config-contexts': 100500,
+
     # MPTT locks
     'region': 105100,
     'sitegroup': 105200,
@@ -2,9 +2,13 @@ from contextvars import ContextVar
 
 __all__ = (
     'current_request',
+    'objectchange_queue',
+    'search_queue',
     'webhooks_queue',
 )
 
 
 current_request = ContextVar('current_request', default=None)
-webhooks_queue = ContextVar('webhooks_queue', default=[])
+objectchange_queue = ContextVar('objectchange_queue', default=[])
+search_queue = ContextVar('search_queue', default=None)
+webhooks_queue = ContextVar('webhooks_queue', default={})
@@ -1,20 +1,29 @@
 from collections import defaultdict
 
 from django.conf import settings
+from django.contrib.postgres.search import TrigramSimilarity
 from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, transaction
 from django.db.models import F, Window, Q
 from django.db.models.functions import window
 from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
 from django.utils.module_loading import import_string
+from django_rq import get_queue
 import netaddr
 from netaddr.core import AddrFormatError
 
 from extras.models import CachedValue, CustomField
+from netbox.config import get_config
+from netbox.constants import RQ_QUEUE_DEFAULT
+from netbox.context import current_request, search_queue
 from netbox.registry import registry
 from utilities.querysets import RestrictedPrefetch
+from utilities.rqworker import get_rq_retry
 from utilities.utils import title
 from . import FieldTypes, LookupTypes, get_indexer
+from .suggestions import suggestion_index
 
 DEFAULT_LOOKUP_TYPE = LookupTypes.PARTIAL
 MAX_RESULTS = 1000
@@ -54,17 +63,49 @@ class SearchBackend:
         """
         raise NotImplementedError
 
+    def search_page(self, value, user=None, object_types=None, lookup=DEFAULT_LOOKUP_TYPE, after=None, limit=50):
+        """
+        Return a single page of search results ordered by weight, object type, and object ID, along with the
+        position of the last result (for use as `after` when retrieving the next page). The returned position is
+        None if no further results exist.
+        """
+        raise NotImplementedError
+
     def caching_handler(self, sender, instance, created, **kwargs):
         """
         Receiver for the post_save signal, responsible for caching object creation/changes.
         """
-        self.cache(instance, remove_existing=not created)
+        if not self.enqueue(instance):
+            self.cache(instance, remove_existing=not created)
 
     def removal_handler(self, sender, instance, **kwargs):
         """
         Receiver for the post_delete signal, responsible for caching object deletion.
         """
-        self.remove(instance)
+        if not self.enqueue(instance):
+            self.remove(instance)
+
+    def enqueue(self, instance):
+        """
+        If asynchronous indexing is enabled and a request is being processed, add the instance to the queue of
+        objects to be (re)indexed once the request has completed. Returns True if indexing has been deferred.
+        """
+        if not settings.SEARCH_ASYNC_INDEXING or current_request.get() is None:
+            return False
+
+        # Ignore non-cacheable objects
+        try:
+            get_indexer(instance)
+        except KeyError:
+            return True
+
+        queue = search_queue.get()
+        if queue is None:
+            queue = set()
+            search_queue.set(queue)
+        queue.add((ContentType.objects.get_for_model(instance).pk, instance.pk))
+
+        return True
 
     def cache(self, instances, indexer=None, remove_existing=True):
         """
@@ -78,6 +119,13 @@ class SearchBackend:
         """
         raise NotImplementedError
 
+    def refresh(self, object_type, object_ids):
+        """
+        Replace the cached representations of the specified objects (identified by ContentType and a list of
+        primary keys). Entries for any objects which no longer exist are removed.
+        """
+        raise NotImplementedError
+
     def clear(self, object_types=None):
         """
         Delete *all* cached data (optionally filtered by object type).
@@ -101,8 +149,10 @@ class SearchBackend:
 
 class CachedValueSearchBackend(SearchBackend):
 
-    def search(self, value, user=None, object_types=None, lookup=DEFAULT_LOOKUP_TYPE):
-
+    def get_query_filter(self, value, object_types=None, lookup=DEFAULT_LOOKUP_TYPE):
+        """
+        Return a Q object matching CachedValues for the given value and lookup.
+        """
         query_filter = Q(**{f'value__{lookup}': value})
 
         if object_types:
@@ -119,15 +169,27 @@ class CachedValueSearchBackend(SearchBackend):
             except (AddrFormatError, ValueError):
                 pass
 
-        # Construct the base queryset to retrieve matching results
-        queryset = CachedValue.objects.filter(query_filter).annotate(
-            # Annotate the rank of each result for its object according to its weight
+        return query_filter
+
+    def get_queryset(self, value, object_types=None, lookup=DEFAULT_LOOKUP_TYPE):
+        """
+        Return a queryset of all CachedValues matching the given value, annotated with the rank of each result
+        for its object according to its weight.
+        """
+        query_filter = self.get_query_filter(value, object_types=object_types, lookup=lookup)
+
+        return CachedValue.objects.filter(query_filter).annotate(
             row_number=Window(
                 expression=window.RowNumber(),
                 partition_by=[F('object_type'), F('object_id')],
                 order_by=[F('weight').asc()],
             )
-        )[:MAX_RESULTS]
+        )
+
+    def search(self, value, user=None, object_types=None, lookup=DEFAULT_LOOKUP_TYPE):
+
+        # Construct the base queryset to retrieve matching results
+        queryset = self.get_queryset(value, object_types=object_types, lookup=lookup)[:MAX_RESULTS]
 
         # Construct a Prefetch to pre-fetch only those related objects for which the
         # user has permission to view.
@@ -152,6 +214,45 @@ class CachedValueSearchBackend(SearchBackend):
                 ret.append(r)
         return ret
 
+    def search_page(self, value, user=None, object_types=None, lookup=DEFAULT_LOOKUP_TYPE, after=None, limit=50):
+
+        # Construct the base queryset to retrieve matching results (ordering is applied to the outer query)
+        queryset = self.get_queryset(value, object_types=object_types, lookup=lookup).order_by()
+        sql, params = queryset.query.sql_with_params()
+
+        # Seek past the last result of the previous page
+        where = 'row_number = 1'
+        if after:
+            where += ' AND (weight, object_type_id, object_id) > (%s, %s, %s)'
+            params = (*params, *after)
+
+        if user:
+            prefetch = (RestrictedPrefetch('object', user, 'view'), 'object_type')
+        else:
+            prefetch = ('object', 'object_type')
+
+        # Related objects are fetched only for the rows of the requested page. One additional row is retrieved to
+        # determine whether a further page exists.
+        results = list(CachedValue.objects.prefetch_related(*prefetch).raw(
+            f"SELECT * FROM ({sql}) t WHERE {where} ORDER BY weight, object_type_id, object_id LIMIT %s",
+            (*params, limit + 1)
+        ))
+
+        # The position is derived from the last row of the page, even if it has been omitted below
+        position = None
+        if len(results) > limit:
+            results = results[:limit]
+            last = results[-1]
+            position = (last.weight, last.object_type_id, last.object_id)
+
+        # Omit any results pertaining to an object the user does not have permission to view
+        ret = []
+        for r in results:
+            if r.object is not None:
+                r.name = str(r.object)
+                ret.append(r)
+        return ret, position
+
     def cache(self, instances, indexer=None, remove_existing=True):
         content_type = None
         custom_fields = None
@@ -161,6 +262,7 @@ class CachedValueSearchBackend(SearchBackend):
             instances = [instances]
 
         buffer = []
+        suggestions = {}
         counter = 0
         for instance in instances:
 
@@ -183,7 +285,8 @@ class CachedValueSearchBackend(SearchBackend):
                 self.remove(instance)
 
             # Generate cache data
-            for field in indexer.to_cache(instance, custom_fields=custom_fields):
+            values = indexer.to_cache(instance, custom_fields=custom_fields)
+            for field in values:
                 buffer.append(
                     CachedValue(
                         object_type=content_type,
@@ -194,18 +297,46 @@ class CachedValueSearchBackend(SearchBackend):
                         value=field.value
                     )
                 )
+            if settings.SEARCH_SUGGESTIONS:
+                suggestions[instance.pk] = values
 
             # Check whether the buffer needs to be flushed
             if len(buffer) >= 2000:
-                counter += len(CachedValue.objects.bulk_create(buffer))
+                counter += self._write(buffer)
                 buffer = []
+                if suggestions:
+                    suggestion_index.update(content_type.pk, suggestions, remove_existing=False)
+                    suggestions = {}
 
         # Final buffer flush
         if buffer:
-            counter += len(CachedValue.objects.bulk_create(buffer))
+            counter += self._write(buffer)
+        if suggestions:
+            suggestion_index.update(content_type.pk, suggestions, remove_existing=False)
 
         return counter
 
+    @staticmethod
+    def _write(values):
+        """
+        Write a list of CachedValues to the database using PostgreSQL's COPY, which avoids the overhead of
+        parsing and planning a multi-row INSERT for each batch.
+        """
+        fields = CachedValue._meta.concrete_fields
+        table = connection.ops.quote_name(CachedValue._meta.db_table)
+        columns = ', '.join(connection.ops.quote_name(f.column) for f in fields)
+        timestamp = timezone.now()
+
+        with connection.cursor() as cursor:
+            with cursor.copy(f'COPY {table} ({columns}) FROM STDIN') as copy:
+                for value in values:
+                    value.timestamp = timestamp
+                    copy.write_row([
+                        f.get_db_prep_save(getattr(value, f.attname), connection) for f in fields
+                    ])
+
+        return len(values)
+
     def remove(self, instance):
         # Avoid attempting to query for non-cacheable objects
         try:
@@ -215,14 +346,37 @@ class CachedValueSearchBackend(SearchBackend):
 
         ct = ContentType.objects.get_for_model(instance)
         qs = CachedValue.objects.filter(object_type=ct, object_id=instance.pk)
+        if settings.SEARCH_SUGGESTIONS:
+            suggestion_index.remove(ct.pk, [instance.pk])
 
         # Call _raw_delete() on the queryset to avoid first loading instances into memory
         return qs._raw_delete(using=qs.db)
 
+    def refresh(self, object_type, object_ids):
+        model = object_type.model_class()
+        try:
+            indexer = get_indexer(model)
+        except KeyError:
+            return 0
+
+        with transaction.atomic():
+            qs = CachedValue.objects.filter(object_type=object_type, object_id__in=object_ids)
+            qs._raw_delete(using=qs.db)
+            if settings.SEARCH_SUGGESTIONS:
+                suggestion_index.remove(object_type.pk, object_ids)
+
+            return self.cache(
+                model.objects.filter(pk__in=object_ids).iterator(),
+                indexer=indexer,
+                remove_existing=False
+            )
+
     def clear(self, object_types=None):
         qs = CachedValue.objects.all()
         if object_types:
             qs = qs.filter(object_type__in=object_types)
+        if settings.SEARCH_SUGGESTIONS:
+            suggestion_index.clear([ct.pk for ct in object_types] if object_types else None)
 
         # Call _raw_delete() on the queryset to avoid first loading instances into memory
         return qs._raw_delete(using=qs.db)
@@ -238,6 +392,50 @@ class CachedValueSearchBackend(SearchBackend):
         return CachedValue.objects.count()
 
 
+class TrigramSearchBackend(CachedValueSearchBackend):
+    """
+    A variant of CachedValueSearchBackend which ranks matching results by their trigram similarity to the search
+    value. Partial, exact, and prefix/suffix lookups are served by the trigram GIN index on CachedValue, avoiding a
+    sequential scan of the entire cache table. Requires the PostgreSQL pg_trgm extension.
+    """
+    def get_query_filter(self, value, object_types=None, lookup=DEFAULT_LOOKUP_TYPE):
+        query_filter = super().get_query_filter(value, object_types=object_types, lookup=lookup)
+
+        if lookup == LookupTypes.PARTIAL:
+            # Also match string values which are similar to (but do not contain) the search value, e.g. misspellings
+            similar = Q(value__trigram_similar=value) & Q(type=FieldTypes.STRING)
+            if object_types:
+                similar &= Q(object_type__in=object_types)
+            query_filter |= similar
+
+        return query_filter
+
+    def get_queryset(self, value, object_types=None, lookup=DEFAULT_LOOKUP_TYPE):
+        query_filter = self.get_query_filter(value, object_types=object_types, lookup=lookup)
+
+        return CachedValue.objects.filter(query_filter).annotate(
+            rank=TrigramSimilarity('value', value),
+        ).annotate(
+            # Annotate the rank of each result for its object according to its weight & similarity
+            row_number=Window(
+                expression=window.RowNumber(),
+                partition_by=[F('object_type'), F('object_id')],
+                order_by=[F('weight').asc(), F('rank').desc()],
+            )
+        ).order_by('weight', '-rank', 'object_type', 'object_id')
+
+
+def trigram_search_enabled():
+    """
+    Return True if the configured search backend is TrigramSearchBackend (or a subclass thereof).
+    """
+    try:
+        backend_cls = import_string(settings.SEARCH_BACKEND)
+    except ImportError:
+        return False
+    return isinstance(backend_cls, type) and issubclass(backend_cls, TrigramSearchBackend)
+
+
 def get_backend():
     """
     Initializes and returns the configured search backend.
@@ -251,6 +449,35 @@ def get_backend():
     return backend_cls()
 
 
+def flush_search_queue(queue):
+    """
+    Enqueue a background job to (re)index the objects collected during a request. Each item in the queue is a
+    two-tuple of ContentType ID and object PK.
+    """
+    if not queue:
+        return
+
+    # Group object IDs by type
+    objects = defaultdict(list)
+    for object_type_id, object_id in queue:
+        objects[object_type_id].append(object_id)
+
+    rq_queue_name = get_config().QUEUE_MAPPINGS.get('search', RQ_QUEUE_DEFAULT)
+    get_queue(rq_queue_name).enqueue(
+        "netbox.search.backends.process_search_queue",
+        objects=dict(objects),
+        retry=get_rq_retry()
+    )
+
+
+def process_search_queue(objects):
+    """
+    Refresh the cached representations of queued objects, passed as a mapping of ContentType IDs to lists of PKs.
+    """
+    for object_type_id, object_ids in objects.items():
+        search_backend.refresh(ContentType.objects.get_for_id(object_type_id), object_ids)
+
+
 search_backend = get_backend()
 
 # Connect handlers to the appropriate model signals
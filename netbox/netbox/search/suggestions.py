@@ -0,0 +1,162 @@
+from django_redis import get_redis_connection
+
+from . import FieldTypes
+
+__all__ = (
+    'SuggestionIndex',
+    'suggestion_index',
+)
+
+# Separator for the components of each sorted set member; must sort before any printable character
+SEPARATOR = '\x00'
+
+
+class SuggestionIndex:
+    """
+    A prefix index of object field values stored as a Redis sorted set, used to provide typeahead suggestions.
+
+    All members share a score of zero, causing Redis to order them lexicographically. Each member takes the form
+
+        <weight> NUL <normalized value> NUL <object type ID> NUL <object ID> NUL <value>
+
+    where the weight is zero-padded, so that members are ordered by weight and then by value. The matches for a prefix
+    at each weight can thus be retrieved in order with ZRANGEBYLEX queries. The set of weights in use is recorded in a
+    separate set, and a set per object records its members so that they can be removed when the object is updated or
+    deleted.
+    """
+    key = 'netbox:search:suggestions'
+    weights_key = f'{key}:weights'
+
+    @property
+    def connection(self):
+        return get_redis_connection('default')
+
+    def _get_object_key(self, object_type_id, object_id):
+        return f'{self.key}:{object_type_id}:{object_id}'
+
+    @staticmethod
+    def _normalize(value):
+        return value.casefold()
+
+    def _remove(self, pipeline, keys):
+        """
+        Queue the removal of all members recorded under the given per-object keys.
+        """
+        if not keys:
+            return
+        reader = self.connection.pipeline(transaction=False)
+        for key in keys:
+            reader.smembers(key)
+        for members in reader.execute():
+            if members:
+                pipeline.zrem(self.key, *members)
+        pipeline.delete(*keys)
+
+    def update(self, object_type_id, objects, remove_existing=True):
+        """
+        Replace the indexed values for each of the given objects.
+
+        Args:
+            object_type_id: The ContentType ID of the objects
+            objects: A mapping of object IDs to iterables of ObjectFieldValues
+            remove_existing: If False, skip the removal of previously indexed values
+        """
+        pipeline = self.connection.pipeline(transaction=False)
+        if remove_existing:
+            self._remove(pipeline, [self._get_object_key(object_type_id, object_id) for object_id in objects])
+
+        weights = set()
+        for object_id, values in objects.items():
+            values = [
+                value for value in values
+                if value.type == FieldTypes.STRING and SEPARATOR not in str(value.value)
+            ]
+            members = {
+                SEPARATOR.join((
+                    f'{value.weight:05d}',
+                    self._normalize(str(value.value)),
+                    str(object_type_id),
+                    str(object_id),
+                    str(value.value)
+                )): 0
+                for value in values
+            }
+            if members:
+                pipeline.zadd(self.key, members)
+                pipeline.sadd(self._get_object_key(object_type_id, object_id), *members.keys())
+                weights.update(value.weight for value in values)
+        if weights:
+            pipeline.sadd(self.weights_key, *weights)
+
+        pipeline.execute()
+
+    def remove(self, object_type_id, object_ids):
+        """
+        Remove all indexed values for the specified objects.
+        """
+        pipeline = self.connection.pipeline(transaction=False)
+        self._remove(pipeline, [self._get_object_key(object_type_id, object_id) for object_id in object_ids])
+        pipeline.execute()
+
+    def clear(self, object_type_ids=None):
+        """
+        Remove all indexed values (optionally only those for the specified object types).
+        """
+        if object_type_ids is None:
+            keys = list(self.connection.scan_iter(match=f'{self.key}:*'))
+            self.connection.delete(self.key, *keys)
+            return
+
+        pipeline = self.connection.pipeline(transaction=False)
+        for object_type_id in object_type_ids:
+            self._remove(pipeline, list(self.connection.scan_iter(match=f'{self.key}:{object_type_id}:*')))
+        pipeline.execute()
+
+    def suggest(self, prefix, object_type_ids=None, limit=10):
+        """
+        Return up to `limit` suggestions for the given prefix, as a list of dictionaries with the keys object_type_id,
+        object_id, value, and weight. Only the lowest-weight match for each object is returned, and suggestions are
+        ordered by weight and then value.
+        """
+        prefix = self._normalize(prefix)
+        if not prefix or SEPARATOR in prefix:
+            return []
+
+        # Retrieve more members than needed at a time to allow for multiple matches per object and filtering by type
+        batch_size = limit * (10 if object_type_ids else 4)
+        weights = sorted(int(weight) for weight in self.connection.smembers(self.weights_key))
+
+        # Collect matches in order of weight until enough objects have been found
+        suggestions = {}
+        for weight in weights:
+            lower = SEPARATOR.join((f'{weight:05d}', prefix)).encode()
+            offset = 0
+            while len(suggestions) < limit:
+                members = self.connection.zrangebylex(
+                    self.key, b'[' + lower, b'[' + lower + b'\xff', start=offset, num=batch_size
+                )
+                for member in members:
+                    _, _, object_type_id, object_id, value = member.decode().split(SEPARATOR)
+                    object_type_id, object_id = int(object_type_id), int(object_id)
+                    if object_type_ids and object_type_id not in object_type_ids:
+                        continue
+                    # Retain only the first (lowest-weight) match for each object
+                    if (object_type_id, object_id) not in suggestions:
+                        suggestions[(object_type_id, object_id)] = {
+                            'object_type_id': object_type_id,
+                            'object_id': object_id,
+                            'value': value,
+                            'weight': weight,
+                        }
+                    if len(suggestions) == limit:
+                        break
+                if len(members) < batch_size:
+                    break
+                offset += batch_size
+            if len(suggestions) == limit:
+                break
+
+        return list(suggestions.values())
+
+
+suggestion_index = SuggestionIndex()
@@ -88,7 +88,10 @@ BASE_PATH = getattr(configuration, 'BASE_PATH', '')
 if BASE_PATH:
     BASE_PATH = BASE_PATH.strip('/') + '/'  # Enforce trailing slash only
 CSRF_COOKIE_PATH = LANGUAGE_COOKIE_PATH = SESSION_COOKIE_PATH = f'/{BASE_PATH.rstrip("/")}'
+CABLE_TRACE_CACHE_TIMEOUT = getattr(configuration, 'CABLE_TRACE_CACHE_TIMEOUT', 0)
 CENSUS_REPORTING_ENABLED = getattr(configuration, 'CENSUS_REPORTING_ENABLED', True)
+CHANGELOG_SNAPSHOT_INTERVAL = getattr(configuration, 'CHANGELOG_SNAPSHOT_INTERVAL', 0)
+CONFIG_RENDER_PROCESSES = getattr(configuration, 'CONFIG_RENDER_PROCESSES', 0)
 CORS_ORIGIN_ALLOW_ALL = getattr(configuration, 'CORS_ORIGIN_ALLOW_ALL', False)
 CORS_ORIGIN_REGEX_WHITELIST = getattr(configuration, 'CORS_ORIGIN_REGEX_WHITELIST', [])
 CORS_ORIGIN_WHITELIST = getattr(configuration, 'CORS_ORIGIN_WHITELIST', [])
@@ -156,7 +159,9 @@ RQ_DEFAULT_TIMEOUT = getattr(configuration, 'RQ_DEFAULT_TIMEOUT', 300)
 RQ_RETRY_INTERVAL = getattr(configuration, 'RQ_RETRY_INTERVAL', 60)
 RQ_RETRY_MAX = getattr(configuration, 'RQ_RETRY_MAX', 0)
 SCRIPTS_ROOT = getattr(configuration, 'SCRIPTS_ROOT', os.path.join(BASE_DIR, 'scripts')).rstrip('/')
+SEARCH_ASYNC_INDEXING = getattr(configuration, 'SEARCH_ASYNC_INDEXING', False)
 SEARCH_BACKEND = getattr(configuration, 'SEARCH_BACKEND', 'netbox.search.backends.CachedValueSearchBackend')
+SEARCH_SUGGESTIONS = getattr(configuration, 'SEARCH_SUGGESTIONS', False)
 SECURE_SSL_REDIRECT = getattr(configuration, 'SECURE_SSL_REDIRECT', False)
 SENTRY_DSN = getattr(configuration, 'SENTRY_DSN', DEFAULT_SENTRY_DSN)
 SENTRY_ENABLED = getattr(configuration, 'SENTRY_ENABLED', False)
@@ -193,6 +198,12 @@ if RELEASE_CHECK_URL:
     except ValidationError as err:
         raise ImproperlyConfigured(str(err))
 
+# Validate the changelog snapshot interval (the depth of each delta-encoded change is stored as a smallint)
+if type(CHANGELOG_SNAPSHOT_INTERVAL) is not int or not 0 <= CHANGELOG_SNAPSHOT_INTERVAL <= 32767:
+    raise ImproperlyConfigured(
+        f"CHANGELOG_SNAPSHOT_INTERVAL must be an integer between 0 and 32767 (found {CHANGELOG_SNAPSHOT_INTERVAL!r})"
+    )
+
 
 #
 # Database
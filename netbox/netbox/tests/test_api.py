@@ -1,7 +1,10 @@
 import uuid
 
+from django.test import override_settings
 from django.urls import reverse
 
+from dcim.models import Site
+from netbox.search.backends import search_backend
 from utilities.testing import APITestCase
 
 
@@ -26,3 +29,57 @@ class AppTest(APITestCase):
         response = self.client.get(f'{url}?format=api', **self.header)
 
         self.assertEqual(response.status_code, 200)
+
+    @override_settings(EXEMPT_VIEW_PERMISSIONS=['*'])
+    def test_search(self):
+        sites = Site.objects.bulk_create([
+            Site(name=f'Site {i}', slug=f'site-{i}') for i in range(1, 6)
+        ])
+        search_backend.cache(sites)
+        url = reverse('api-search')
+
+        # Walk all results using the returned cursor
+        names = []
+        pages = 0
+        next_url = f'{url}?q=site&limit=2'
+        while next_url:
+            response = self.client.get(next_url, **self.header)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn(len(response.data['results']), (1, 2))
+            names.extend(result['object']['display'] for result in response.data['results'])
+            next_url = response.data['next']
+            pages += 1
+        self.assertEqual(sorted(names), [site.name for site in sites])
+        self.assertEqual(pages, 3)
+
+        # A page holding exactly the remaining results should not link to a further page
+        response = self.client.get(f'{url}?q=site&limit=5', **self.header)
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertIsNone(response.data['next'])
+
+        # Invalid cursor
+        response = self.client.get(f'{url}?q=site&cursor=foo', **self.header)
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(EXEMPT_VIEW_PERMISSIONS=['*'], SEARCH_SUGGESTIONS=True)
+    def test_search_suggest(self):
+        sites = Site.objects.bulk_create([
+            Site(name='Alpha 1', slug='alpha-1'),
+            Site(name='Alpha 2', slug='alpha-2'),
+            Site(name='Bravo 1', slug='bravo-1'),
+        ])
+        search_backend.clear()
+        search_backend.cache(sites)
+        url = reverse('api-search-suggest')
+
+        response = self.client.get(f'{url}?q=alp', **self.header)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result['value'] for result in response.data], ['Alpha 1', 'Alpha 2'])
+
+        response = self.client.get(f'{url}?q=alp&limit=1', **self.header)
+        self.assertEqual(len(response.data), 1)
+
+        # Suggestions should be removed along with the object
+        sites[0].delete()
+        response = self.client.get(f'{url}?q=alp', **self.header)
+        self.assertEqual([result['value'] for result in response.data], ['Alpha 2'])
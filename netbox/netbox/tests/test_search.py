@@ -1,10 +1,24 @@
+import uuid
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
 from django.contrib.contenttypes.models import ContentType
-from django.test import TestCase
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings, RequestFactory, TestCase
+from django.utils import timezone
 
 from dcim.models import Site
 from dcim.search import SiteIndex
+from extras.context_managers import change_logging
 from extras.models import CachedValue
-from netbox.search.backends import search_backend
+from netbox.context import search_queue
+from netbox.search import FieldTypes, ObjectFieldValue
+from netbox.search.backends import (
+    CachedValueSearchBackend, search_backend, trigram_search_enabled, TrigramSearchBackend,
+)
+from netbox.search.suggestions import suggestion_index
 
 
 class SearchBackendTestCase(TestCase):
@@ -111,6 +125,123 @@ class SearchBackendTestCase(TestCase):
             len(SiteIndex.fields)
         )
 
+    def test_refresh(self):
+        """
+        Test that refresh() replaces the cached values for existing objects and removes those for deleted objects.
+        """
+        sites = Site.objects.all()
+        search_backend.cache(sites)
+        content_type = ContentType.objects.get_for_model(Site)
+        site_ids = [site.pk for site in sites]
+
+        Site.objects.filter(pk=site_ids[0]).update(facility='Zulu')
+        Site.objects.filter(pk=site_ids[1])._raw_delete(using='default')
+        search_backend.refresh(content_type, site_ids)
+
+        self.assertTrue(
+            CachedValue.objects.filter(object_type=content_type, object_id=site_ids[0], value='Zulu').exists()
+        )
+        self.assertFalse(
+            CachedValue.objects.filter(object_type=content_type, object_id=site_ids[1]).exists()
+        )
+        self.assertEqual(
+            CachedValue.objects.filter(object_type=content_type).count(),
+            len(SiteIndex.fields) * 2
+        )
+
+    def test_write(self):
+        """
+        Test that values written to the cache using COPY are stored unaltered.
+        """
+        site = Site.objects.first()
+        content_type = ContentType.objects.get_for_model(Site)
+        values = ('Tab\tNewline\nBackslash\\', '\\N', 'Ünïcödé', '')
+
+        count = CachedValueSearchBackend._write([
+            CachedValue(
+                object_type=content_type,
+                object_id=site.pk,
+                field=f'field{i}',
+                type=FieldTypes.STRING,
+                weight=i,
+                value=value
+            ) for i, value in enumerate(values)
+        ])
+
+        self.assertEqual(count, len(values))
+        cached_values = CachedValue.objects.filter(object_type=content_type, object_id=site.pk).order_by('weight')
+        self.assertEqual(
+            list(cached_values.values_list('field', 'type', 'weight', 'value')),
+            [(f'field{i}', FieldTypes.STRING, i, value) for i, value in enumerate(values)]
+        )
+        for cached_value in cached_values:
+            self.assertIsNotNone(cached_value.timestamp)
+
+    def test_reindex_since(self):
+        """
+        Test that reindexing with --since caches only objects which have changed since they were last cached.
+        """
+        site1, site2, site3 = Site.objects.order_by('name')
+        content_type = ContentType.objects.get_for_model(Site)
+        search_backend.cache([site1, site2])
+        site2_timestamps = set(
+            CachedValue.objects.filter(object_type=content_type, object_id=site2.pk).values_list('timestamp', flat=True)
+        )
+
+        # Modify a Site without triggering the caching signal handler
+        Site.objects.filter(pk=site1.pk).update(facility='Zulu', last_updated=timezone.now())
+
+        since = (timezone.now() - timedelta(days=1)).isoformat()
+        call_command('reindex', 'dcim.site', since=since, stdout=StringIO())
+
+        # The modified Site should have been reindexed
+        self.assertTrue(
+            CachedValue.objects.filter(object_type=content_type, object_id=site1.pk, value='Zulu').exists()
+        )
+        # The unmodified Site should have been left alone
+        self.assertEqual(
+            set(
+                CachedValue.objects.filter(
+                    object_type=content_type, object_id=site2.pk
+                ).values_list('timestamp', flat=True)
+            ),
+            site2_timestamps
+        )
+        # The Site which had never been cached should have been indexed
+        self.assertEqual(
+            CachedValue.objects.filter(object_type=content_type, object_id=site3.pk).count(),
+            len(SiteIndex.fields)
+        )
+
+        # Objects updated before the given time should be ignored
+        Site.objects.filter(pk=site2.pk).update(facility='Yankee')
+        since = (timezone.now() + timedelta(days=1)).isoformat()
+        call_command('reindex', 'dcim.site', since=since, stdout=StringIO())
+        self.assertFalse(
+            CachedValue.objects.filter(object_type=content_type, object_id=site2.pk, value='Yankee').exists()
+        )
+
+    @override_settings(SEARCH_ASYNC_INDEXING=True)
+    def test_enqueue_on_save(self):
+        """
+        Test that saving an object during a request queues it for indexing rather than caching it immediately.
+        """
+        site = Site.objects.first()
+        content_type = ContentType.objects.get_for_model(Site)
+        request = RequestFactory().get('/')
+        request.id = uuid.uuid4()
+        request.user = get_user_model().objects.create_user(username='testuser')
+
+        with change_logging(request):
+            site.save()
+            site.save()
+            self.assertEqual(search_queue.get(), {(content_type.pk, site.pk)})
+
+        self.assertIsNone(search_queue.get())
+        self.assertFalse(
+            CachedValue.objects.filter(object_type=content_type, object_id=site.pk).exists()
+        )
+
     def test_remove_on_delete(self):
         """
         Test that any cached value for an object are automatically removed on delete().
@@ -151,3 +282,71 @@ class SearchBackendTestCase(TestCase):
         self.assertEqual(len(results), 1)
         results = search_backend.search('xxxxx')
         self.assertEqual(len(results), 0)
+
+    def test_trigram_search(self):
+        """
+        Test searching with the trigram backend, which should also match similar values and rank results by similarity.
+        """
+        # The pg_trgm extension is enabled by migrations only where the trigram backend is configured
+        with connection.cursor() as cursor:
+            cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        sites = Site.objects.all()
+        search_backend.cache(sites)
+        backend = TrigramSearchBackend()
+
+        results = backend.search('site')
+        self.assertEqual(len(results), 3)
+        results = backend.search('first')
+        self.assertEqual(len(results), 1)
+        results = backend.search('xxxxx')
+        self.assertEqual(len(results), 0)
+
+        # Values similar to a misspelled search value should be matched
+        self.assertEqual(len(search_backend.search('Charly')), 0)
+        results = backend.search('Charly')
+        self.assertEqual([r.object for r in results], [Site.objects.get(facility='Charlie')])
+
+        # The closest match should be ranked first
+        self.assertEqual(len(search_backend.search('Sitee 1')), 0)
+        results = backend.search('Sitee 1')
+        self.assertEqual(len(results), 3)
+        self.assertEqual(results[0].object, Site.objects.get(name='Site 1'))
+
+    def test_trigram_search_enabled(self):
+        self.assertFalse(trigram_search_enabled())
+        with override_settings(SEARCH_BACKEND='netbox.search.backends.TrigramSearchBackend'):
+            self.assertTrue(trigram_search_enabled())
+
+
+class SuggestionIndexTestCase(TestCase):
+
+    def setUp(self):
+        suggestion_index.clear()
+
+    def tearDown(self):
+        suggestion_index.clear()
+
+    def test_suggest(self):
+        """
+        Test that suggestions are ranked by weight, even where many higher-weight matches precede them lexically.
+        """
+        objects = {
+            i: [ObjectFieldValue('description', FieldTypes.STRING, 500, f'Aardvark {i}')] for i in range(1, 51)
+        }
+        objects[51] = [
+            ObjectFieldValue('name', FieldTypes.STRING, 100, 'Abc'),
+            ObjectFieldValue('description', FieldTypes.STRING, 500, 'Aa'),
+        ]
+        suggestion_index.update(1, objects)
+
+        suggestions = suggestion_index.suggest('a', limit=3)
+        self.assertEqual(
+            [(suggestion['object_id'], suggestion['value'], suggestion['weight']) for suggestion in suggestions],
+            [(51, 'Abc', 100), (1, 'Aardvark 1', 500), (10, 'Aardvark 10', 500)]
+        )
+        self.assertEqual(len(suggestion_index.suggest('aardvark', limit=100)), 50)
+        self.assertEqual(suggestion_index.suggest('a', object_type_ids={2}), [])
+
+        # Removing an object should remove its suggestions
+        suggestion_index.remove(1, [51])
+        self.assertEqual(suggestion_index.suggest('ab'), [])
@@ -7,7 +7,7 @@ from drf_spectacular.views import SpectacularAPIView, SpectacularRedocView, Spec
 
 from account.views import LoginView, LogoutView
 from extras.plugins.urls import plugin_admin_patterns, plugin_patterns, plugin_api_patterns
-from netbox.api.views import APIRootView, StatusView
+from netbox.api.views import APIRootView, SearchView as APISearchView, StatusView, SuggestView
 from netbox.graphql.schema import schema
 from netbox.graphql.views import GraphQLView
 from netbox.views import HomeView, StaticMediaFailureView, SearchView, htmx
@@ -52,6 +52,8 @@ _patterns = [
     path('api/users/', include('users.api.urls')),
     path('api/virtualization/', include('virtualization.api.urls')),
     path('api/wireless/', include('wireless.api.urls')),
+    path('api/search/', APISearchView.as_view(), name='api-search'),
+    path('api/search/suggest/', SuggestView.as_view(), name='api-search-suggest'),
     path('api/status/', StatusView.as_view(), name='api-status'),
 
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
@@ -25,7 +25,9 @@ class ConfigTemplateLoader(BaseLoader):
             raise TemplateNotFound(template)
 
         # Find and pre-fetch referenced templates
-        if referenced_templates := find_referenced_templates(environment.parse(template_source)):
+        if self.data_source and (
+            referenced_templates := find_referenced_templates(environment.parse(template_source))
+        ):
             self.cache_templates({
                 df.path: df.data_as_string for df in
                 DataFile.objects.filter(source=self.data_source, path__in=referenced_templates)
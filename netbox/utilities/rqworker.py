@@ -1,10 +1,17 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connection
 from django_rq.queues import get_connection
-from rq import Retry, Worker
+from rq import Retry, SimpleWorker, Worker
+from rq.timeouts import TimerDeathPenalty
+from rq.worker import WorkerStatus
 
 from netbox.config import get_config
 from netbox.constants import RQ_QUEUE_DEFAULT
 
 __all__ = (
+    'ThreadedWorker',
     'get_queue_for_model',
     'get_rq_retry',
     'get_workers_for_queue',
@@ -34,3 +41,83 @@ def get_rq_retry():
     retry_interval = get_config().RQ_RETRY_INTERVAL
     if retry_max:
         return Retry(max=retry_max, interval=retry_interval)
+
+
+class ThreadedWorker(SimpleWorker):
+    """
+    An RQ worker which executes up to `threads` jobs concurrently in a pool of threads within the worker process (rather
+    than forking a work horse for each job). Suited to I/O-bound jobs, such as the delivery of webhooks.
+    """
+    # Signal-based job timeouts work only in the main thread
+    death_penalty_class = TimerDeathPenalty
+
+    def __init__(self, *args, threads=4, **kwargs):
+        # State which RQ tracks for the single job in progress (e.g. the current Execution) is kept per thread
+        self._job_state = threading.local()
+        self._current_job_ids = []
+        self._active_jobs = 0
+        self._active_lock = threading.Lock()
+        super().__init__(*args, **kwargs)
+        self.threads = threads
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(threads)
+
+    @property
+    def execution(self):
+        return getattr(self._job_state, 'execution', None)
+
+    @execution.setter
+    def execution(self, value):
+        self._job_state.execution = value
+
+    @property
+    def current_job_working_time(self):
+        return getattr(self._job_state, 'current_job_working_time', 0)
+
+    @current_job_working_time.setter
+    def current_job_working_time(self, value):
+        self._job_state.current_job_working_time = value
+
+    def set_current_job_id(self, job_id=None, pipeline=None):
+        # Report the most recently started of the jobs in progress as the worker's current job
+        with self._active_lock:
+            if job_id is not None:
+                self._current_job_ids.append(job_id)
+            elif getattr(self._job_state, 'job_id', None) in self._current_job_ids:
+                self._current_job_ids.remove(self._job_state.job_id)
+            self._job_state.job_id = job_id
+            current_job_id = self._current_job_ids[-1] if self._current_job_ids else None
+            super().set_current_job_id(current_job_id, pipeline=pipeline)
+
+    def execute_job(self, job, queue):
+        # Wait for a thread to become available, so that jobs are not dequeued faster than they can be run
+        self._slots.acquire()
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix='rqworker')
+        with self._active_lock:
+            self._active_jobs += 1
+            self.set_state(WorkerStatus.BUSY)
+        self._executor.submit(self._perform_job, job, queue)
+
+    def _perform_job(self, job, queue):
+        try:
+            # RQ 2.x records an Execution for each job (which also places it in the StartedJobRegistry) before it is
+            # performed
+            if hasattr(self, 'prepare_execution'):
+                self.prepare_execution(job)
+            self.perform_job(job, queue)
+        finally:
+            # Each thread holds its own database connection
+            connection.close()
+            with self._active_lock:
+                self._active_jobs -= 1
+                if not self._active_jobs:
+                    self.set_state(WorkerStatus.IDLE)
+            self._slots.release()
+
+    def teardown(self):
+        # Allow any jobs in progress to complete
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        super().teardown()
@@ -0,0 +1,44 @@
+import time
+
+import django_rq
+from django.test import SimpleTestCase
+from rq import get_current_job
+from rq.job import JobStatus
+from rq.registry import StartedJobRegistry
+
+from utilities.rqworker import ThreadedWorker
+
+
+def dummy_job():
+    """
+    Return whether the current job is listed in the StartedJobRegistry while it runs.
+    """
+    job = get_current_job()
+    time.sleep(0.5)
+    return job.id in StartedJobRegistry(job.origin, connection=job.connection)
+
+
+class ThreadedWorkerTest(SimpleTestCase):
+
+    def setUp(self):
+        self.queue = django_rq.get_queue('default')
+        self.queue.empty()
+
+    def test_execute_jobs(self):
+        jobs = [self.queue.enqueue(dummy_job) for _ in range(4)]
+        worker = ThreadedWorker([self.queue], connection=self.queue.connection, threads=4)
+
+        start = time.monotonic()
+        worker.work(burst=True)
+
+        # Jobs are run concurrently
+        self.assertLess(time.monotonic() - start, 1.5)
+
+        # Each job is started and completed like a job run by any other worker
+        for job in jobs:
+            job.refresh()
+            self.assertEqual(job.get_status(), JobStatus.FINISHED)
+            self.assertTrue(job.return_value())
+        self.assertEqual(self.queue.started_job_registry.count, 0)
+        self.assertEqual(self.queue.finished_job_registry.count, 4)
+        self.assertIsNone(worker.get_current_job_id())
@@ -1,8 +1,11 @@
+import json
+
 from django.urls import reverse
 from rest_framework import status
 
 from dcim.choices import InterfaceModeChoices
 from dcim.models import Site
+from extras.models import ConfigTemplate
 from ipam.models import VLAN, VRF
 from utilities.testing import APITestCase, APIViewTestCases, create_test_device
 from virtualization.choices import *
@@ -204,6 +207,30 @@ class VirtualMachineTest(APIViewTestCases.APIViewTestCase):
         response = self.client.get(url, **self.header)
         self.assertEqual(response.data['results'][0].get('config_context', {}).get('A'), 1)
 
+    def test_render_configs(self):
+        """
+        Check that the config templates for all virtual machines matching a filter can be rendered at once.
+        """
+        config_template = ConfigTemplate.objects.create(
+            name='Config Template 1',
+            template_code='{{ virtualmachine.name }}: {{ A }}{{ foo }}'
+        )
+        VirtualMachine.objects.filter(name__in=['Virtual Machine 1', 'Virtual Machine 2']).update(
+            config_template=config_template
+        )
+
+        self.add_permissions('virtualization.add_virtualmachine')
+        url = reverse('virtualization-api:virtualmachine-render-configs') + '?site=site-1'
+        response = self.client.post(url, {'foo': 'X'}, format='json', **self.header)
+        self.assertHttpStatus(response, status.HTTP_200_OK)
+        records = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(
+            [record.get('content') for record in records],
+            ['Virtual Machine 1: 1X', 'Virtual Machine 2: X', None]
+        )
+        self.assertEqual(records[0]['configtemplate']['id'], config_template.pk)
+        self.assertIn('error', records[2])
+
     def test_config_context_excluded(self):
         """
         Check that config context data can be excluded by passing ?exclude=config_context.